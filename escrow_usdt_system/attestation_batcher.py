@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+ATTESTATION BATCHER - Merkle-batched attestations for USDT issuance
+Collects per-transaction attestation records, anchors one Merkle root per batch
+and hands out compact inclusion proofs that can be verified offline
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import asyncio
+import hashlib
+import json
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Keys added to an attestation record after hashing; excluded when re-hashing
+DERIVED_KEYS = ('hash', 'verification_url', 'attestation_batch')
+
+BATCH_STATE_PREFIX = 'attestation_batch:'
+# batch_id -> attestation_timestamp of its first record, for every batch not yet sealed
+OPEN_BATCHES_STATE_KEY = 'attestation_open_batches'
+
+
+# ============================================================================
+# Merkle tree helpers
+# ============================================================================
+
+def _leaf_hash(record_hash: str) -> bytes:
+    # Domain-separate leaves from interior nodes (prevents second-preimage tricks)
+    return hashlib.sha256(b'\x00' + bytes.fromhex(record_hash)).digest()
+
+
+def _node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+
+def _build_levels(record_hashes: List[str]) -> List[List[bytes]]:
+    """All tree levels, leaves first; an unpaired node is carried up unchanged"""
+    levels = [[_leaf_hash(h) for h in record_hashes]]
+    while len(levels[-1]) > 1:
+        current = levels[-1]
+        parent = [_node_hash(current[i], current[i + 1]) for i in range(0, len(current) - 1, 2)]
+        if len(current) % 2:
+            parent.append(current[-1])
+        levels.append(parent)
+    return levels
+
+
+def merkle_root(record_hashes: List[str]) -> str:
+    if not record_hashes:
+        raise ValueError("Cannot build a Merkle root over zero records")
+    return _build_levels(record_hashes)[-1][0].hex()
+
+
+def merkle_proofs(record_hashes: List[str]) -> List[List[Dict]]:
+    """Inclusion proof for every leaf, computed in one pass over the tree"""
+    levels = _build_levels(record_hashes)
+    proofs = []
+    for leaf_index in range(len(record_hashes)):
+        proof = []
+        index = leaf_index
+        for level in levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                proof.append({
+                    'position': 'left' if sibling < index else 'right',
+                    'hash': level[sibling].hex()
+                })
+            index //= 2
+        proofs.append(proof)
+    return proofs
+
+
+def root_from_proof(record_hash: str, proof: List[Dict]) -> str:
+    node = _leaf_hash(record_hash)
+    for step in proof:
+        sibling = bytes.fromhex(step['hash'])
+        node = _node_hash(sibling, node) if step['position'] == 'left' else _node_hash(node, sibling)
+    return node.hex()
+
+
+# ============================================================================
+# Offline verification
+# ============================================================================
+
+def attestation_record_hash(record: Dict) -> str:
+    """Recompute the SHA-256 an attestation record was issued with"""
+    data = {key: value for key, value in record.items() if key not in DERIVED_KEYS}
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def root_from_memo(memo: Dict) -> str:
+    """Extract the anchored root from a create_xrpl_attestation_memo structure"""
+    memo_data = memo['Memos'][0]['Memo']['MemoData']
+    return json.loads(bytes.fromhex(memo_data).decode())['sha256']
+
+
+def verify_attestation(record: Dict, anchored_root: Optional[str] = None) -> Dict:
+    """Check an attestation record against its Merkle proof and anchored root
+
+    ``anchored_root`` should come from the on-ledger memo (see
+    ``root_from_memo``); when omitted, the root embedded in the record is used,
+    which only proves internal consistency.
+    """
+    batch = record.get('attestation_batch') or {}
+    recomputed = attestation_record_hash(record)
+    checks = {
+        'record_hash_matches': recomputed == record.get('hash'),
+        'proof_present': 'proof' in batch and 'root' in batch
+    }
+    if checks['proof_present']:
+        computed_root = root_from_proof(recomputed, batch['proof'])
+        checks['proof_matches_batch_root'] = computed_root == batch['root']
+        checks['root_matches_anchor'] = computed_root == (anchored_root or batch['root'])
+    return {'valid': all(checks.values()), 'checks': checks, 'record_hash': recomputed}
+
+
+# ============================================================================
+# Batcher
+# ============================================================================
+
+class AttestationBatcher:
+    """Collects attestation records and anchors one Merkle root per batch
+
+    A batch is sealed when it reaches ``max_batch_size`` records or its oldest
+    record has waited ``max_wait_seconds``; ``run`` (or a periodic
+    ``seal_if_due``) enforces the time limit. Sealing builds the tree, calls
+    ``anchor(root_hash, batch_summary)`` once, and writes each record back to
+    the store with its inclusion proof.
+
+    With a store, open batches are registered in ledger state so that
+    ``restore_pending`` can re-queue records a previous process left in
+    PENDING_ANCHOR. Call it once at startup, before other writers are live.
+    """
+
+    def __init__(self,
+                 anchor: Callable[[str, Dict], Dict],
+                 store=None,
+                 max_batch_size: int = 1000,
+                 max_wait_seconds: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.anchor = anchor
+        self.store = store
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._clock = clock
+        self._pending: List[Dict] = []
+        self._batch_id: Optional[str] = None
+        self._opened_at = 0.0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def add(self, record: Dict) -> Dict:
+        """Queue an attestation record; returns its batch placement"""
+        if self._batch_id is None:
+            self._open_batch(record.get('attestation_timestamp', ''))
+
+        placement = {
+            'batch_id': self._batch_id,
+            'leaf_index': len(self._pending),
+            'status': 'PENDING_ANCHOR'
+        }
+        queued = {**record, 'attestation_batch': placement}
+        self._pending.append(queued)
+        if self.store is not None:
+            self.store.put_attestation(queued)
+
+        if len(self._pending) >= self.max_batch_size:
+            self.seal()
+        return placement
+
+    def _open_batch(self, opened_from: str) -> None:
+        self._batch_id = f"ATTBATCH_{uuid.uuid4().hex[:12].upper()}"
+        self._opened_at = self._clock()
+        if self.store is not None:
+            batch_id = self._batch_id
+            self.store.update_state(OPEN_BATCHES_STATE_KEY,
+                                    lambda current: {**(current or {}), batch_id: opened_from})
+
+    def _close_batches(self, batch_ids: List[str]) -> None:
+        if self.store is not None:
+            self.store.update_state(OPEN_BATCHES_STATE_KEY, lambda current: {
+                batch_id: opened_from for batch_id, opened_from in (current or {}).items()
+                if batch_id not in batch_ids
+            })
+
+    def restore_pending(self, page_size: int = 1000) -> Optional[Dict]:
+        """Re-queue PENDING_ANCHOR records of batches a previous process never sealed, and seal them
+
+        Only attestations created since the oldest open batch are read.
+        """
+        open_batches = self.store.get_state(OPEN_BATCHES_STATE_KEY) if self.store is not None else None
+        if not open_batches:
+            return None
+        stranded, after = [], None
+        while True:
+            page = self.store.find_attestations(created_from=min(open_batches.values()), after=after, limit=page_size)
+            stranded.extend(
+                record for record in page
+                if record.get('attestation_batch', {}).get('status') == 'PENDING_ANCHOR'
+                and record['attestation_batch'].get('batch_id') in open_batches
+            )
+            if len(page) < page_size:
+                break
+            after = (page[-1]['attestation_timestamp'], page[-1]['transaction_id'])
+
+        for record in stranded:
+            if self._batch_id is None:
+                self._open_batch(record.get('attestation_timestamp', ''))
+            record['attestation_batch'] = {
+                'batch_id': self._batch_id,
+                'leaf_index': len(self._pending),
+                'status': 'PENDING_ANCHOR'
+            }
+            self._pending.append(record)
+            self.store.put_attestation(record)
+        self._close_batches(list(open_batches))
+        return self.seal()
+
+    def seal_if_due(self) -> Optional[Dict]:
+        if self._pending and self._clock() - self._opened_at >= self.max_wait_seconds:
+            return self.seal()
+        return None
+
+    def seal(self) -> Optional[Dict]:
+        """Build the tree for the open batch and anchor its root"""
+        if not self._pending:
+            return None
+
+        records, batch_id = self._pending, self._batch_id
+        self._pending, self._batch_id = [], None
+
+        record_hashes = [record['hash'] for record in records]
+        root = merkle_root(record_hashes)
+        summary = {
+            'batch_id': batch_id,
+            'root': root,
+            'leaf_count': len(records),
+            'first_transaction_id': records[0]['transaction_id'],
+            'last_transaction_id': records[-1]['transaction_id'],
+            'sealed_at': datetime.now().isoformat()
+        }
+        anchor_result = self.anchor(root, summary)
+        summary['anchor'] = anchor_result
+
+        for record, proof in zip(records, merkle_proofs(record_hashes)):
+            record['attestation_batch'] = {
+                **record['attestation_batch'],
+                'status': 'ANCHORED',
+                'root': root,
+                'proof': proof,
+                'anchor_tx': anchor_result.get('anchor_tx')
+            }
+            if self.store is not None:
+                self.store.put_attestation(record)
+
+        if self.store is not None:
+            self.store.put_state(f"{BATCH_STATE_PREFIX}{batch_id}", {**summary, 'leaves': record_hashes})
+        self._close_batches([batch_id])
+        return summary
+
+    async def run(self, interval: float = 1.0) -> None:
+        """Background loop that seals batches once their time window elapses"""
+        while True:
+            await asyncio.sleep(interval)
+            self.seal_if_due()
+
+
+if __name__ == "__main__":
+    # Offline verification: attestation_batcher.py <record.json> [anchored_root]
+    if len(sys.argv) < 2:
+        print("Usage: attestation_batcher.py <attestation_record.json> [anchored_root]")
+        sys.exit(2)
+    with open(sys.argv[1], encoding='utf-8') as f:
+        attestation = json.load(f)
+    result = verify_attestation(attestation, sys.argv[2] if len(sys.argv) > 2 else None)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['valid'] else 1)
@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+AUDIT EXPORT - Streaming, chunked and checksummed export of the escrow history
+Escrow accounts, issuances, redemptions and attestations are read from the ledger
+page by page and written as JSONL, CSV or columnar chunks with a resumable manifest
+Author: OPTKAS1 Enhanced Infrastructure Team
+
+Usage:
+    python -m escrow_usdt_system.audit_export --ledger escrow_usdt_ledger.db --out audit_2026Q3 \\
+        --format csv --from 2026-07-01 --to 2026-09-30T23:59:59
+    python -m escrow_usdt_system.audit_export --verify audit_2026Q3
+    python -m escrow_usdt_system.audit_export --ledger escrow_usdt_ledger.db --check-resume /tmp/resume_check \\
+        --rows-per-chunk 1000
+"""
+
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+from abc import ABC, abstractmethod
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+MANIFEST_FILE = 'manifest.json'
+CHECKSUM_FILE = 'SHA256SUMS'
+MANIFEST_VERSION = 1
+
+DEFAULT_ROWS_PER_CHUNK = 250000
+DEFAULT_PAGE_SIZE = 1000
+
+EXPORT_FORMATS = ('jsonl', 'csv', 'columnar', 'parquet')
+FORMAT_EXTENSIONS = {'jsonl': 'jsonl', 'csv': 'csv', 'columnar': 'columns.json.gz', 'parquet': 'parquet'}
+
+# Column order for CSV and columnar output (JSONL keeps every field of the record)
+DATASET_COLUMNS = {
+    'escrow_accounts': (
+        'transaction_id', 'created_date', 'status', 'client_id', 'currency', 'amount', 'amount_received',
+        'usdt_issued', 'account_number', 'bank_partner', 'swift_code', 'account_type', 'bank_reference',
+        'fx_snapshot_id', 'attestation_hash', 'client_info'
+    ),
+    'issuances': (
+        'transaction_id', 'issuance_date', 'client_id', 'token', 'amount', 'fx_snapshot_id',
+        'recipient_wallet', 'issuer_wallet', 'blockchain', 'transaction_hash', 'backing_type', 'netting'
+    ),
+    'redemptions': (
+        'sequence', 'transaction_id', 'timestamp', 'client_id', 'amount', 'currency', 'fiat_amount',
+        'fiat_currency', 'fx_snapshot_id', 'burn_transaction_hash'
+    ),
+    'attestations': (
+        'transaction_id', 'attestation_timestamp', 'fiat_currency', 'fiat_amount', 'usdt_issued',
+        'escrow_account', 'bank_partner', 'usdt_transaction_hash', 'hash', 'attestation_batch'
+    )
+}
+
+DATASETS = tuple(DATASET_COLUMNS)
+
+
+class AuditExportError(Exception):
+    """Raised when an export cannot be started, resumed or verified"""
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _cell(value) -> Optional[str]:
+    """Flatten a field for CSV/columnar output; amounts keep full Decimal precision"""
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_value, sort_keys=True, separators=(',', ':'))
+    return str(value)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# -- ledger readers --------------------------------------------------------
+def _paged(finder: Callable, date_field: str, after: Optional[Tuple[str, str]],
+           page_size: int, **filters) -> Iterator[Tuple[Tuple[str, str], Dict]]:
+    """Keyset-paginate a ledger listing, yielding (cursor, record)"""
+    while True:
+        page = finder(after=after, limit=page_size, **filters)
+        for record in page:
+            after = (record[date_field], record['transaction_id'])
+            yield list(after), record
+        if len(page) < page_size:
+            return
+
+
+def iter_dataset(ledger, dataset: str, filters: Dict, cursor=None,
+                 page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Tuple[object, Dict]]:
+    """Stream one dataset as (cursor, record) pairs, resuming after ``cursor``
+
+    ``filters`` may hold created_from / created_to (ISO timestamps),
+    client_id and currency. Reads are paginated, so memory use does not
+    depend on the size of the ledger.
+    """
+    created_from, created_to = filters.get('created_from'), filters.get('created_to')
+    client_id, currency = filters.get('client_id'), filters.get('currency')
+    # Keyset datasets resume after a (date, transaction_id) pair, redemptions after a log sequence
+    after = tuple(cursor) if cursor is not None and dataset != 'redemptions' else None
+
+    if dataset == 'escrow_accounts':
+        yield from _paged(ledger.find_escrow_accounts, 'created_date', after, page_size,
+                          client_id=client_id, currency=currency,
+                          created_from=created_from, created_to=created_to)
+
+    elif dataset == 'issuances':
+        for position, record in _paged(ledger.find_issuances, 'issuance_date', after, page_size,
+                                       client_id=client_id, created_from=created_from, created_to=created_to):
+            if currency is not None and record.get('token') != currency:
+                # A fiat currency filter selects issuances backed by escrow in that currency
+                account = ledger.get_escrow_account(record['transaction_id'])
+                if account is None or account['currency'] != currency:
+                    continue
+            yield position, record
+
+    elif dataset == 'attestations':
+        for position, record in _paged(ledger.find_attestations, 'attestation_timestamp', after, page_size,
+                                       created_from=created_from, created_to=created_to):
+            if currency is not None and record.get('fiat_currency') != currency:
+                continue
+            if client_id is not None:
+                # Attestations carry no client; filter through the escrow account they attest
+                account = ledger.get_escrow_account(record['transaction_id'])
+                if account is None or account['client_id'] != client_id:
+                    continue
+            yield position, record
+
+    elif dataset == 'redemptions':
+        # Redemptions live only in the transaction log, which is ordered by sequence
+        sequence = cursor or 0
+        while True:
+            page = list(ledger.iter_transactions(after_sequence=sequence, limit=page_size))
+            for sequence, entry in page:
+                if entry.get('type') != 'USDT_REDEEMED':
+                    continue
+                timestamp = entry.get('timestamp', '')
+                if created_from is not None and timestamp < created_from:
+                    continue
+                if created_to is not None and timestamp > created_to:
+                    continue
+                if client_id is not None and entry.get('client_id') != client_id:
+                    continue
+                if currency is not None and currency not in (entry.get('currency'), entry.get('fiat_currency')):
+                    continue
+                yield sequence, {'sequence': sequence, **entry}
+            if len(page) < page_size:
+                return
+    else:
+        raise AuditExportError(f"Unknown dataset: {dataset}")
+
+
+# -- chunk writers ---------------------------------------------------------
+class _ChunkWriter(ABC):
+    """Writes one chunk to ``<path>.part`` and renames it into place on close"""
+
+    def __init__(self, path: str, columns: Tuple[str, ...]):
+        self.path = path
+        self.part_path = path + '.part'
+        self.columns = columns
+        self.rows = 0
+
+    @abstractmethod
+    def write(self, record: Dict) -> None:
+        ...
+
+    def _finish(self) -> None:
+        pass
+
+    def close(self) -> Dict:
+        self._finish()
+        os.replace(self.part_path, self.path)
+        return {
+            'file': os.path.basename(self.path),
+            'rows': self.rows,
+            'bytes': os.path.getsize(self.path),
+            'sha256': _file_sha256(self.path)
+        }
+
+
+class _TextChunkWriter(_ChunkWriter):
+    """Row-at-a-time text output; nothing is buffered beyond the file object"""
+
+    def __init__(self, path, columns):
+        super().__init__(path, columns)
+        self._file = open(self.part_path, 'w', encoding='utf-8', newline='')
+
+    def _finish(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+class _JSONLWriter(_TextChunkWriter):
+    def write(self, record):
+        self._file.write(json.dumps(record, default=_json_value, sort_keys=True, separators=(',', ':')) + '\n')
+        self.rows += 1
+
+
+class _CSVWriter(_TextChunkWriter):
+    def __init__(self, path, columns):
+        super().__init__(path, columns)
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(columns)
+
+    def write(self, record):
+        self._csv.writerow([_cell(record.get(column)) for column in self.columns])
+        self.rows += 1
+
+
+class _ColumnarWriter(_ChunkWriter):
+    """Column-oriented chunk: gzip JSON of {column: [values...]}
+
+    A chunk's columns are buffered until it closes, so memory is bounded by
+    ``rows_per_chunk`` rather than by the export size.
+    """
+
+    def __init__(self, path, columns):
+        super().__init__(path, columns)
+        self._columns: Dict[str, List] = {column: [] for column in columns}
+
+    def write(self, record):
+        for column, values in self._columns.items():
+            values.append(_cell(record.get(column)))
+        self.rows += 1
+
+    def _finish(self):
+        with gzip.open(self.part_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump({'columns': list(self.columns), 'rows': self.rows, 'data': self._columns}, f,
+                      separators=(',', ':'))
+        self._columns = {}
+
+
+class _ParquetWriter(_ColumnarWriter):
+    def _finish(self):
+        table = pyarrow.table({column: pyarrow.array(values, type=pyarrow.string())
+                               for column, values in self._columns.items()})
+        pyarrow.parquet.write_table(table, self.part_path)
+        self._columns = {}
+
+
+CHUNK_WRITERS = {
+    'jsonl': _JSONLWriter,
+    'csv': _CSVWriter,
+    'columnar': _ColumnarWriter,
+    'parquet': _ParquetWriter
+}
+
+
+# -- export / resume / verify ----------------------------------------------
+class AuditExporter:
+    """Exports ledger datasets into a directory of checksummed chunks
+
+    ``manifest.json`` lists every finished chunk with its row count, SHA-256
+    and the ledger cursor after its last row, and is rewritten atomically
+    after each chunk. Re-running an interrupted export with the same options
+    verifies the finished chunks and continues from the last cursor.
+    """
+
+    def __init__(self, ledger, page_size: int = DEFAULT_PAGE_SIZE):
+        self.ledger = ledger
+        self.page_size = page_size
+
+    def _write_manifest(self, directory: str, manifest: Dict) -> None:
+        path = os.path.join(directory, MANIFEST_FILE)
+        with open(path + '.part', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.part', path)
+
+    def _load_resumable(self, directory: str, fmt: str, filters: Dict) -> Optional[Dict]:
+        path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['format'] != fmt or manifest['filters'] != filters:
+            raise AuditExportError(
+                f"{directory} holds an export with different options; use a new directory to start over"
+            )
+        # Finished chunks must be intact before appending to them
+        for dataset in manifest['datasets'].values():
+            for chunk in dataset['chunks']:
+                chunk_path = os.path.join(directory, chunk['file'])
+                if not os.path.exists(chunk_path) or _file_sha256(chunk_path) != chunk['sha256']:
+                    raise AuditExportError(f"Chunk {chunk['file']} is missing or corrupt; cannot resume")
+        return manifest
+
+    def export(self,
+               directory: str,
+               datasets: Tuple[str, ...] = DATASETS,
+               fmt: str = 'jsonl',
+               created_from: Optional[str] = None,
+               created_to: Optional[str] = None,
+               client_id: Optional[str] = None,
+               currency: Optional[str] = None,
+               rows_per_chunk: int = DEFAULT_ROWS_PER_CHUNK) -> Dict:
+        """Export (or resume exporting) ``datasets``; returns the manifest"""
+        if fmt not in EXPORT_FORMATS:
+            raise AuditExportError(f"Unknown export format: {fmt}")
+        if fmt == 'parquet' and pyarrow is None:
+            raise AuditExportError("Parquet export requires pyarrow (pip install pyarrow); use 'columnar' instead")
+        unknown = set(datasets) - set(DATASETS)
+        if unknown:
+            raise AuditExportError(f"Unknown datasets: {sorted(unknown)}")
+
+        filters = {'created_from': created_from, 'created_to': created_to,
+                   'client_id': client_id, 'currency': currency}
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith('.part'):
+                os.remove(os.path.join(directory, name))
+
+        manifest = self._load_resumable(directory, fmt, filters) or {
+            'manifest_version': MANIFEST_VERSION,
+            'format': fmt,
+            'filters': filters,
+            'started_at': datetime.now().isoformat(),
+            'datasets': {}
+        }
+        for dataset in datasets:
+            state = manifest['datasets'].setdefault(dataset, {'chunks': [], 'rows': 0, 'cursor': None,
+                                                              'complete': False})
+            if not state['complete']:
+                self._export_dataset(directory, dataset, fmt, filters, rows_per_chunk, manifest, state)
+
+        manifest['completed_at'] = datetime.now().isoformat()
+        self._write_manifest(directory, manifest)
+        with open(os.path.join(directory, CHECKSUM_FILE), 'w', encoding='utf-8') as f:
+            for state in manifest['datasets'].values():
+                for chunk in state['chunks']:
+                    f.write(f"{chunk['sha256']}  {chunk['file']}\n")
+        return manifest
+
+    def _export_dataset(self, directory: str, dataset: str, fmt: str, filters: Dict,
+                        rows_per_chunk: int, manifest: Dict, state: Dict) -> None:
+        columns = DATASET_COLUMNS[dataset]
+        writer, cursor = None, state['cursor']
+
+        def seal():
+            chunk = writer.close()
+            chunk['cursor'] = cursor
+            state['chunks'].append(chunk)
+            state['rows'] += chunk['rows']
+            state['cursor'] = cursor
+            self._write_manifest(directory, manifest)
+
+        for cursor, record in iter_dataset(self.ledger, dataset, filters, state['cursor'], self.page_size):
+            if writer is None:
+                name = f"{dataset}-{len(state['chunks']):05d}.{FORMAT_EXTENSIONS[fmt]}"
+                writer = CHUNK_WRITERS[fmt](os.path.join(directory, name), columns)
+            writer.write(record)
+            if writer.rows >= rows_per_chunk:
+                seal()
+                writer = None
+        if writer is not None:
+            seal()
+        state['complete'] = True
+        self._write_manifest(directory, manifest)
+
+
+def verify_export(directory: str) -> Dict:
+    """Recompute every chunk checksum against the manifest"""
+    with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+    problems = []
+    chunks = rows = 0
+    for dataset, state in manifest['datasets'].items():
+        for chunk in state['chunks']:
+            chunks += 1
+            rows += chunk['rows']
+            path = os.path.join(directory, chunk['file'])
+            if not os.path.exists(path):
+                problems.append({'file': chunk['file'], 'error': 'MISSING'})
+            elif _file_sha256(path) != chunk['sha256']:
+                problems.append({'file': chunk['file'], 'error': 'CHECKSUM_MISMATCH'})
+        if not state['complete']:
+            problems.append({'dataset': dataset, 'error': 'INCOMPLETE'})
+    return {'valid': not problems, 'chunks': chunks, 'rows': rows, 'problems': problems}
+
+
+def check_resume(ledger, directory: str, fmt: str = 'jsonl',
+                 rows_per_chunk: int = DEFAULT_ROWS_PER_CHUNK, **filters) -> Dict:
+    """Round-trip check of resume: export, cut every dataset back to its first chunk, resume, compare
+
+    Each dataset is resumed from the cursor stored with its first chunk, so
+    all four cursor kinds are exercised. The resumed export must reproduce
+    the one-pass export chunk for chunk (same files, same SHA-256).
+    """
+    exporter = AuditExporter(ledger)
+    full_dir, resumed_dir = os.path.join(directory, 'full'), os.path.join(directory, 'resumed')
+    for path in (full_dir, resumed_dir):
+        shutil.rmtree(path, ignore_errors=True)
+
+    full = exporter.export(full_dir, fmt=fmt, rows_per_chunk=rows_per_chunk, **filters)
+    shutil.copytree(full_dir, resumed_dir)
+
+    # Simulate an export interrupted after each dataset's first chunk
+    interrupted = json.loads(json.dumps(full))
+    for state in interrupted['datasets'].values():
+        for chunk in state['chunks'][1:]:
+            os.remove(os.path.join(resumed_dir, chunk['file']))
+        state['chunks'] = state['chunks'][:1]
+        state['rows'] = sum(chunk['rows'] for chunk in state['chunks'])
+        state['cursor'] = state['chunks'][0]['cursor'] if state['chunks'] else None
+        state['complete'] = False
+    interrupted.pop('completed_at', None)
+    exporter._write_manifest(resumed_dir, interrupted)
+
+    problems = []
+    try:
+        resumed = exporter.export(resumed_dir, fmt=fmt, rows_per_chunk=rows_per_chunk, **filters)
+    except (AuditExportError, TypeError, ValueError) as e:
+        return {'valid': False, 'datasets': {}, 'problems': [{'error': 'RESUME_FAILED', 'details': str(e)}]}
+
+    datasets = {}
+    for dataset, state in full['datasets'].items():
+        expected = [(chunk['file'], chunk['sha256']) for chunk in state['chunks']]
+        actual = [(chunk['file'], chunk['sha256']) for chunk in resumed['datasets'][dataset]['chunks']]
+        datasets[dataset] = {'chunks': len(expected), 'rows': state['rows'],
+                             'resumed_from': interrupted['datasets'][dataset]['cursor']}
+        if actual != expected:
+            problems.append({'dataset': dataset, 'error': 'RESUME_MISMATCH'})
+    return {'valid': not problems, 'datasets': datasets, 'problems': problems}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Escrow/USDT audit export')
+    parser.add_argument('--ledger', default='escrow_usdt_ledger.db', help='SQLite ledger path')
+    parser.add_argument('--out', help='export directory (re-use it to resume)')
+    parser.add_argument('--verify', metavar='DIR', help='verify an existing export and exit')
+    parser.add_argument('--check-resume', metavar='DIR',
+                        help='export into DIR twice, once interrupted and resumed, and compare the chunks')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='jsonl')
+    parser.add_argument('--datasets', default=','.join(DATASETS))
+    parser.add_argument('--from', dest='created_from')
+    parser.add_argument('--to', dest='created_to')
+    parser.add_argument('--client-id')
+    parser.add_argument('--currency')
+    parser.add_argument('--rows-per-chunk', type=int, default=DEFAULT_ROWS_PER_CHUNK)
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        report = verify_export(args.verify)
+        print(json.dumps(report, indent=2))
+        return 0 if report['valid'] else 1
+    if not args.out and not args.check_resume:
+        parser.error('--out is required unless --verify or --check-resume is given')
+
+    from escrow_usdt_system.escrow_ledger import SQLiteEscrowLedger
+    ledger = SQLiteEscrowLedger(args.ledger)
+    if args.check_resume:
+        try:
+            report = check_resume(ledger, args.check_resume, fmt=args.format,
+                                  rows_per_chunk=args.rows_per_chunk,
+                                  created_from=args.created_from, created_to=args.created_to,
+                                  client_id=args.client_id, currency=args.currency)
+        finally:
+            ledger.close()
+        print(json.dumps(report, indent=2))
+        return 0 if report['valid'] else 1
+    try:
+        manifest = AuditExporter(ledger).export(
+            args.out,
+            datasets=tuple(name.strip() for name in args.datasets.split(',') if name.strip()),
+            fmt=args.format,
+            created_from=args.created_from,
+            created_to=args.created_to,
+            client_id=args.client_id,
+            currency=args.currency,
+            rows_per_chunk=args.rows_per_chunk
+        )
+    except AuditExportError as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        ledger.close()
+    print(json.dumps({dataset: {'rows': state['rows'], 'chunks': len(state['chunks'])}
+                      for dataset, state in manifest['datasets'].items()}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
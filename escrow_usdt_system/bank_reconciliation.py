@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+BANK RECONCILIATION - Statement ingestion and deposit auto-matching
+Stream-parses camt.053 XML, MT940 and CSV statement exports from drop folders and
+matches incoming credits to pending escrow accounts by reference, or by amount and currency
+when the payer is also the escrow's client
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import bisect
+import csv
+import hashlib
+import os
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from escrow_usdt_system.capacity_reservations import from_units, to_units
+from escrow_usdt_system.sanctions_index import normalize_tokens
+
+STATEMENT_STATE_PREFIX = 'bank_statement:'
+ENTRY_STATE_PREFIX = 'bank_entry:'
+RECEIPT_STATE_PREFIX = 'bank_receipt:'
+
+# Escrow transaction IDs and segregated account numbers as quoted in payment references
+REFERENCE_PATTERN = re.compile(r'ESCROW_[A-Z]{3}_[0-9A-F]{8}|ESC[A-Z]{3}[0-9A-F]{8}')
+
+STATEMENT_EXTENSIONS = {
+    '.xml': 'camt053',
+    '.053': 'camt053',
+    '.sta': 'mt940',
+    '.940': 'mt940',
+    '.mt940': 'mt940',
+    '.csv': 'csv'
+}
+
+# Receipt outcomes
+MATCHED = 'MATCHED'
+PARTIAL = 'PARTIAL'
+OVERPAID = 'OVERPAID'
+UNMATCHED = 'UNMATCHED'
+AMBIGUOUS = 'AMBIGUOUS'
+NEEDS_REVIEW = 'NEEDS_REVIEW'
+IGNORED = 'IGNORED'
+
+# client_info keys holding the client's own bank account identifiers
+CLIENT_ACCOUNT_FIELDS = ('bank_account', 'iban', 'account_number')
+
+
+class StatementFormatError(ValueError):
+    """Raised when a statement file cannot be parsed in the expected format"""
+
+
+@dataclass(frozen=True)
+class ToleranceRule:
+    """How far a received amount may fall short of / exceed the expected deposit
+
+    The allowance in each direction is the larger of the absolute amount and
+    the fraction of the expected deposit. Shortfalls beyond the allowance are
+    held as PARTIAL until further credits arrive; excess beyond it is flagged
+    OVERPAID for manual review instead of auto-confirming.
+    """
+    underpayment_absolute: Decimal = Decimal('25')
+    underpayment_ratio: Decimal = Decimal('0.0005')
+    overpayment_absolute: Decimal = Decimal('25')
+    overpayment_ratio: Decimal = Decimal('0')
+
+    def underpayment_allowance(self, expected: Decimal) -> Decimal:
+        return max(self.underpayment_absolute, expected * self.underpayment_ratio)
+
+    def overpayment_allowance(self, expected: Decimal) -> Decimal:
+        return max(self.overpayment_absolute, expected * self.overpayment_ratio)
+
+
+DEFAULT_TOLERANCE = ToleranceRule()
+
+
+def _entry_id(account: str, fields: Tuple, seen: Dict[str, int]) -> str:
+    """Stable ID for an entry without a bank reference
+
+    Identical lines in one statement are told apart by their occurrence
+    order, so re-ingesting the same file yields the same IDs.
+    """
+    digest = hashlib.sha256('|'.join(str(field) for field in fields).encode()).hexdigest()[:24]
+    occurrence = seen.get(digest, 0)
+    seen[digest] = occurrence + 1
+    return f"{account}:{digest}:{occurrence}"
+
+
+def _account_key(value: str) -> str:
+    return re.sub(r'[^A-Z0-9]', '', value.upper())
+
+
+def _amount(text: str, decimal_comma: bool = False) -> Decimal:
+    """Parse a statement amount; MT940 uses a decimal comma, CSV exports may use thousands separators"""
+    text = text.strip()
+    try:
+        return Decimal(text.replace(',', '.') if decimal_comma else text.replace(',', ''))
+    except InvalidOperation:
+        raise StatementFormatError(f"Invalid amount: {text!r}")
+
+
+# -- parsers ---------------------------------------------------------------
+def parse_camt053(path: str) -> Iterator[Dict]:
+    """Yield entries from an ISO 20022 camt.053 statement, one <Ntry> at a time"""
+
+    def local(tag: str) -> str:
+        return tag.rsplit('}', 1)[-1]
+
+    def find(element, *names) -> Optional[ET.Element]:
+        for name in names:
+            if element is None:
+                return None
+            element = next((child for child in element if local(child.tag) == name), None)
+        return element
+
+    def text(element, *names) -> str:
+        found = find(element, *names)
+        return found.text.strip() if found is not None and found.text else ''
+
+    account, seen = '', {}
+    try:
+        for event, element in ET.iterparse(path, events=('end',)):
+            tag = local(element.tag)
+            if tag == 'Acct' and not account:
+                account = text(element, 'Id', 'IBAN') or text(element, 'Id', 'Othr', 'Id')
+            elif tag == 'Ntry':
+                amount_element = find(element, 'Amt')
+                if amount_element is None or not amount_element.text:
+                    raise StatementFormatError(f"{path}: entry without an amount")
+                amount = _amount(amount_element.text)
+                currency = amount_element.get('Ccy', '').upper()
+                direction = 'CREDIT' if text(element, 'CdtDbtInd') == 'CRDT' else 'DEBIT'
+                booking_date = text(element, 'BookgDt', 'Dt') or text(element, 'BookgDt', 'DtTm')[:10]
+
+                details = find(element, 'NtryDtls', 'TxDtls')
+                references = [
+                    text(details, 'Refs', 'EndToEndId'),
+                    text(details, 'RmtInf', 'Ustrd'),
+                    text(details, 'RmtInf', 'Strd', 'CdtrRefInf', 'Ref'),
+                    text(element, 'AddtlNtryInf')
+                ]
+                reference = ' '.join(value for value in references if value and value != 'NOTPROVIDED')
+                bank_reference = text(element, 'AcctSvcrRef') or text(element, 'NtryRef')
+                # camt.053.001.02 puts the name directly under Dbtr, later versions under Dbtr/Pty
+                payer = text(details, 'RltdPties', 'Dbtr', 'Nm') or text(details, 'RltdPties', 'Dbtr', 'Pty', 'Nm')
+                payer_account = (text(details, 'RltdPties', 'DbtrAcct', 'Id', 'IBAN') or
+                                 text(details, 'RltdPties', 'DbtrAcct', 'Id', 'Othr', 'Id'))
+
+                entry_id = (f"{account}:{bank_reference}" if bank_reference else
+                            _entry_id(account, (booking_date, amount, currency, direction, reference), seen))
+                yield {
+                    'entry_id': entry_id,
+                    'account': account,
+                    'booking_date': booking_date,
+                    'amount': amount,
+                    'currency': currency,
+                    'direction': direction,
+                    'reference': reference,
+                    'bank_reference': bank_reference,
+                    'payer': payer,
+                    'payer_account': payer_account
+                }
+                element.clear()
+            elif tag == 'Stmt':
+                element.clear()
+                account = ''
+    except ET.ParseError as e:
+        raise StatementFormatError(f"{path}: {e}")
+
+
+_MT940_LINE = re.compile(
+    r'(?P<value_date>\d{6})(?P<entry_date>\d{4})?(?P<mark>R?[CD])[A-Z]?'
+    r'(?P<amount>[\d,]+)[NFS][A-Z0-9]{3}(?P<customer_ref>[^/]*)(?://(?P<bank_ref>.*))?'
+)
+
+
+def _mt940_fields(lines: Iterator[str]) -> Iterator[Tuple[str, str]]:
+    """Group MT940 lines into (tag, value) fields, joining continuation lines"""
+    tag, value = None, ''
+    for line in lines:
+        line = line.rstrip('\r\n')
+        match = re.match(r':(\d{2}[A-Z]?):(.*)', line)
+        if match is None:
+            if tag is not None and not line.startswith('-'):
+                value += '\n' + line
+            continue
+        if tag is not None:
+            yield tag, value
+        tag, value = match.group(1), match.group(2)
+    if tag is not None:
+        yield tag, value
+
+
+def parse_mt940(path: str) -> Iterator[Dict]:
+    """Yield entries from a SWIFT MT940 statement, streaming line by line
+
+    Each :61: statement line becomes one entry; the :86: information that
+    follows it is appended to the entry's reference.
+    """
+    account, currency, pending, seen = '', '', None, {}
+
+    def finish(entry: Dict) -> Dict:
+        if entry['bank_reference']:
+            entry['entry_id'] = f"{account}:{entry['bank_reference']}"
+        else:
+            entry['entry_id'] = _entry_id(account, (
+                entry['booking_date'], entry['amount'], entry['currency'], entry['direction'], entry['reference']
+            ), seen)
+        return entry
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for tag, value in _mt940_fields(f):
+            if tag in ('61', '62F', '62M', '20') and pending is not None:
+                yield finish(pending)
+                pending = None
+            if tag == '25':
+                account = value.strip()
+            elif tag in ('60F', '60M'):
+                currency = value[7:10]
+            elif tag == '61':
+                # Subfield 9 (supplementary details) continues on the next line
+                line, _, supplementary = value.partition('\n')
+                match = _MT940_LINE.match(line)
+                if match is None:
+                    raise StatementFormatError(f"{path}: unreadable :61: line {value!r}")
+                # Reversals (RC/RD) move money the opposite way to the entry they reverse
+                direction = 'CREDIT' if match.group('mark') in ('C', 'RD') else 'DEBIT'
+                value_date = match.group('value_date')
+                pending = {
+                    'account': account,
+                    'booking_date': f"20{value_date[:2]}-{value_date[2:4]}-{value_date[4:]}",
+                    'amount': _amount(match.group('amount'), decimal_comma=True),
+                    'currency': currency,
+                    'direction': direction,
+                    'reference': ' '.join(part for part in (
+                        match.group('customer_ref').replace('NONREF', '').strip(), supplementary.strip()
+                    ) if part),
+                    'bank_reference': (match.group('bank_ref') or '').strip(),
+                    # MT940 has no structured payer; the :86: text is checked instead
+                    'payer': '',
+                    'payer_account': ''
+                }
+            elif tag == '86' and pending is not None:
+                pending['reference'] = ' '.join(
+                    part for part in (pending['reference'], value.replace('\n', ' ').strip()) if part
+                )
+    if pending is not None:
+        yield finish(pending)
+
+
+# Header aliases accepted for bank CSV exports
+CSV_COLUMNS = {
+    'booking_date': ('booking_date', 'date', 'value_date', 'posting_date'),
+    'amount': ('amount', 'credit_amount', 'value'),
+    'currency': ('currency', 'ccy'),
+    'reference': ('reference', 'description', 'remittance', 'narrative', 'details'),
+    'bank_reference': ('bank_reference', 'transaction_id', 'entry_id', 'id'),
+    'account': ('account', 'account_number', 'iban'),
+    'direction': ('direction', 'credit_debit', 'type', 'dc'),
+    'payer': ('payer', 'payer_name', 'counterparty', 'counterparty_name', 'debtor', 'remitter', 'ordering_party'),
+    'payer_account': ('payer_account', 'counterparty_account', 'debtor_account', 'debtor_iban')
+}
+
+
+def parse_csv(path: str) -> Iterator[Dict]:
+    """Yield entries from a CSV export; negative amounts or a D/DEBIT column mark debits"""
+
+    seen = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        headers = {name.strip().lower(): name for name in reader.fieldnames or ()}
+        columns = {
+            field: next((headers[alias] for alias in aliases if alias in headers), None)
+            for field, aliases in CSV_COLUMNS.items()
+        }
+        if columns['amount'] is None or columns['currency'] is None:
+            raise StatementFormatError(f"{path}: CSV needs amount and currency columns")
+
+        for row in reader:
+            value = lambda field: (row.get(columns[field]) or '').strip() if columns[field] else ''
+            amount = _amount(value('amount'))
+            marker = value('direction').upper()
+            direction = 'DEBIT' if amount < 0 or marker in ('D', 'DR', 'DBIT', 'DEBIT') else 'CREDIT'
+            account, bank_reference = value('account'), value('bank_reference')
+            entry = {
+                'account': account,
+                'booking_date': value('booking_date'),
+                'amount': abs(amount),
+                'currency': value('currency').upper(),
+                'direction': direction,
+                'reference': value('reference'),
+                'bank_reference': bank_reference,
+                'payer': value('payer'),
+                'payer_account': value('payer_account')
+            }
+            entry['entry_id'] = (f"{account}:{bank_reference}" if bank_reference else _entry_id(account, (
+                entry['booking_date'], entry['amount'], entry['currency'], direction, entry['reference']
+            ), seen))
+            yield entry
+
+
+STATEMENT_PARSERS = {
+    'camt053': parse_camt053,
+    'mt940': parse_mt940,
+    'csv': parse_csv
+}
+
+
+def detect_format(path: str) -> Optional[str]:
+    fmt = STATEMENT_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None and path.lower().endswith('.txt'):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            head = f.read(512)
+        fmt = 'mt940' if ':20:' in head and ':61:' in head else None
+    return fmt
+
+
+# -- matching --------------------------------------------------------------
+class BankReconciliation:
+    """Matches statement credits to PENDING_DEPOSIT escrow accounts
+
+    Credits are matched first by an escrow reference in the payment details
+    (transaction ID or segregated account number), then — for credits with no
+    usable reference — by a pending deposit of the same currency whose amount
+    is within tolerance and whose client is the payer (debtor account, or every
+    name token of the client's full name in the payer name or, failing that,
+    the payment details). An amount-only hit that cannot be tied to the client
+    is left as NEEDS_REVIEW and never confirms a deposit. Processed entry IDs
+    are recorded in the store, so re-ingesting a statement only handles
+    entries not seen before.
+    """
+
+    def __init__(self,
+                 store,
+                 tolerances: Optional[Dict[str, ToleranceRule]] = None,
+                 default_tolerance: ToleranceRule = DEFAULT_TOLERANCE):
+        self.store = store
+        self.tolerances = tolerances or {}
+        self.default_tolerance = default_tolerance
+        self._by_reference: Dict[str, str] = {}
+        self._expected: Dict[str, Tuple[str, Decimal]] = {}
+        # transaction_id -> (client name tokens, client bank account keys)
+        self._payers: Dict[str, Tuple[frozenset, frozenset]] = {}
+        # currency -> sorted [(amount_units, transaction_id)] for reference-less matching
+        self._by_amount: Dict[str, List[Tuple[int, str]]] = {}
+        self.stats = {outcome: 0 for outcome in (MATCHED, PARTIAL, OVERPAID, UNMATCHED, AMBIGUOUS, NEEDS_REVIEW, IGNORED)}
+        self.stats['duplicates'] = 0
+
+    def tolerance(self, currency: str) -> ToleranceRule:
+        return self.tolerances.get(currency, self.default_tolerance)
+
+    def refresh_index(self, page_size: int = 1000) -> int:
+        """Rebuild the match index from PENDING_DEPOSIT accounts; returns the account count"""
+        by_reference, expected, by_amount, payers = {}, {}, {}, {}
+        after = None
+        while True:
+            page = self.store.find_escrow_accounts(status='PENDING_DEPOSIT', after=after, limit=page_size)
+            for account in page:
+                transaction_id = account['transaction_id']
+                by_reference[transaction_id] = transaction_id
+                by_reference[account['account_number']] = transaction_id
+                expected[transaction_id] = (account['currency'], account['amount'])
+                by_amount.setdefault(account['currency'], []).append((to_units(account['amount']), transaction_id))
+                client_info = account.get('client_info') or {}
+                payers[transaction_id] = (
+                    frozenset(normalize_tokens(client_info.get('full_name', ''))),
+                    frozenset(_account_key(str(client_info[field])) for field in CLIENT_ACCOUNT_FIELDS
+                              if client_info.get(field))
+                )
+            if len(page) < page_size:
+                break
+            after = (page[-1]['created_date'], page[-1]['transaction_id'])
+        for bucket in by_amount.values():
+            bucket.sort()
+        self._by_reference, self._expected, self._by_amount, self._payers = by_reference, expected, by_amount, payers
+        return len(expected)
+
+    def _forget(self, transaction_id: str) -> None:
+        currency, amount = self._expected.pop(transaction_id, (None, None))
+        self._payers.pop(transaction_id, None)
+        if currency is None:
+            return
+        bucket = self._by_amount[currency]
+        position = bisect.bisect_left(bucket, (to_units(amount), transaction_id))
+        if position < len(bucket) and bucket[position][1] == transaction_id:
+            del bucket[position]
+
+    def _match_by_reference(self, entry: Dict) -> Optional[str]:
+        for candidate in REFERENCE_PATTERN.findall(entry['reference'].upper().replace(' ', '')):
+            transaction_id = self._by_reference.get(candidate)
+            if transaction_id is not None:
+                return transaction_id
+        return None
+
+    def _paid_by_client(self, entry: Dict, transaction_id: str) -> bool:
+        name_tokens, accounts = self._payers.get(transaction_id, (frozenset(), frozenset()))
+        if entry.get('payer_account') and _account_key(entry['payer_account']) in accounts:
+            return True
+        return bool(name_tokens) and name_tokens <= set(normalize_tokens(entry.get('payer') or entry['reference']))
+
+    def _match_by_amount(self, entry: Dict) -> List[str]:
+        """Pending deposits whose tolerance window contains the credit"""
+        bucket = self._by_amount.get(entry['currency'], [])
+        rule = self.tolerance(entry['currency'])
+        # Widest window any expected amount near this credit could have
+        # Allowances grow with the expected amount; evaluating them at twice the
+        # credit bounds the window for any ratio below 50%
+        slack = to_units(max(rule.underpayment_allowance(entry['amount'] * 2),
+                             rule.overpayment_allowance(entry['amount'] * 2)))
+        units = to_units(entry['amount'])
+        low = bisect.bisect_left(bucket, (units - slack, ''))
+        high = bisect.bisect_left(bucket, (units + slack + 1, ''))
+        matches = []
+        for expected_units, transaction_id in bucket[low:high]:
+            expected = from_units(expected_units)
+            if (expected - rule.underpayment_allowance(expected) <= entry['amount']
+                    <= expected + rule.overpayment_allowance(expected)):
+                matches.append(transaction_id)
+        return matches
+
+    def _apply(self, transaction_id: str, entry: Dict) -> str:
+        currency, expected = self._expected[transaction_id]
+        if entry['currency'] != currency:
+            return UNMATCHED
+        receipt = self.store.get_state(f"{RECEIPT_STATE_PREFIX}{transaction_id}") or {
+            'transaction_id': transaction_id,
+            'currency': currency,
+            'expected_amount': expected,
+            'amount_received': Decimal('0'),
+            'entries': []
+        }
+        receipt['amount_received'] += entry['amount']
+        receipt['entries'].append({
+            'entry_id': entry['entry_id'],
+            'amount': entry['amount'],
+            'booking_date': entry['booking_date'],
+            'bank_reference': entry['bank_reference']
+        })
+
+        rule = self.tolerance(currency)
+        received = receipt['amount_received']
+        if received < expected - rule.underpayment_allowance(expected):
+            status = PARTIAL
+        elif received > expected + rule.overpayment_allowance(expected):
+            status = OVERPAID
+        else:
+            status = MATCHED
+        receipt.update(status=status, variance=received - expected, updated_at=datetime.now().isoformat())
+        self.store.put_state(f"{RECEIPT_STATE_PREFIX}{transaction_id}", receipt)
+        if status != PARTIAL:
+            # Matched or held for review: later credits quoting it are left UNMATCHED for manual handling
+            self._forget(transaction_id)
+        return status
+
+    def match_entry(self, entry: Dict) -> Tuple[str, Optional[str]]:
+        """Match one statement entry; returns (outcome, transaction_id)"""
+        if entry['direction'] != 'CREDIT':
+            return IGNORED, None
+        transaction_id = self._match_by_reference(entry)
+        if transaction_id is not None and transaction_id not in self._expected:
+            return UNMATCHED, transaction_id
+        if transaction_id is None:
+            candidates = self._match_by_amount(entry)
+            paid_by_client = [candidate for candidate in candidates if self._paid_by_client(entry, candidate)]
+            if len(paid_by_client) == 1:
+                transaction_id = paid_by_client[0]
+            elif len(candidates) == 1:
+                # Amount fits but the payer is not the client: a human decides
+                return NEEDS_REVIEW, candidates[0]
+            else:
+                return (AMBIGUOUS if candidates else UNMATCHED), None
+        return self._apply(transaction_id, entry), transaction_id
+
+    # -- ingestion -------------------------------------------------------
+    @staticmethod
+    def _file_signature(path: str) -> Dict:
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def ingest_file(self, path: str, fmt: Optional[str] = None, refresh: bool = True) -> Dict:
+        """Ingest one statement file; unchanged files are skipped, seen entries are not re-applied"""
+        path = os.path.abspath(path)
+        fmt = fmt or detect_format(path)
+        if fmt not in STATEMENT_PARSERS:
+            return {'file': path, 'skipped': True, 'reason': 'UNKNOWN_FORMAT'}
+
+        state_key = f"{STATEMENT_STATE_PREFIX}{path}"
+        signature = self._file_signature(path)
+        if self.store.get_state(state_key) == signature:
+            return {'file': path, 'skipped': True, 'reason': 'UNCHANGED'}
+        if refresh:
+            self.refresh_index()
+
+        summary = {'file': path, 'format': fmt, 'entries': 0, 'new_entries': 0, 'matched': [], 'needs_review': [],
+                   'outcomes': {}}
+        for entry in STATEMENT_PARSERS[fmt](path):
+            summary['entries'] += 1
+            entry_key = f"{ENTRY_STATE_PREFIX}{entry['entry_id']}"
+            if self.store.get_state(entry_key) is not None:
+                self.stats['duplicates'] += 1
+                continue
+
+            outcome, transaction_id = self.match_entry(entry)
+            self.store.put_state(entry_key, {
+                'outcome': outcome,
+                'transaction_id': transaction_id,
+                'amount': entry['amount'],
+                'currency': entry['currency'],
+                'file': path,
+                'processed_at': datetime.now().isoformat()
+            })
+            summary['new_entries'] += 1
+            summary['outcomes'][outcome] = summary['outcomes'].get(outcome, 0) + 1
+            self.stats[outcome] += 1
+            if outcome == MATCHED:
+                summary['matched'].append(transaction_id)
+            elif outcome == NEEDS_REVIEW:
+                summary['needs_review'].append({'entry_id': entry['entry_id'], 'transaction_id': transaction_id})
+
+        self.store.put_state(state_key, signature)
+        return summary
+
+    def ingest_folder(self, folder: str) -> Dict:
+        """Ingest every recognised statement in a drop folder, oldest first"""
+        paths = sorted(
+            (os.path.join(folder, name) for name in os.listdir(folder)
+             if os.path.isfile(os.path.join(folder, name))),
+            key=os.path.getmtime
+        )
+        self.refresh_index()
+        files = [self.ingest_file(path, refresh=False) for path in paths]
+        return {
+            'folder': folder,
+            'files': files,
+            'matched': [tid for summary in files for tid in summary.get('matched', [])],
+            'needs_review': [item for summary in files for item in summary.get('needs_review', [])]
+        }
+
+    def receipt(self, transaction_id: str) -> Optional[Dict]:
+        """Received-funds record for an escrow account, if any credit was matched to it"""
+        return self.store.get_state(f"{RECEIPT_STATE_PREFIX}{transaction_id}")
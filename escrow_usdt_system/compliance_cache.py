@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+COMPLIANCE CACHE - TTL/LRU cache for KYC, AML, OFAC and EDD screening results
+Keyed by a canonical fingerprint of client_info so repeat deposits skip re-screening
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+# Time-to-live per screening check, in seconds
+DEFAULT_CHECK_TTLS = {
+    'kyc': 24 * 3600,
+    'aml': 12 * 3600,
+    'ofac': 3600,
+    'edd': 24 * 3600
+}
+
+DEFAULT_MAX_ENTRIES = 100000
+
+# Amount bands for amount-dependent checks (EDD): ceilings follow a 1-2-5 series per decade
+AMOUNT_BAND_STEPS = (Decimal(1), Decimal(2), Decimal(5))
+
+
+def client_fingerprint(client_info: Dict) -> str:
+    """Canonical SHA-256 fingerprint of a client profile
+
+    Keys are sorted and string values are whitespace-trimmed, so the same
+    profile always maps to the same fingerprint regardless of field order.
+    """
+    normalized = {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in client_info.items()
+    }
+    canonical = json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def amount_band(amount: Decimal) -> Decimal:
+    """Smallest 1-2-5 series ceiling at or above ``amount`` (e.g. 150000 -> 200000)"""
+    amount = Decimal(str(amount))
+    if amount <= 1:
+        return Decimal(1)
+    exponent = amount.adjusted()
+    for step in AMOUNT_BAND_STEPS:
+        ceiling = step.scaleb(exponent)
+        if amount <= ceiling:
+            return ceiling
+    return Decimal(1).scaleb(exponent + 1)
+
+
+class ComplianceCache:
+    """Size-bounded LRU cache of compliance check results with per-check TTLs
+
+    Entries are keyed by (check, fingerprint, scope). OFAC entries are scoped
+    to the sanctions list version. Amount-dependent checks pass an explicit
+    ``scope`` such as an amount band. Every removal, whether by expiry,
+    eviction or invalidation, also prunes the fingerprint and client indexes.
+    """
+
+    def __init__(self,
+                 ttls: Optional[Dict[str, float]] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttls = {**DEFAULT_CHECK_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.sanctions_list_version: Optional[str] = None
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str, Optional[str]], Tuple[float, Dict]]" = OrderedDict()
+        # fingerprint -> live entry keys, and the clients each fingerprint was seen for
+        self._fingerprint_keys: Dict[str, set] = {}
+        self._fingerprint_clients: Dict[str, set] = {}
+        self._client_fingerprints: Dict[str, set] = {}
+        self._in_flight: Dict[Tuple[str, str, Optional[str]], asyncio.Future] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _key(self, check: str, fingerprint: str, scope: Optional[str] = None) -> Tuple[str, str, Optional[str]]:
+        # OFAC results are only valid against the list version they were screened with
+        if check == 'ofac':
+            return (check, fingerprint, self.sanctions_list_version)
+        return (check, fingerprint, scope)
+
+    def _remove(self, key: Tuple[str, str, Optional[str]]) -> bool:
+        if self._entries.pop(key, None) is None:
+            return False
+        fingerprint = key[1]
+        keys = self._fingerprint_keys.get(fingerprint)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._fingerprint_keys[fingerprint]
+                for client_id in self._fingerprint_clients.pop(fingerprint, ()):
+                    fingerprints = self._client_fingerprints.get(client_id)
+                    if fingerprints is not None:
+                        fingerprints.discard(fingerprint)
+                        if not fingerprints:
+                            del self._client_fingerprints[client_id]
+        return True
+
+    def get(self, check: str, fingerprint: str, scope: Optional[str] = None) -> Optional[Dict]:
+        key = self._key(check, fingerprint, scope)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+
+        expires_at, result = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.stats['misses'] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return result
+
+    def put(self, check: str, fingerprint: str, result: Dict, client_id: Optional[str] = None,
+            scope: Optional[str] = None) -> None:
+        key = self._key(check, fingerprint, scope)
+        self._entries[key] = (self._clock() + self.ttls[check], result)
+        self._entries.move_to_end(key)
+        self._fingerprint_keys.setdefault(fingerprint, set()).add(key)
+        if client_id is not None:
+            self._client_fingerprints.setdefault(client_id, set()).add(fingerprint)
+            self._fingerprint_clients.setdefault(fingerprint, set()).add(client_id)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.stats['evictions'] += 1
+
+    async def get_or_compute(self,
+                             check: str,
+                             fingerprint: str,
+                             compute: Callable[[], Awaitable[Dict]],
+                             client_id: Optional[str] = None,
+                             scope: Optional[str] = None) -> Dict:
+        """Return a cached result, computing it once even under concurrent misses"""
+        cached = self.get(check, fingerprint, scope)
+        if cached is not None:
+            return cached
+
+        key = self._key(check, fingerprint, scope)
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            return await pending
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await compute()
+            self.put(check, fingerprint, result, client_id, scope)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited future doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def invalidate_fingerprint(self, fingerprint: str) -> int:
+        """Drop every cached check for one client profile fingerprint"""
+        removed = 0
+        for key in list(self._fingerprint_keys.get(fingerprint, ())):
+            if self._remove(key):
+                removed += 1
+        self.stats['invalidations'] += removed
+        return removed
+
+    def invalidate_client(self, client_id: str) -> int:
+        """Drop cached results for every profile version seen for a client"""
+        removed = 0
+        for fingerprint in list(self._client_fingerprints.get(client_id, ())):
+            removed += self.invalidate_fingerprint(fingerprint)
+        self._client_fingerprints.pop(client_id, None)
+        return removed
+
+    def set_sanctions_list_version(self, version: str) -> int:
+        """Record a new sanctions list version and drop all OFAC results"""
+        if version == self.sanctions_list_version:
+            return 0
+        self.sanctions_list_version = version
+        stale = [key for key in self._entries if key[0] == 'ofac']
+        for key in stale:
+            self._remove(key)
+        self.stats['invalidations'] += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._fingerprint_keys.clear()
+        self._fingerprint_clients.clear()
+        self._client_fingerprints.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+CREDIT BATCH - Columnar credit assessment for pipeline reviews and what-if runs
+Requests are converted once to integers at a common scale fine enough to hold every
+input exactly, priced column-wise with exact integer arithmetic and rounded to cents
+once on the way out
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+from array import array
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple, Union
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CENT = Decimal('0.01')
+CENT_DIGITS = 2
+# LTVs are applied as integer basis points, so collateral * ltv is exact in unit-basis-point terms
+BASIS_POINTS = 10000
+# numpy int64 is used only while every unit-basis-point product stays below this bound
+INT64_SAFE_UNITS = 2 ** 62
+
+APPROVED = 'APPROVED'
+PARTIAL = 'PARTIAL'
+
+INPUT_COLUMNS = ('amount', 'collateral_value', 'include_fiat_backing')
+MONEY_COLUMNS = ('credit_request_amount', 'traditional_tc_capacity', 'fiat_deposit_required',
+                 'enhanced_capacity_with_fiat')
+
+
+def to_cents(value) -> int:
+    """Exact Decimal -> integer cents, rounding half-up at the input boundary"""
+    if type(value) is int:
+        return value * 100
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int(value.quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def to_basis_points(ratio: Decimal) -> int:
+    return int((Decimal(str(ratio)) * BASIS_POINTS).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def _to_decimal(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _fraction_digits(values: Iterable[Decimal]) -> int:
+    """Decimal places needed to hold every value exactly as an integer (at least cents)"""
+    return max([CENT_DIGITS] + [-value.as_tuple().exponent for value in values if value.is_finite()])
+
+
+def _to_units(value: Decimal, digits: int) -> int:
+    """Exact Decimal -> integer units of 10**-digits (``digits`` covers every input)"""
+    return int(value.scaleb(digits))
+
+
+def _round_units(units: int, divisor: int) -> int:
+    """Unit-basis-point values -> cents, half-up (all values here are non-negative)"""
+    return (units + divisor // 2) // divisor
+
+
+def _request_columns(requests: Union[Mapping[str, Sequence], Iterable[Dict]]) -> Dict[str, List]:
+    """Accept a column mapping or an iterable of row dicts; returns raw input columns"""
+    if isinstance(requests, Mapping):
+        columns = {name: list(requests[name]) for name in INPUT_COLUMNS if name in requests}
+        rows = len(columns['amount'])
+        columns.setdefault('collateral_value', [0] * rows)
+        columns.setdefault('include_fiat_backing', [True] * rows)
+        return columns
+    columns = {name: [] for name in INPUT_COLUMNS}
+    for request in requests:
+        columns['amount'].append(request['amount'])
+        columns['collateral_value'].append(request.get('collateral_value', 0))
+        columns['include_fiat_backing'].append(request.get('include_fiat_backing', True))
+    return columns
+
+
+@dataclass(frozen=True)
+class CreditBatchResult:
+    """Assessment results as columns; money columns are ``array('q')`` of integer cents"""
+    columns: Dict[str, Sequence]
+
+    def __len__(self) -> int:
+        return len(self.columns['credit_request_amount'])
+
+    def column(self, name: str) -> List:
+        """One column, with money columns converted to Decimal dollars"""
+        values = self.columns[name]
+        if name in MONEY_COLUMNS:
+            return [Decimal(cents).scaleb(-2) for cents in values]
+        return list(values)
+
+    def to_dict(self) -> Dict[str, List]:
+        return {name: self.column(name) for name in self.columns}
+
+    def rows(self) -> Iterator[Dict]:
+        decoded = self.to_dict()
+        names = list(decoded)
+        for values in zip(*(decoded[name] for name in names)):
+            yield dict(zip(names, values))
+
+    def summary(self) -> Dict:
+        status = self.columns['approval_status']
+        approved = status.count(APPROVED)
+        return {
+            'requests': len(self),
+            'approved': approved,
+            'partial': len(status) - approved,
+            'total_requested': Decimal(sum(self.columns['credit_request_amount'])).scaleb(-2),
+            'total_traditional_capacity': Decimal(sum(self.columns['traditional_tc_capacity'])).scaleb(-2),
+            'total_fiat_deposit_required': Decimal(sum(self.columns['fiat_deposit_required'])).scaleb(-2)
+        }
+
+
+def assess_credit_batch(requests: Union[Mapping[str, Sequence], Iterable[Dict]],
+                        credit_capacity: Decimal,
+                        traditional_ltv: Decimal,
+                        max_fiat_capacity: Decimal,
+                        include_fiat_backing: bool = True) -> CreditBatchResult:
+    """Column-wise equivalent of ``EnhancedTCWithEscrowUSDT.enhanced_credit_assessment``
+
+    Traditional capacity is ``min(collateral * ltv, credit_capacity)``; a
+    request above it gets a fiat top-up for the shortfall when the row allows
+    fiat backing and the shortfall fits the escrow capacity. Inputs are
+    scaled to the finest precision any of them carries (cents at minimum), so
+    sub-cent amounts and collateral are never rounded before the LTV is
+    applied; outputs are rounded to cents (half-up) once, so results match
+    the per-request Decimal path rounded to the cent.
+    """
+    raw = _request_columns(requests)
+    amounts = [_to_decimal(value) for value in raw['amount']]
+    collaterals = [_to_decimal(value) for value in raw['collateral_value']]
+    limits = [_to_decimal(credit_capacity), _to_decimal(max_fiat_capacity)]
+    allow_fiat = [bool(flag) and include_fiat_backing for flag in raw['include_fiat_backing']]
+
+    digits = _fraction_digits(amounts + collaterals + limits)
+    amount = [_to_units(value, digits) for value in amounts]
+    collateral = [_to_units(value, digits) for value in collaterals]
+    ltv_bp = to_basis_points(traditional_ltv)
+    capacity_units = _to_units(limits[0], digits) * BASIS_POINTS
+    fiat_capacity_units = _to_units(limits[1], digits) * BASIS_POINTS
+    # Unit-basis-point values per output cent
+    divisor = 10 ** (digits - CENT_DIGITS) * BASIS_POINTS
+
+    largest = max(max(amount, default=0), max(collateral, default=0), capacity_units // BASIS_POINTS,
+                  fiat_capacity_units // BASIS_POINTS) * max(ltv_bp, BASIS_POINTS) * 2
+    if numpy is not None and largest < INT64_SAFE_UNITS:
+        money, fiat_available, approved = _assess_numpy(
+            amount, collateral, allow_fiat, ltv_bp, capacity_units, fiat_capacity_units, divisor
+        )
+    else:
+        money, fiat_available, approved = _assess_python(
+            amount, collateral, allow_fiat, ltv_bp, capacity_units, fiat_capacity_units, divisor
+        )
+
+    return CreditBatchResult({
+        'credit_request_amount': array('q', (to_cents(value) for value in amounts)),
+        **money,
+        'fiat_backing_available': fiat_available,
+        'approval_status': [APPROVED if ok else PARTIAL for ok in approved]
+    })
+
+
+def _assess_python(amount, collateral, allow_fiat, ltv_bp, capacity_units, fiat_capacity_units,
+                   divisor) -> Tuple[Dict[str, array], List[bool], List[bool]]:
+    # Work in unit-basis-point values so the LTV product is never rounded mid-calculation
+    amount_units = [cents * BASIS_POINTS for cents in amount]
+    traditional_units = [min(cents * ltv_bp, capacity_units) for cents in collateral]
+    shortfall_units = [max(requested - traditional, 0)
+                       for requested, traditional in zip(amount_units, traditional_units)]
+    fiat_units = [shortfall if allowed and shortfall <= fiat_capacity_units else 0
+                  for shortfall, allowed in zip(shortfall_units, allow_fiat)]
+    enhanced_units = [traditional + fiat for traditional, fiat in zip(traditional_units, fiat_units)]
+    return (
+        {
+            'traditional_tc_capacity': array('q', (_round_units(units, divisor) for units in traditional_units)),
+            'fiat_deposit_required': array('q', (_round_units(units, divisor) for units in fiat_units)),
+            'enhanced_capacity_with_fiat': array('q', (_round_units(units, divisor) for units in enhanced_units))
+        },
+        [fiat > 0 for fiat in fiat_units],
+        [enhanced >= requested for enhanced, requested in zip(enhanced_units, amount_units)]
+    )
+
+
+def _assess_numpy(amount, collateral, allow_fiat, ltv_bp, capacity_units, fiat_capacity_units,
+                  divisor) -> Tuple[Dict[str, array], List[bool], List[bool]]:
+    amount_units = numpy.array(amount, dtype=numpy.int64) * BASIS_POINTS
+    traditional_units = numpy.minimum(numpy.array(collateral, dtype=numpy.int64) * ltv_bp, capacity_units)
+    shortfall_units = numpy.maximum(amount_units - traditional_units, 0)
+    fiat_units = numpy.where(
+        numpy.array(allow_fiat, dtype=bool) & (shortfall_units <= fiat_capacity_units), shortfall_units, 0
+    )
+    enhanced_units = traditional_units + fiat_units
+
+    def cents(units) -> array:
+        column = array('q')
+        column.frombytes(((units + divisor // 2) // divisor).astype(numpy.int64).tobytes())
+        return column
+
+    return (
+        {
+            'traditional_tc_capacity': cents(traditional_units),
+            'fiat_deposit_required': cents(fiat_units),
+            'enhanced_capacity_with_fiat': cents(enhanced_units)
+        },
+        (fiat_units > 0).tolist(),
+        (enhanced_units >= amount_units).tolist()
+    )
@@ -0,0 +1,1214 @@
+#!/usr/bin/env python3
+"""
+ESCROW LEDGER - Durable storage for escrow accounts, issuances and transactions
+Pluggable backends: SQLite (WAL mode, default) and in-memory (tests/demos)
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import bisect
+import gzip
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from escrow_usdt_system.compliance_cache import client_fingerprint
+from escrow_usdt_system.escrow_records import ClientProfileStore, EscrowAccountRecord, IssuanceRecord
+
+# Default on-disk location for the SQLite ledger (relative to the working directory)
+DEFAULT_LEDGER_PATH = 'escrow_usdt_ledger.db'
+
+# Fields that get a secondary index on escrow accounts
+ESCROW_INDEX_FIELDS = ('client_id', 'status', 'currency')
+
+
+def _json_default(value):
+    """Encode Decimal values losslessly so amounts survive a round trip"""
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_object_hook(obj: Dict):
+    if len(obj) == 1 and '__decimal__' in obj:
+        return Decimal(obj['__decimal__'])
+    return obj
+
+
+def encode_record(record: Dict) -> str:
+    """Serialize a ledger record to JSON, preserving Decimal precision"""
+    return json.dumps(record, default=_json_default, sort_keys=True)
+
+
+def decode_record(payload: str) -> Dict:
+    """Deserialize a ledger record produced by encode_record"""
+    return json.loads(payload, object_hook=_json_object_hook)
+
+
+def encode_snapshot(states: Dict[str, str]) -> bytes:
+    """Compress a {transaction_id: status} map for snapshot storage"""
+    return gzip.compress(json.dumps(states, separators=(',', ':')).encode(), compresslevel=6)
+
+
+def decode_snapshot(payload: bytes) -> Dict[str, str]:
+    return json.loads(gzip.decompress(payload))
+
+
+class EscrowLedger(ABC):
+    """Storage interface used by EscrowUSDTCore
+
+    Records are plain dicts. Reads always return copies, so callers must
+    persist changes through the update methods rather than mutating results.
+    Listing methods return rows ordered by (created_date, transaction_id) and
+    accept an ``after`` cursor of that same tuple for keyset pagination.
+    """
+
+    # -- escrow accounts -------------------------------------------------
+    @abstractmethod
+    def put_escrow_account(self, account: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def get_escrow_account(self, transaction_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def update_escrow_account(self, transaction_id: str, changes: Dict) -> Optional[Dict]:
+        ...
+
+    def has_escrow_account(self, transaction_id: str) -> bool:
+        return self.get_escrow_account(transaction_id) is not None
+
+    @abstractmethod
+    def find_escrow_accounts(self,
+                             client_id: Optional[str] = None,
+                             status: Optional[str] = None,
+                             currency: Optional[str] = None,
+                             created_from: Optional[str] = None,
+                             created_to: Optional[str] = None,
+                             after: Optional[Tuple[str, str]] = None,
+                             limit: Optional[int] = None) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def count_escrow_accounts(self,
+                              client_id: Optional[str] = None,
+                              status: Optional[str] = None,
+                              currency: Optional[str] = None) -> int:
+        ...
+
+    @abstractmethod
+    def get_client_profile(self, client_id: str) -> Optional[Dict]:
+        """Most recent client_info stored for a client"""
+
+    # -- USDT issuances --------------------------------------------------
+    @abstractmethod
+    def put_issuance(self, issuance: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def get_issuance(self, transaction_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def find_issuances(self,
+                       client_id: Optional[str] = None,
+                       created_from: Optional[str] = None,
+                       created_to: Optional[str] = None,
+                       after: Optional[Tuple[str, str]] = None,
+                       limit: Optional[int] = None) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def count_issuances(self) -> int:
+        ...
+
+    # -- attestations ----------------------------------------------------
+    @abstractmethod
+    def put_attestation(self, attestation: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def get_attestation(self, transaction_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def find_attestations(self,
+                          created_from: Optional[str] = None,
+                          created_to: Optional[str] = None,
+                          after: Optional[Tuple[str, str]] = None,
+                          limit: Optional[int] = None) -> List[Dict]:
+        ...
+
+    # -- transaction log -------------------------------------------------
+    @abstractmethod
+    def append_transaction(self, entry: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def iter_transactions(self, after_sequence: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[int, Dict]]:
+        ...
+
+    @abstractmethod
+    def count_transactions(self) -> int:
+        ...
+
+    # -- system state ----------------------------------------------------
+    @abstractmethod
+    def get_state(self, key: str) -> Optional[Dict]:
+        """Read a named piece of system state (e.g. running totals)"""
+
+    @abstractmethod
+    def put_state(self, key: str, value: Dict) -> None:
+        ...
+
+    @abstractmethod
+    def update_state(self, key: str, update: Callable[[Optional[Dict]], Dict]) -> Dict:
+        """Atomically replace state ``key`` with ``update(current)``; returns the stored value
+
+        The read and the write happen under one write lock, so concurrent
+        writers (threads or processes) apply their changes in turn.
+        """
+
+    # -- escrow state events ---------------------------------------------
+    @abstractmethod
+    def append_escrow_event(self, event: Dict) -> int:
+        """Append a state-transition event; returns its sequence number"""
+
+    @abstractmethod
+    def _write_transaction(self, work: Callable[[], Dict]) -> Dict:
+        """Run ``work()`` holding the store's write lock; nested calls join the open transaction"""
+
+    def transition_escrow_account(self,
+                                  event: Dict,
+                                  allowed_from: Iterable[Optional[str]],
+                                  changes: Optional[Dict] = None,
+                                  capacity: Optional[Dict] = None) -> Dict:
+        """Check, record and apply one escrow state change in a single write transaction
+
+        The account's stored status (None before it exists) must be in
+        ``allowed_from``. The event is appended with that ``from_status`` and
+        the current time as ``occurred_at``,
+        the account gets ``changes`` plus the new status, and ``capacity``
+        (see ``_apply_capacity_change``) moves its reservation. Returns
+        {'success': True, 'event', 'account'}, or {'success': False, 'error',
+        'from_status'} with ILLEGAL_STATE_TRANSITION or CAPACITY_EXHAUSTED,
+        in which case nothing was written.
+        """
+        transaction_id = event['transaction_id']
+
+        def work() -> Dict:
+            account = self.get_escrow_account(transaction_id)
+            from_status = account['status'] if account is not None else None
+            if from_status not in allowed_from:
+                return {'success': False, 'error': 'ILLEGAL_STATE_TRANSITION', 'from_status': from_status}
+            if capacity is not None and not self._apply_capacity_change(capacity):
+                return {'success': False, 'error': 'CAPACITY_EXHAUSTED', 'from_status': from_status}
+            # Stamped under the write lock so occurred_at follows sequence order across processes
+            recorded = {**event, 'from_status': from_status, 'occurred_at': datetime.now().isoformat()}
+            recorded['sequence'] = self.append_escrow_event(recorded)
+            if account is not None:
+                account = self.update_escrow_account(transaction_id, {**(changes or {}), 'status': event['to_status']})
+            return {'success': True, 'event': recorded, 'account': account}
+
+        return self._write_transaction(work)
+
+    def _apply_capacity_change(self, capacity: Dict) -> bool:
+        """{'commit': id, 'renewal': (id, currency, units, expires_at)} or {'release': (id, ...)}
+
+        A commit converts the hold, or reserves and commits the renewal if the
+        hold lapsed; False when that does not fit the limit. A release returns
+        the first of the IDs still HELD or COMMITTED.
+        """
+        if 'commit' in capacity:
+            if self.commit_capacity(capacity['commit']):
+                return True
+            renewal_id, currency, units, expires_at = capacity['renewal']
+            return (self.commit_capacity(renewal_id)
+                    or (self.reserve_capacity(renewal_id, currency, units, expires_at)
+                        and self.commit_capacity(renewal_id)))
+        for reservation_id in capacity.get('release', ()):
+            if self.release_capacity(reservation_id):
+                break
+        return True
+
+    @abstractmethod
+    def iter_escrow_events(self,
+                           after_sequence: int = 0,
+                           transaction_id: Optional[str] = None,
+                           limit: Optional[int] = None) -> Iterator[Dict]:
+        """Events in sequence order, each carrying its ``sequence``"""
+
+    @abstractmethod
+    def put_escrow_snapshot(self, last_sequence: int, last_occurred_at: str, states: Dict[str, str]) -> None:
+        ...
+
+    @abstractmethod
+    def get_escrow_snapshot(self, at_or_before: Optional[str] = None) -> Optional[Dict]:
+        """Latest snapshot whose last event occurred at or before ``at_or_before``
+
+        Returns {'last_sequence', 'last_occurred_at', 'states'} or None.
+        """
+
+    # -- capacity reservations -------------------------------------------
+    # Amounts are integer minor units so limits can be enforced in one SQL statement
+
+    @abstractmethod
+    def set_capacity_limit(self, currency: str, limit_units: int) -> None:
+        ...
+
+    @abstractmethod
+    def reserve_capacity(self, reservation_id: str, currency: str, units: int, expires_at: float) -> bool:
+        """Atomically hold ``units`` if reserved + committed stays within the limit"""
+
+    @abstractmethod
+    def commit_capacity(self, reservation_id: str) -> bool:
+        """Convert a HELD reservation to COMMITTED; False if it is missing, expired or released"""
+
+    @abstractmethod
+    def release_capacity(self, reservation_id: str) -> bool:
+        """Return a HELD or COMMITTED reservation's units to the pool"""
+
+    @abstractmethod
+    def release_committed_units(self, reservation_id: str, units: int,
+                                escrow_id: Optional[str] = None, escrow_status: Optional[str] = None) -> int:
+        """Return up to ``units`` of a COMMITTED reservation to the pool; returns the units released
+
+        A reservation drawn down to zero becomes RELEASED. With ``escrow_id``,
+        nothing is released unless that escrow account is in ``escrow_status``,
+        checked in the same write transaction.
+        """
+
+    @abstractmethod
+    def expire_capacity_reservations(self, now: float, limit: int = 1000) -> List[str]:
+        """Release HELD reservations past their expiry; returns their IDs"""
+
+    @abstractmethod
+    def get_capacity_usage(self, currency: str) -> Optional[Dict]:
+        """{'limit_units', 'reserved_units', 'committed_units'} for a currency"""
+
+    # -- netting requests ------------------------------------------------
+    @abstractmethod
+    def put_netting_request(self, request: Dict) -> None:
+        """Store one queued mint/burn request (keyed by request_id) until its settlement is recorded"""
+
+    @abstractmethod
+    def iter_netting_requests(self) -> Iterator[Dict]:
+        """Queued netting requests in submitted_at order"""
+
+    @abstractmethod
+    def delete_netting_requests(self, request_ids: List[str]) -> None:
+        ...
+
+    # -- idempotency keys ------------------------------------------------
+    @abstractmethod
+    def claim_idempotency_key(self, key: str, request_hash: str, expires_at: float, now: float) -> Optional[Dict]:
+        """Atomically claim ``key`` as IN_PROGRESS until ``expires_at``
+
+        Returns None when the claim succeeded, otherwise the live entry
+        (request_hash, status and, once completed, response) holding the key.
+        Expired entries are treated as absent.
+        """
+
+    @abstractmethod
+    def complete_idempotency_key(self, key: str, response: Dict, expires_at: float) -> None:
+        ...
+
+    @abstractmethod
+    def release_idempotency_key(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def purge_idempotency_keys(self, now: float) -> int:
+        """Delete expired idempotency entries; returns how many were removed"""
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryEscrowLedger(EscrowLedger):
+    """Process-local ledger with the same indexes as the SQLite backend"""
+
+    def __init__(self):
+        # Accounts and issuances are held as slotted records; reads rebuild the dicts
+        self.client_profiles = ClientProfileStore()
+        self._accounts: Dict[str, EscrowAccountRecord] = {}
+        self._account_index: Dict[str, Dict[str, set]] = {field: {} for field in ESCROW_INDEX_FIELDS}
+        self._account_order: List[Tuple[str, str]] = []
+        self._issuances: Dict[str, IssuanceRecord] = {}
+        self._issuance_order: List[Tuple[str, str]] = []
+        self._issuance_client_index: Dict[str, set] = {}
+        self._attestations: Dict[str, Dict] = {}
+        self._attestation_order: List[Tuple[str, str]] = []
+        self._transactions: List[Dict] = []
+        self._state: Dict[str, str] = {}
+        self._idempotency: Dict[str, Dict] = {}
+        self._netting_requests: Dict[str, Dict] = {}
+        self._escrow_events: List[Dict] = []
+        self._escrow_snapshots: List[Tuple[str, int, bytes]] = []
+        self._capacity: Dict[str, Dict[str, int]] = {}
+        self._capacity_reservations: Dict[str, Dict] = {}
+        # Held across a whole escrow transition, so it is re-entrant
+        self._capacity_lock = threading.RLock()
+        self._state_lock = threading.Lock()
+
+    @staticmethod
+    def _order_key(record, date_field: str) -> Tuple[str, str]:
+        return (record.get(date_field, ''), record.get('transaction_id'))
+
+    def _index_account(self, account: EscrowAccountRecord) -> None:
+        for field in ESCROW_INDEX_FIELDS:
+            self._account_index[field].setdefault(account.get(field), set()).add(account.transaction_id)
+
+    def _unindex_account(self, account: EscrowAccountRecord) -> None:
+        for field in ESCROW_INDEX_FIELDS:
+            bucket = self._account_index[field].get(account.get(field))
+            if bucket is not None:
+                bucket.discard(account.transaction_id)
+                if not bucket:
+                    del self._account_index[field][account.get(field)]
+
+    def _store_account(self, stored: EscrowAccountRecord) -> None:
+        existing = self._accounts.get(stored.transaction_id)
+        if existing is not None:
+            self._unindex_account(existing)
+            position = bisect.bisect_left(self._account_order, self._order_key(existing, 'created_date'))
+            del self._account_order[position]
+        self._accounts[stored.transaction_id] = stored
+        self._index_account(stored)
+        bisect.insort(self._account_order, self._order_key(stored, 'created_date'))
+
+    def _account_dict(self, account: EscrowAccountRecord) -> Dict:
+        return account.to_account(self.client_profiles)
+
+    def put_escrow_account(self, account: Dict) -> None:
+        self._store_account(EscrowAccountRecord.from_account(account, self.client_profiles))
+
+    def get_escrow_account(self, transaction_id: str) -> Optional[Dict]:
+        account = self._accounts.get(transaction_id)
+        return self._account_dict(account) if account is not None else None
+
+    def has_escrow_account(self, transaction_id: str) -> bool:
+        return transaction_id in self._accounts
+
+    def update_escrow_account(self, transaction_id: str, changes: Dict) -> Optional[Dict]:
+        account = self._accounts.get(transaction_id)
+        if account is None:
+            return None
+        # Merge at record level so the interned profile reference is kept as is
+        updated = EscrowAccountRecord.from_account({**account.to_dict(), **changes}, self.client_profiles)
+        self._store_account(updated)
+        return self._account_dict(updated)
+
+    def _candidate_ids(self, filters: Dict) -> Optional[set]:
+        candidates = None
+        for field, value in filters.items():
+            if value is None:
+                continue
+            bucket = self._account_index[field].get(value, set())
+            candidates = set(bucket) if candidates is None else candidates & bucket
+        return candidates
+
+    def _scan_ordered(self, order: List[Tuple[str, str]], records: Dict,
+                      candidates: Optional[set], created_from: Optional[str],
+                      created_to: Optional[str], after: Optional[Tuple[str, str]],
+                      limit: Optional[int], materialize=dict) -> List[Dict]:
+        position = bisect.bisect_left(order, (created_from, '')) if created_from is not None else 0
+        if after is not None:
+            position = max(position, bisect.bisect_right(order, tuple(after)))
+
+        results = []
+        for created, transaction_id in order[position:]:
+            if created_to is not None and created > created_to:
+                break
+            if candidates is not None and transaction_id not in candidates:
+                continue
+            results.append(materialize(records[transaction_id]))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def find_escrow_accounts(self, client_id=None, status=None, currency=None,
+                             created_from=None, created_to=None, after=None, limit=None) -> List[Dict]:
+        candidates = self._candidate_ids({'client_id': client_id, 'status': status, 'currency': currency})
+        return self._scan_ordered(self._account_order, self._accounts, candidates,
+                                  created_from, created_to, after, limit, self._account_dict)
+
+    def count_escrow_accounts(self, client_id=None, status=None, currency=None) -> int:
+        candidates = self._candidate_ids({'client_id': client_id, 'status': status, 'currency': currency})
+        return len(self._accounts) if candidates is None else len(candidates)
+
+    def get_client_profile(self, client_id: str) -> Optional[Dict]:
+        return self.client_profiles.latest(client_id)
+
+    def put_issuance(self, issuance: Dict) -> None:
+        transaction_id = issuance['transaction_id']
+        existing = self._issuances.get(transaction_id)
+        if existing is not None:
+            position = bisect.bisect_left(self._issuance_order, self._order_key(existing, 'issuance_date'))
+            del self._issuance_order[position]
+        stored = IssuanceRecord(issuance)
+        self._issuances[transaction_id] = stored
+        self._issuance_client_index.setdefault(stored.get('client_id'), set()).add(transaction_id)
+        bisect.insort(self._issuance_order, self._order_key(stored, 'issuance_date'))
+
+    def get_issuance(self, transaction_id: str) -> Optional[Dict]:
+        issuance = self._issuances.get(transaction_id)
+        return issuance.to_dict() if issuance is not None else None
+
+    def find_issuances(self, client_id=None, created_from=None, created_to=None,
+                       after=None, limit=None) -> List[Dict]:
+        candidates = None
+        if client_id is not None:
+            candidates = self._issuance_client_index.get(client_id, set())
+        return self._scan_ordered(self._issuance_order, self._issuances, candidates,
+                                  created_from, created_to, after, limit, IssuanceRecord.to_dict)
+
+    def count_issuances(self) -> int:
+        return len(self._issuances)
+
+    def put_attestation(self, attestation: Dict) -> None:
+        transaction_id = attestation['transaction_id']
+        existing = self._attestations.get(transaction_id)
+        if existing is not None:
+            position = bisect.bisect_left(self._attestation_order,
+                                          self._order_key(existing, 'attestation_timestamp'))
+            del self._attestation_order[position]
+        stored = dict(attestation)
+        self._attestations[transaction_id] = stored
+        bisect.insort(self._attestation_order, self._order_key(stored, 'attestation_timestamp'))
+
+    def get_attestation(self, transaction_id: str) -> Optional[Dict]:
+        attestation = self._attestations.get(transaction_id)
+        return dict(attestation) if attestation is not None else None
+
+    def find_attestations(self, created_from=None, created_to=None, after=None, limit=None) -> List[Dict]:
+        return self._scan_ordered(self._attestation_order, self._attestations, None,
+                                  created_from, created_to, after, limit)
+
+    def append_transaction(self, entry: Dict) -> None:
+        self._transactions.append(dict(entry))
+
+    def iter_transactions(self, after_sequence: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[int, Dict]]:
+        stop = len(self._transactions) if limit is None else min(len(self._transactions), after_sequence + limit)
+        for sequence in range(after_sequence + 1, stop + 1):
+            yield sequence, dict(self._transactions[sequence - 1])
+
+    def count_transactions(self) -> int:
+        return len(self._transactions)
+
+    def get_state(self, key: str) -> Optional[Dict]:
+        payload = self._state.get(key)
+        return decode_record(payload) if payload is not None else None
+
+    def put_state(self, key: str, value: Dict) -> None:
+        self._state[key] = encode_record(value)
+
+    def update_state(self, key: str, update: Callable[[Optional[Dict]], Dict]) -> Dict:
+        with self._state_lock:
+            value = update(self.get_state(key))
+            self.put_state(key, value)
+            return value
+
+    def _write_transaction(self, work: Callable[[], Dict]) -> Dict:
+        with self._capacity_lock:
+            return work()
+
+    def append_escrow_event(self, event: Dict) -> int:
+        sequence = len(self._escrow_events) + 1
+        self._escrow_events.append({**event, 'sequence': sequence})
+        return sequence
+
+    def iter_escrow_events(self, after_sequence: int = 0, transaction_id: Optional[str] = None,
+                           limit: Optional[int] = None) -> Iterator[Dict]:
+        yielded = 0
+        for event in self._escrow_events[after_sequence:]:
+            if limit is not None and yielded >= limit:
+                return
+            if transaction_id is None or event['transaction_id'] == transaction_id:
+                yielded += 1
+                yield dict(event)
+
+    def put_escrow_snapshot(self, last_sequence: int, last_occurred_at: str, states: Dict[str, str]) -> None:
+        self._escrow_snapshots.append((last_occurred_at, last_sequence, encode_snapshot(states)))
+
+    def get_escrow_snapshot(self, at_or_before: Optional[str] = None) -> Optional[Dict]:
+        for last_occurred_at, last_sequence, payload in reversed(self._escrow_snapshots):
+            if at_or_before is None or last_occurred_at <= at_or_before:
+                return {'last_sequence': last_sequence, 'last_occurred_at': last_occurred_at,
+                        'states': decode_snapshot(payload)}
+        return None
+
+    def set_capacity_limit(self, currency: str, limit_units: int) -> None:
+        with self._capacity_lock:
+            usage = self._capacity.setdefault(currency, {'reserved_units': 0, 'committed_units': 0})
+            usage['limit_units'] = limit_units
+
+    def reserve_capacity(self, reservation_id: str, currency: str, units: int, expires_at: float) -> bool:
+        with self._capacity_lock:
+            usage = self._capacity.get(currency)
+            if usage is None or reservation_id in self._capacity_reservations:
+                return False
+            if usage['reserved_units'] + usage['committed_units'] + units > usage['limit_units']:
+                return False
+            usage['reserved_units'] += units
+            self._capacity_reservations[reservation_id] = {
+                'currency': currency, 'units': units, 'status': 'HELD', 'expires_at': expires_at
+            }
+            return True
+
+    def commit_capacity(self, reservation_id: str) -> bool:
+        with self._capacity_lock:
+            reservation = self._capacity_reservations.get(reservation_id)
+            if reservation is None or reservation['status'] != 'HELD':
+                return False
+            usage = self._capacity[reservation['currency']]
+            usage['reserved_units'] -= reservation['units']
+            usage['committed_units'] += reservation['units']
+            reservation['status'] = 'COMMITTED'
+            return True
+
+    def release_capacity(self, reservation_id: str) -> bool:
+        with self._capacity_lock:
+            reservation = self._capacity_reservations.get(reservation_id)
+            if reservation is None or reservation['status'] not in ('HELD', 'COMMITTED'):
+                return False
+            field = 'reserved_units' if reservation['status'] == 'HELD' else 'committed_units'
+            self._capacity[reservation['currency']][field] -= reservation['units']
+            reservation['status'] = 'RELEASED'
+            return True
+
+    def release_committed_units(self, reservation_id: str, units: int,
+                                escrow_id: Optional[str] = None, escrow_status: Optional[str] = None) -> int:
+        with self._capacity_lock:
+            reservation = self._capacity_reservations.get(reservation_id)
+            if reservation is None or reservation['status'] != 'COMMITTED':
+                return 0
+            if escrow_id is not None:
+                account = self._accounts.get(escrow_id)
+                if account is None or account.get('status') != escrow_status:
+                    return 0
+            released = min(units, reservation['units'])
+            self._capacity[reservation['currency']]['committed_units'] -= released
+            reservation['units'] -= released
+            if not reservation['units']:
+                reservation['status'] = 'RELEASED'
+            return released
+
+    def expire_capacity_reservations(self, now: float, limit: int = 1000) -> List[str]:
+        with self._capacity_lock:
+            expired = [
+                reservation_id for reservation_id, reservation in self._capacity_reservations.items()
+                if reservation['status'] == 'HELD' and reservation['expires_at'] <= now
+            ][:limit]
+            for reservation_id in expired:
+                reservation = self._capacity_reservations[reservation_id]
+                self._capacity[reservation['currency']]['reserved_units'] -= reservation['units']
+                reservation['status'] = 'EXPIRED'
+            return expired
+
+    def get_capacity_usage(self, currency: str) -> Optional[Dict]:
+        usage = self._capacity.get(currency)
+        return dict(usage) if usage is not None else None
+
+    def put_netting_request(self, request: Dict) -> None:
+        self._netting_requests[request['request_id']] = encode_record(request)
+
+    def iter_netting_requests(self) -> Iterator[Dict]:
+        requests = [decode_record(payload) for payload in list(self._netting_requests.values())]
+        return iter(sorted(requests, key=lambda request: (request['submitted_at'], request['request_id'])))
+
+    def delete_netting_requests(self, request_ids: List[str]) -> None:
+        for request_id in request_ids:
+            self._netting_requests.pop(request_id, None)
+
+    def claim_idempotency_key(self, key: str, request_hash: str, expires_at: float, now: float) -> Optional[Dict]:
+        entry = self._idempotency.get(key)
+        if entry is not None and entry['expires_at'] > now:
+            return decode_record(encode_record(entry))
+        self._idempotency[key] = {'request_hash': request_hash, 'status': 'IN_PROGRESS',
+                                  'response': None, 'expires_at': expires_at}
+        return None
+
+    def complete_idempotency_key(self, key: str, response: Dict, expires_at: float) -> None:
+        entry = self._idempotency.get(key)
+        if entry is not None:
+            entry.update(status='COMPLETED', response=decode_record(encode_record(response)), expires_at=expires_at)
+
+    def release_idempotency_key(self, key: str) -> None:
+        self._idempotency.pop(key, None)
+
+    def purge_idempotency_keys(self, now: float) -> int:
+        expired = [key for key, entry in self._idempotency.items() if entry['expires_at'] <= now]
+        for key in expired:
+            del self._idempotency[key]
+        return len(expired)
+
+
+class SQLiteEscrowLedger(EscrowLedger):
+    """SQLite-backed ledger in WAL mode with B-tree secondary indexes"""
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS escrow_accounts (
+               transaction_id TEXT PRIMARY KEY,
+               client_id TEXT NOT NULL,
+               status TEXT NOT NULL,
+               currency TEXT NOT NULL,
+               created_date TEXT NOT NULL,
+               record TEXT NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_escrow_client ON escrow_accounts (client_id, created_date, transaction_id)",
+        "CREATE INDEX IF NOT EXISTS idx_escrow_status ON escrow_accounts (status, created_date, transaction_id)",
+        "CREATE INDEX IF NOT EXISTS idx_escrow_currency ON escrow_accounts (currency, created_date, transaction_id)",
+        "CREATE INDEX IF NOT EXISTS idx_escrow_created ON escrow_accounts (created_date, transaction_id)",
+        """CREATE TABLE IF NOT EXISTS client_profiles (
+               fingerprint TEXT PRIMARY KEY,
+               record TEXT NOT NULL
+           )""",
+        """CREATE TABLE IF NOT EXISTS usdt_issuances (
+               transaction_id TEXT PRIMARY KEY,
+               client_id TEXT,
+               issuance_date TEXT NOT NULL,
+               record TEXT NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_issuance_client ON usdt_issuances (client_id, issuance_date, transaction_id)",
+        "CREATE INDEX IF NOT EXISTS idx_issuance_date ON usdt_issuances (issuance_date, transaction_id)",
+        """CREATE TABLE IF NOT EXISTS attestations (
+               transaction_id TEXT PRIMARY KEY,
+               attestation_timestamp TEXT NOT NULL,
+               record TEXT NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_attestation_time ON attestations (attestation_timestamp, transaction_id)",
+        """CREATE TABLE IF NOT EXISTS transaction_log (
+               sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+               record TEXT NOT NULL
+           )""",
+        """CREATE TABLE IF NOT EXISTS system_state (
+               key TEXT PRIMARY KEY,
+               record TEXT NOT NULL
+           )""",
+        """CREATE TABLE IF NOT EXISTS escrow_events (
+               sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+               transaction_id TEXT NOT NULL,
+               occurred_at TEXT NOT NULL,
+               record TEXT NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_escrow_events_account ON escrow_events (transaction_id, sequence)",
+        """CREATE TABLE IF NOT EXISTS escrow_snapshots (
+               last_sequence INTEGER PRIMARY KEY,
+               last_occurred_at TEXT NOT NULL,
+               states BLOB NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_escrow_snapshots_time ON escrow_snapshots (last_occurred_at)",
+        """CREATE TABLE IF NOT EXISTS capacity_pools (
+               currency TEXT PRIMARY KEY,
+               limit_units INTEGER NOT NULL,
+               reserved_units INTEGER NOT NULL DEFAULT 0,
+               committed_units INTEGER NOT NULL DEFAULT 0
+           )""",
+        """CREATE TABLE IF NOT EXISTS capacity_reservations (
+               reservation_id TEXT PRIMARY KEY,
+               currency TEXT NOT NULL,
+               units INTEGER NOT NULL,
+               status TEXT NOT NULL,
+               expires_at REAL NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_capacity_expiry ON capacity_reservations (status, expires_at)",
+        """CREATE TABLE IF NOT EXISTS idempotency_keys (
+               key TEXT PRIMARY KEY,
+               request_hash TEXT NOT NULL,
+               status TEXT NOT NULL,
+               response TEXT,
+               expires_at REAL NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_idempotency_expiry ON idempotency_keys (expires_at)",
+        """CREATE TABLE IF NOT EXISTS netting_requests (
+               request_id TEXT PRIMARY KEY,
+               submitted_at TEXT NOT NULL,
+               record TEXT NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_netting_submitted ON netting_requests (submitted_at, request_id)",
+    ]
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH):
+        self.path = path
+        # Profiles are immutable per fingerprint, so this in-process copy never goes stale
+        self.client_profiles = ClientProfileStore()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        with self._lock:
+            for statement in self.SCHEMA:
+                self._conn.execute(statement)
+
+    def _write(self, sql: str, params: Tuple) -> None:
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _range_clauses(date_column: str, created_from, created_to, after) -> Tuple[List[str], List]:
+        clauses, params = [], []
+        if created_from is not None:
+            clauses.append(f"{date_column} >= ?")
+            params.append(created_from)
+        if created_to is not None:
+            clauses.append(f"{date_column} <= ?")
+            params.append(created_to)
+        if after is not None:
+            clauses.append(f"({date_column}, transaction_id) > (?, ?)")
+            params.extend(after)
+        return clauses, params
+
+    def _intern_profile(self, account: Dict) -> Dict:
+        """Replace an account's client_info with a reference to its client_profiles row"""
+        if 'client_info' not in account:
+            return account
+        stored = dict(account)
+        client_info = stored.pop('client_info')
+        fingerprint = client_fingerprint(client_info)
+        if fingerprint not in self.client_profiles:
+            self._write("INSERT OR IGNORE INTO client_profiles (fingerprint, record) VALUES (?, ?)",
+                        (fingerprint, encode_record(client_info)))
+            self.client_profiles.add(fingerprint, client_info)
+        stored['client_profile'] = fingerprint
+        return stored
+
+    def _profile(self, fingerprint: str) -> Optional[Dict]:
+        if fingerprint not in self.client_profiles:
+            rows = self._query("SELECT record FROM client_profiles WHERE fingerprint = ?", (fingerprint,))
+            if not rows:
+                return None
+            self.client_profiles.add(fingerprint, decode_record(rows[0][0]))
+        return self.client_profiles.get(fingerprint)
+
+    def _hydrate_account(self, account: Dict) -> Dict:
+        fingerprint = account.pop('client_profile', None)
+        if fingerprint is not None:
+            account['client_info'] = self._profile(fingerprint)
+        return account
+
+    def _decode_account(self, payload: str) -> Dict:
+        return self._hydrate_account(decode_record(payload))
+
+    def _put_account_row(self, stored: Dict) -> None:
+        self._write(
+            """INSERT OR REPLACE INTO escrow_accounts
+               (transaction_id, client_id, status, currency, created_date, record)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (stored['transaction_id'], stored['client_id'], stored['status'],
+             stored['currency'], stored['created_date'], encode_record(stored))
+        )
+
+    def put_escrow_account(self, account: Dict) -> None:
+        with self._lock:
+            self._put_account_row(self._intern_profile(account))
+
+    def get_escrow_account(self, transaction_id: str) -> Optional[Dict]:
+        rows = self._query("SELECT record FROM escrow_accounts WHERE transaction_id = ?", (transaction_id,))
+        return self._decode_account(rows[0][0]) if rows else None
+
+    def has_escrow_account(self, transaction_id: str) -> bool:
+        return bool(self._query("SELECT 1 FROM escrow_accounts WHERE transaction_id = ?", (transaction_id,)))
+
+    def update_escrow_account(self, transaction_id: str, changes: Dict) -> Optional[Dict]:
+        def work(conn) -> Optional[Dict]:
+            row = conn.execute("SELECT record FROM escrow_accounts WHERE transaction_id = ?",
+                               (transaction_id,)).fetchone()
+            if row is None:
+                return None
+            # Update the stored form directly so the profile reference is not re-derived
+            stored = self._intern_profile({**decode_record(row[0]), **changes})
+            self._put_account_row(stored)
+            return self._hydrate_account(dict(stored))
+        return self._immediate(work)
+
+    def find_escrow_accounts(self, client_id=None, status=None, currency=None,
+                             created_from=None, created_to=None, after=None, limit=None) -> List[Dict]:
+        clauses, params = [], []
+        for column, value in (('client_id', client_id), ('status', status), ('currency', currency)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        range_clauses, range_params = self._range_clauses('created_date', created_from, created_to, after)
+        clauses += range_clauses
+        params += range_params
+
+        sql = "SELECT record FROM escrow_accounts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_date, transaction_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._decode_account(row[0]) for row in self._query(sql, tuple(params))]
+
+    def count_escrow_accounts(self, client_id=None, status=None, currency=None) -> int:
+        clauses, params = [], []
+        for column, value in (('client_id', client_id), ('status', status), ('currency', currency)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT COUNT(*) FROM escrow_accounts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        return self._query(sql, tuple(params))[0][0]
+
+    def get_client_profile(self, client_id: str) -> Optional[Dict]:
+        rows = self._query(
+            """SELECT record FROM escrow_accounts WHERE client_id = ?
+               ORDER BY created_date DESC, transaction_id DESC LIMIT 1""", (client_id,)
+        )
+        return self._decode_account(rows[0][0]).get('client_info') if rows else None
+
+    def put_issuance(self, issuance: Dict) -> None:
+        self._write(
+            """INSERT OR REPLACE INTO usdt_issuances
+               (transaction_id, client_id, issuance_date, record) VALUES (?, ?, ?, ?)""",
+            (issuance['transaction_id'], issuance.get('client_id'),
+             issuance['issuance_date'], encode_record(issuance))
+        )
+
+    def get_issuance(self, transaction_id: str) -> Optional[Dict]:
+        rows = self._query("SELECT record FROM usdt_issuances WHERE transaction_id = ?", (transaction_id,))
+        return decode_record(rows[0][0]) if rows else None
+
+    def find_issuances(self, client_id=None, created_from=None, created_to=None,
+                       after=None, limit=None) -> List[Dict]:
+        clauses, params = [], []
+        if client_id is not None:
+            clauses.append("client_id = ?")
+            params.append(client_id)
+        range_clauses, range_params = self._range_clauses('issuance_date', created_from, created_to, after)
+        clauses += range_clauses
+        params += range_params
+
+        sql = "SELECT record FROM usdt_issuances"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY issuance_date, transaction_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [decode_record(row[0]) for row in self._query(sql, tuple(params))]
+
+    def count_issuances(self) -> int:
+        return self._query("SELECT COUNT(*) FROM usdt_issuances")[0][0]
+
+    def put_attestation(self, attestation: Dict) -> None:
+        self._write(
+            """INSERT OR REPLACE INTO attestations
+               (transaction_id, attestation_timestamp, record) VALUES (?, ?, ?)""",
+            (attestation['transaction_id'], attestation['attestation_timestamp'], encode_record(attestation))
+        )
+
+    def get_attestation(self, transaction_id: str) -> Optional[Dict]:
+        rows = self._query("SELECT record FROM attestations WHERE transaction_id = ?", (transaction_id,))
+        return decode_record(rows[0][0]) if rows else None
+
+    def find_attestations(self, created_from=None, created_to=None, after=None, limit=None) -> List[Dict]:
+        clauses, params = self._range_clauses('attestation_timestamp', created_from, created_to, after)
+        sql = "SELECT record FROM attestations"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY attestation_timestamp, transaction_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [decode_record(row[0]) for row in self._query(sql, tuple(params))]
+
+    def append_transaction(self, entry: Dict) -> None:
+        self._write("INSERT INTO transaction_log (record) VALUES (?)", (encode_record(entry),))
+
+    def iter_transactions(self, after_sequence: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[int, Dict]]:
+        sql = "SELECT sequence, record FROM transaction_log WHERE sequence > ? ORDER BY sequence"
+        params: Tuple = (after_sequence,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (after_sequence, limit)
+        for sequence, payload in self._query(sql, params):
+            yield sequence, decode_record(payload)
+
+    def count_transactions(self) -> int:
+        return self._query("SELECT COUNT(*) FROM transaction_log")[0][0]
+
+    def get_state(self, key: str) -> Optional[Dict]:
+        rows = self._query("SELECT record FROM system_state WHERE key = ?", (key,))
+        return decode_record(rows[0][0]) if rows else None
+
+    def put_state(self, key: str, value: Dict) -> None:
+        self._write("INSERT OR REPLACE INTO system_state (key, record) VALUES (?, ?)",
+                    (key, encode_record(value)))
+
+    def update_state(self, key: str, update: Callable[[Optional[Dict]], Dict]) -> Dict:
+        def work(conn) -> Dict:
+            row = conn.execute("SELECT record FROM system_state WHERE key = ?", (key,)).fetchone()
+            value = update(decode_record(row[0]) if row else None)
+            conn.execute("INSERT OR REPLACE INTO system_state (key, record) VALUES (?, ?)",
+                         (key, encode_record(value)))
+            return value
+        return self._immediate(work)
+
+    def append_escrow_event(self, event: Dict) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO escrow_events (transaction_id, occurred_at, record) VALUES (?, ?, ?)",
+                (event['transaction_id'], event['occurred_at'], encode_record(event))
+            )
+            return cursor.lastrowid
+
+    def iter_escrow_events(self, after_sequence: int = 0, transaction_id: Optional[str] = None,
+                           limit: Optional[int] = None) -> Iterator[Dict]:
+        clauses, params = ["sequence > ?"], [after_sequence]
+        if transaction_id is not None:
+            clauses.append("transaction_id = ?")
+            params.append(transaction_id)
+        sql = f"SELECT sequence, record FROM escrow_events WHERE {' AND '.join(clauses)} ORDER BY sequence"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for sequence, payload in self._query(sql, tuple(params)):
+            yield {**decode_record(payload), 'sequence': sequence}
+
+    def put_escrow_snapshot(self, last_sequence: int, last_occurred_at: str, states: Dict[str, str]) -> None:
+        self._write("INSERT OR REPLACE INTO escrow_snapshots (last_sequence, last_occurred_at, states) VALUES (?, ?, ?)",
+                    (last_sequence, last_occurred_at, encode_snapshot(states)))
+
+    def get_escrow_snapshot(self, at_or_before: Optional[str] = None) -> Optional[Dict]:
+        sql = "SELECT last_sequence, last_occurred_at, states FROM escrow_snapshots"
+        params: Tuple = ()
+        if at_or_before is not None:
+            sql += " WHERE last_occurred_at <= ?"
+            params = (at_or_before,)
+        rows = self._query(sql + " ORDER BY last_sequence DESC LIMIT 1", params)
+        if not rows:
+            return None
+        return {'last_sequence': rows[0][0], 'last_occurred_at': rows[0][1], 'states': decode_snapshot(rows[0][2])}
+
+    def _immediate(self, work):
+        """Run ``work(conn)`` in a BEGIN IMMEDIATE transaction (write lock held across processes)
+
+        Transactions only open under ``self._lock``, so an open one belongs to
+        this thread; nested calls run inside it and commit with it.
+        """
+        with self._lock:
+            if self._conn.in_transaction:
+                return work(self._conn)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def _write_transaction(self, work: Callable[[], Dict]) -> Dict:
+        return self._immediate(lambda conn: work())
+
+    def set_capacity_limit(self, currency: str, limit_units: int) -> None:
+        self._write(
+            """INSERT INTO capacity_pools (currency, limit_units) VALUES (?, ?)
+               ON CONFLICT(currency) DO UPDATE SET limit_units = excluded.limit_units""",
+            (currency, limit_units)
+        )
+
+    def reserve_capacity(self, reservation_id: str, currency: str, units: int, expires_at: float) -> bool:
+        def work(conn) -> bool:
+            # Checked before the pool update so a duplicate ID never leaves the
+            # increment behind when this runs inside a caller's transaction
+            if conn.execute("SELECT 1 FROM capacity_reservations WHERE reservation_id = ?",
+                            (reservation_id,)).fetchone() is not None:
+                return False
+            # The limit check and increment are a single conditional UPDATE on one row
+            updated = conn.execute(
+                """UPDATE capacity_pools SET reserved_units = reserved_units + ?
+                   WHERE currency = ? AND reserved_units + committed_units + ? <= limit_units""",
+                (units, currency, units)
+            ).rowcount
+            if not updated:
+                return False
+            conn.execute(
+                """INSERT INTO capacity_reservations (reservation_id, currency, units, status, expires_at)
+                   VALUES (?, ?, ?, 'HELD', ?)""",
+                (reservation_id, currency, units, expires_at)
+            )
+            return True
+        try:
+            return self._immediate(work)
+        except sqlite3.IntegrityError:
+            return False
+
+    def _move_reservation(self, reservation_id: str, from_statuses: Tuple[str, ...], to_status: str) -> bool:
+        def work(conn) -> bool:
+            row = conn.execute(
+                "SELECT currency, units, status FROM capacity_reservations WHERE reservation_id = ?",
+                (reservation_id,)
+            ).fetchone()
+            if row is None or row[2] not in from_statuses:
+                return False
+            currency, units, status = row
+            if status == 'HELD':
+                conn.execute("UPDATE capacity_pools SET reserved_units = reserved_units - ? WHERE currency = ?",
+                             (units, currency))
+            else:
+                conn.execute("UPDATE capacity_pools SET committed_units = committed_units - ? WHERE currency = ?",
+                             (units, currency))
+            if to_status == 'COMMITTED':
+                conn.execute("UPDATE capacity_pools SET committed_units = committed_units + ? WHERE currency = ?",
+                             (units, currency))
+            conn.execute("UPDATE capacity_reservations SET status = ? WHERE reservation_id = ?",
+                         (to_status, reservation_id))
+            return True
+        return self._immediate(work)
+
+    def commit_capacity(self, reservation_id: str) -> bool:
+        return self._move_reservation(reservation_id, ('HELD',), 'COMMITTED')
+
+    def release_capacity(self, reservation_id: str) -> bool:
+        return self._move_reservation(reservation_id, ('HELD', 'COMMITTED'), 'RELEASED')
+
+    def release_committed_units(self, reservation_id: str, units: int,
+                                escrow_id: Optional[str] = None, escrow_status: Optional[str] = None) -> int:
+        def work(conn) -> int:
+            row = conn.execute(
+                "SELECT currency, units FROM capacity_reservations WHERE reservation_id = ? AND status = 'COMMITTED'",
+                (reservation_id,)
+            ).fetchone()
+            if row is None:
+                return 0
+            if escrow_id is not None and conn.execute(
+                "SELECT 1 FROM escrow_accounts WHERE transaction_id = ? AND status = ?", (escrow_id, escrow_status)
+            ).fetchone() is None:
+                return 0
+            currency, held = row
+            released = min(units, held)
+            conn.execute("UPDATE capacity_pools SET committed_units = committed_units - ? WHERE currency = ?",
+                         (released, currency))
+            conn.execute("UPDATE capacity_reservations SET units = ?, status = ? WHERE reservation_id = ?",
+                         (held - released, 'COMMITTED' if held > released else 'RELEASED', reservation_id))
+            return released
+        return self._immediate(work)
+
+    def expire_capacity_reservations(self, now: float, limit: int = 1000) -> List[str]:
+        def work(conn) -> List[str]:
+            rows = conn.execute(
+                """SELECT reservation_id, currency, units FROM capacity_reservations
+                   WHERE status = 'HELD' AND expires_at <= ? LIMIT ?""",
+                (now, limit)
+            ).fetchall()
+            for reservation_id, currency, units in rows:
+                conn.execute("UPDATE capacity_pools SET reserved_units = reserved_units - ? WHERE currency = ?",
+                             (units, currency))
+                conn.execute("UPDATE capacity_reservations SET status = 'EXPIRED' WHERE reservation_id = ?",
+                             (reservation_id,))
+            return [row[0] for row in rows]
+        return self._immediate(work)
+
+    def get_capacity_usage(self, currency: str) -> Optional[Dict]:
+        rows = self._query(
+            "SELECT limit_units, reserved_units, committed_units FROM capacity_pools WHERE currency = ?", (currency,)
+        )
+        if not rows:
+            return None
+        return {'limit_units': rows[0][0], 'reserved_units': rows[0][1], 'committed_units': rows[0][2]}
+
+    def put_netting_request(self, request: Dict) -> None:
+        self._write("INSERT OR REPLACE INTO netting_requests (request_id, submitted_at, record) VALUES (?, ?, ?)",
+                    (request['request_id'], request['submitted_at'], encode_record(request)))
+
+    def iter_netting_requests(self) -> Iterator[Dict]:
+        rows = self._query("SELECT record FROM netting_requests ORDER BY submitted_at, request_id")
+        return (decode_record(row[0]) for row in rows)
+
+    def delete_netting_requests(self, request_ids: List[str]) -> None:
+        self._immediate(lambda conn: conn.executemany("DELETE FROM netting_requests WHERE request_id = ?",
+                                                      [(request_id,) for request_id in request_ids]))
+
+    def claim_idempotency_key(self, key: str, request_hash: str, expires_at: float, now: float) -> Optional[Dict]:
+        def work(conn) -> Optional[Dict]:
+            row = conn.execute(
+                "SELECT request_hash, status, response, expires_at FROM idempotency_keys WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[3] > now:
+                return {'request_hash': row[0], 'status': row[1],
+                        'response': decode_record(row[2]) if row[2] else None, 'expires_at': row[3]}
+            conn.execute(
+                """INSERT OR REPLACE INTO idempotency_keys (key, request_hash, status, response, expires_at)
+                   VALUES (?, ?, 'IN_PROGRESS', NULL, ?)""",
+                (key, request_hash, expires_at)
+            )
+            return None
+        # The check-and-insert runs under the database write lock, so it is atomic across processes
+        return self._immediate(work)
+
+    def complete_idempotency_key(self, key: str, response: Dict, expires_at: float) -> None:
+        self._write("UPDATE idempotency_keys SET status = 'COMPLETED', response = ?, expires_at = ? WHERE key = ?",
+                    (encode_record(response), expires_at, key))
+
+    def release_idempotency_key(self, key: str) -> None:
+        self._write("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+
+    def purge_idempotency_keys(self, now: float) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LedgerView(Mapping):
+    """Read-only mapping over one ledger table, keyed by transaction_id
+
+    Keeps ``tid in core.escrow_accounts`` / ``core.escrow_accounts[tid]``
+    working for callers written against the original in-process dicts.
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, getter, contains, counter, finder, date_field: str):
+        self._getter = getter
+        self._contains = contains
+        self._counter = counter
+        self._finder = finder
+        self._date_field = date_field
+
+    def __getitem__(self, transaction_id: str) -> Dict:
+        record = self._getter(transaction_id)
+        if record is None:
+            raise KeyError(transaction_id)
+        return record
+
+    def __contains__(self, transaction_id) -> bool:
+        return self._contains(transaction_id)
+
+    def __len__(self) -> int:
+        return self._counter()
+
+    def __iter__(self) -> Iterator[str]:
+        after = None
+        while True:
+            page = self._finder(after=after, limit=self.PAGE_SIZE)
+            for record in page:
+                yield record['transaction_id']
+            if len(page) < self.PAGE_SIZE:
+                return
+            after = (page[-1][self._date_field], page[-1]['transaction_id'])
+
+
+def create_ledger(backend: str = 'sqlite', path: str = DEFAULT_LEDGER_PATH) -> EscrowLedger:
+    """Build a ledger backend by name ('sqlite' or 'memory')"""
+    if backend == 'sqlite':
+        return SQLiteEscrowLedger(path)
+    if backend == 'memory':
+        return InMemoryEscrowLedger()
+    raise ValueError(f"Unknown ledger backend: {backend}")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+ESCROW STATE MACHINE - Event-sourced escrow lifecycle with periodic snapshots
+Every status change is a transition validated against the stored account and appended
+to the event log in one store transaction, so workers sharing a ledger cannot race it;
+current and point-in-time state come from the latest snapshot plus a tail replay
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+from typing import Dict, List, Optional
+
+# Allowed transitions; None is the state of an account that does not exist yet
+ESCROW_TRANSITIONS = {
+    None: frozenset({'PENDING_DEPOSIT'}),
+    'PENDING_DEPOSIT': frozenset({'DEPOSIT_CONFIRMED', 'CANCELLED', 'EXPIRED'}),
+    'DEPOSIT_CONFIRMED': frozenset({'FROZEN', 'RELEASED'}),
+    'FROZEN': frozenset({'DEPOSIT_CONFIRMED', 'RELEASED'}),
+    'CANCELLED': frozenset(),
+    'EXPIRED': frozenset(),
+    'RELEASED': frozenset()
+}
+
+ESCROW_STATES = tuple(state for state in ESCROW_TRANSITIONS if state is not None)
+
+# Statuses each status may be entered from, as checked by the store
+ESCROW_SOURCES = {
+    to_status: frozenset(source for source, targets in ESCROW_TRANSITIONS.items() if to_status in targets)
+    for to_status in ESCROW_STATES
+}
+
+DEFAULT_SNAPSHOT_INTERVAL = 50000
+
+REPLAY_PAGE_SIZE = 10000
+
+
+class IllegalTransitionError(ValueError):
+    """Raised when an escrow account is moved to a state its current state does not allow"""
+
+    def __init__(self, transaction_id: str, from_status: Optional[str], to_status: str):
+        super().__init__(f"Escrow {transaction_id}: illegal transition {from_status} -> {to_status}")
+        self.transaction_id = transaction_id
+        self.from_status = from_status
+        self.to_status = to_status
+
+
+class EscrowStateMachine:
+    """Current escrow states, maintained from an append-only event log
+
+    The in-memory state map is restored on startup from the latest snapshot
+    plus the events after it. A new snapshot is written every
+    ``snapshot_interval`` events, so a restart replays at most that many.
+    Transitions are checked by the store against the account's stored
+    status, and the map then catches up on every event since the last one
+    it saw, including those written by other workers.
+    """
+
+    def __init__(self, store, snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL):
+        self.store = store
+        self.snapshot_interval = snapshot_interval
+        self._states: Dict[str, str] = {}
+        self._last_sequence = 0
+        self._last_occurred_at = ''
+        self._events_since_snapshot = 0
+        self._restore()
+
+    def _restore(self) -> None:
+        snapshot = self.store.get_escrow_snapshot()
+        if snapshot is not None:
+            self._states = snapshot['states']
+            self._last_sequence = snapshot['last_sequence']
+            self._last_occurred_at = snapshot['last_occurred_at']
+        self._events_since_snapshot = self._replay(self._states, self._last_sequence, None)
+
+    def _replay(self, states: Dict[str, str], after_sequence: int, until: Optional[str]) -> int:
+        """Apply events after ``after_sequence`` (up to time ``until``) to ``states``"""
+        replayed = 0
+        while True:
+            page = list(self.store.iter_escrow_events(after_sequence=after_sequence, limit=REPLAY_PAGE_SIZE))
+            for event in page:
+                if until is not None and event['occurred_at'] > until:
+                    return replayed
+                states[event['transaction_id']] = event['to_status']
+                replayed += 1
+                if until is None:
+                    self._last_sequence = event['sequence']
+                    self._last_occurred_at = event['occurred_at']
+            if len(page) < REPLAY_PAGE_SIZE:
+                return replayed
+            after_sequence = page[-1]['sequence']
+
+    # -- transitions -----------------------------------------------------
+    def status(self, transaction_id: str) -> Optional[str]:
+        return self._states.get(transaction_id)
+
+    def can_transition(self, transaction_id: str, to_status: str) -> bool:
+        return to_status in ESCROW_TRANSITIONS[self._states.get(transaction_id)]
+
+    def transition(self,
+                   transaction_id: str,
+                   to_status: str,
+                   data: Optional[Dict] = None,
+                   changes: Optional[Dict] = None,
+                   capacity: Optional[Dict] = None) -> Dict:
+        """Validate and record a state change in one store transaction; raises IllegalTransitionError
+
+        ``changes`` are written to the account record with the new status and
+        ``capacity`` is a CapacityReservations commit/release spec applied in
+        the same transaction. Returns the store result: {'success': True,
+        'event', 'account'}, or {'success': False, 'error': 'CAPACITY_EXHAUSTED'}
+        with nothing written.
+        """
+        event = {'transaction_id': transaction_id, 'to_status': to_status, 'data': data or {}}
+        result = self.store.transition_escrow_account(event, ESCROW_SOURCES[to_status], changes, capacity)
+        if not result['success'] and result['error'] == 'ILLEGAL_STATE_TRANSITION':
+            raise IllegalTransitionError(transaction_id, result['from_status'], to_status)
+        self._catch_up()
+        return result
+
+    def _catch_up(self) -> None:
+        """Apply events appended since the last one seen (this worker's and others')"""
+        self._events_since_snapshot += self._replay(self._states, self._last_sequence, None)
+        if self._events_since_snapshot >= self.snapshot_interval:
+            self.take_snapshot()
+
+    def take_snapshot(self) -> None:
+        if self._last_sequence == 0:
+            return
+        self.store.put_escrow_snapshot(self._last_sequence, self._last_occurred_at, self._states)
+        self._events_since_snapshot = 0
+
+    def seed(self, transaction_id: str, status: str, occurred_at: str) -> None:
+        """Record an existing account's status as its opening event
+
+        Used once to migrate ledgers that predate the event log; calls must
+        be made in occurred_at order so the log stays time-ordered.
+        """
+        event = {
+            'transaction_id': transaction_id,
+            'from_status': None,
+            'to_status': status,
+            'occurred_at': occurred_at,
+            'data': {'migrated': True}
+        }
+        self._last_sequence = self.store.append_escrow_event(event)
+        self._last_occurred_at = occurred_at
+        self._states[transaction_id] = status
+        self._events_since_snapshot += 1
+
+    # -- queries ---------------------------------------------------------
+    def history(self, transaction_id: str) -> List[Dict]:
+        return list(self.store.iter_escrow_events(transaction_id=transaction_id))
+
+    def states_at(self, timestamp: str) -> Dict[str, str]:
+        """State of every escrow account as of ``timestamp`` (ISO format)"""
+        snapshot = self.store.get_escrow_snapshot(at_or_before=timestamp)
+        states = snapshot['states'] if snapshot is not None else {}
+        self._replay(states, snapshot['last_sequence'] if snapshot is not None else 0, timestamp)
+        return states
+
+    def status_at(self, transaction_id: str, timestamp: str) -> Optional[str]:
+        status = None
+        for event in self.store.iter_escrow_events(transaction_id=transaction_id):
+            if event['occurred_at'] > timestamp:
+                break
+            status = event['to_status']
+        return status
+
+    def counts_by_status(self, states: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for status in (states if states is not None else self._states).values():
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def __len__(self) -> int:
+        return len(self._states)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+FACILITY ALLOCATOR - Shared capacity across TC credit, fiat-backed credit and USDT liquidity
+Competing requests are ranked by a configurable objective and filled greedily, so the
+portfolio is never promised twice; adding or withdrawing a request only re-runs the
+requests ranked after it
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from decimal import ROUND_FLOOR, Decimal
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+
+from escrow_usdt_system.capacity_reservations import from_units, to_units
+
+TRADITIONAL_CREDIT = 'traditional_credit'
+FIAT_BACKED_CREDIT = 'fiat_backed_credit'
+USDT_LIQUIDITY = 'usdt_liquidity_facility'
+FACILITIES = (TRADITIONAL_CREDIT, FIAT_BACKED_CREDIT, USDT_LIQUIDITY)
+
+# Fiat-backed credit and USDT liquidity both draw on the same escrowed fiat
+FIAT_POOL = 'fiat_escrow'
+
+OBJECTIVES = ('priority', 'yield', 'utilization')
+
+DEFAULT_RATE = Decimal('0.085')
+
+
+class AllocationError(Exception):
+    """Raised for unknown objectives, facilities or request IDs"""
+
+
+def _floor_units(amount: Decimal) -> int:
+    """Round down, so an eligibility limit never exceeds what the collateral supports"""
+    return int((Decimal(str(amount)) * 100).to_integral_value(rounding=ROUND_FLOOR))
+
+
+@dataclass
+class CreditRequest:
+    """One request competing for facility capacity
+
+    ``fiat_deposit`` is the fiat the client will escrow; it backs the
+    fiat-backed credit (at that facility's LTV) and USDT liquidity (1:1).
+    ``rate`` is the annual rate the client accepted, used by the yield
+    objective. ``facilities`` restricts which facilities may serve it.
+    """
+    request_id: str
+    amount: Decimal
+    collateral_value: Decimal = Decimal('0')
+    fiat_deposit: Decimal = Decimal('0')
+    priority: int = 0
+    rate: Decimal = DEFAULT_RATE
+    facilities: Tuple[str, ...] = FACILITIES
+    sequence: int = field(default=0, compare=False)
+
+
+class FacilityAllocator:
+    """Greedy allocation of queued requests under shared facility limits
+
+    Requests are kept sorted by the objective's ranking key. Each request is
+    filled from its eligible facilities in preference order, possibly split
+    across several, and the remaining capacity after every request is kept.
+    Adding or withdrawing a request restarts from the remaining capacity just
+    before its position and stops as soon as the capacity after a request
+    matches the previous run. From that point every later allocation is
+    unchanged.
+
+    Objectives:
+        priority     highest ``priority`` first, then arrival order
+        yield        highest accepted ``rate`` first; facilities tried by their rate
+        utilization  largest requests first (first-fit decreasing)
+    """
+
+    def __init__(self,
+                 capacities: Dict[str, Decimal],
+                 ltv: Dict[str, Decimal],
+                 fiat_pool: Decimal,
+                 objective: str = 'priority',
+                 facility_rates: Optional[Dict[str, Decimal]] = None):
+        if objective not in OBJECTIVES:
+            raise AllocationError(f"Unknown objective {objective!r}; expected one of {OBJECTIVES}")
+        self.objective = objective
+        self.ltv = {facility: Decimal(str(ltv[facility])) for facility in FACILITIES}
+        self.facility_rates = {facility: Decimal(str((facility_rates or {}).get(facility, DEFAULT_RATE)))
+                               for facility in FACILITIES}
+        self._limits = {facility: to_units(capacities[facility]) for facility in FACILITIES}
+        self._limits[FIAT_POOL] = to_units(fiat_pool)
+        self._pools = (*FACILITIES, FIAT_POOL)
+
+        self._requests: Dict[str, CreditRequest] = {}
+        self._keys: List[tuple] = []
+        self._order: List[str] = []
+        # _remaining[i] is the capacity left after the first i requests in _order
+        self._remaining: List[Tuple[int, ...]] = [tuple(self._limits[pool] for pool in self._pools)]
+        self._allocations: Dict[str, Dict[str, int]] = {}
+        self._arrivals = count(1)
+        self.last_recomputed = 0
+
+    @classmethod
+    def from_opportunities(cls, opportunities: Dict[str, Dict], fiat_pool: Decimal,
+                           objective: str = 'priority', facility_rates: Optional[Dict[str, Decimal]] = None
+                           ) -> 'FacilityAllocator':
+        """Build from ``EnhancedTCWithEscrowUSDT.business_opportunities``"""
+        return cls(
+            capacities={facility: opportunities[facility]['capacity'] for facility in FACILITIES},
+            ltv={facility: opportunities[facility]['ltv'] for facility in FACILITIES},
+            fiat_pool=fiat_pool,
+            objective=objective,
+            facility_rates=facility_rates
+        )
+
+    # -- ranking ---------------------------------------------------------
+    def _rank_key(self, request: CreditRequest) -> tuple:
+        if self.objective == 'priority':
+            return (-request.priority, request.sequence)
+        if self.objective == 'yield':
+            return (-request.rate, -request.priority, request.sequence)
+        return (-request.amount, -request.priority, request.sequence)
+
+    def _facility_order(self, request: CreditRequest) -> List[str]:
+        eligible = [facility for facility in FACILITIES if facility in request.facilities]
+        if self.objective == 'yield':
+            eligible.sort(key=lambda facility: -self.facility_rates[facility])
+        return eligible
+
+    # -- allocation ------------------------------------------------------
+    def _allocate_one(self, request: CreditRequest, remaining: Tuple[int, ...]) -> Tuple[Dict[str, int], Tuple[int, ...]]:
+        left = dict(zip(self._pools, remaining))
+        needed = to_units(request.amount)
+        fiat_available = _floor_units(request.fiat_deposit)
+        allocation: Dict[str, int] = {}
+        for facility in self._facility_order(request):
+            if needed <= 0:
+                break
+            if facility == TRADITIONAL_CREDIT:
+                eligible = _floor_units(Decimal(str(request.collateral_value)) * self.ltv[facility])
+                grant = min(needed, eligible, left[facility])
+            else:
+                # Each unit drawn consumes 1/ltv units of the client's deposit and of the shared fiat pool
+                ltv = self.ltv[facility]
+                fiat_limit = min(fiat_available, left[FIAT_POOL])
+                grant = min(needed, left[facility], _floor_units(from_units(fiat_limit) * ltv))
+            if grant <= 0:
+                continue
+            allocation[facility] = grant
+            left[facility] -= grant
+            needed -= grant
+            if facility != TRADITIONAL_CREDIT:
+                fiat_used = to_units(from_units(grant) / self.ltv[facility])
+                fiat_available -= fiat_used
+                left[FIAT_POOL] -= fiat_used
+        return allocation, tuple(left[pool] for pool in self._pools)
+
+    def _recompute_from(self, position: int) -> None:
+        del self._remaining[position + 1:]
+        recomputed = 0
+        for index in range(position, len(self._order)):
+            request = self._requests[self._order[index]]
+            allocation, remaining = self._allocate_one(request, self._remaining[index])
+            recomputed += 1
+            self._allocations[request.request_id] = allocation
+            self._remaining.append(remaining)
+        self.last_recomputed = recomputed
+
+    def _recompute_incremental(self, position: int) -> None:
+        """Re-run from ``position``; stop once capacity matches the previous run at the same request
+
+        ``_remaining[index + 1]`` still holds the previous run's capacity after
+        the request now at ``index``. An allocation depends only on the request
+        and the capacity it sees, so once they agree every later request sees
+        the same capacity as before and keeps its allocation.
+        """
+        recomputed = 0
+        for index in range(position, len(self._order)):
+            request = self._requests[self._order[index]]
+            allocation, remaining = self._allocate_one(request, self._remaining[index])
+            recomputed += 1
+            self._allocations[request.request_id] = allocation
+            if self._remaining[index + 1] == remaining:
+                break
+            self._remaining[index + 1] = remaining
+        self.last_recomputed = recomputed
+
+    def add(self, request: CreditRequest) -> Dict:
+        """Queue a request and return its allocation"""
+        if request.request_id in self._requests:
+            raise AllocationError(f"Request {request.request_id} is already queued")
+        for facility in request.facilities:
+            if facility not in FACILITIES:
+                raise AllocationError(f"Unknown facility {facility!r}")
+        request.amount = Decimal(str(request.amount))
+        request.sequence = next(self._arrivals)
+        key = self._rank_key(request)
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._order.insert(position, request.request_id)
+        self._requests[request.request_id] = request
+        # Placeholder for the new request; later requests keep their previous "after" capacity
+        self._remaining.insert(position + 1, self._remaining[position])
+        self._recompute_incremental(position)
+        return self.allocation(request.request_id)
+
+    def withdraw(self, request_id: str) -> Dict:
+        """Remove a request, returning its released allocation"""
+        if request_id not in self._requests:
+            raise AllocationError(f"Request {request_id} is not queued")
+        released = self.allocation(request_id)
+        position = self._order.index(request_id)
+        del self._keys[position]
+        del self._order[position]
+        del self._remaining[position + 1]
+        del self._requests[request_id]
+        del self._allocations[request_id]
+        self._recompute_incremental(position)
+        return released
+
+    def set_objective(self, objective: str) -> None:
+        """Switch objective; this re-ranks and re-runs the whole queue"""
+        if objective not in OBJECTIVES:
+            raise AllocationError(f"Unknown objective {objective!r}; expected one of {OBJECTIVES}")
+        self.objective = objective
+        ranked = sorted(self._requests.values(), key=self._rank_key)
+        self._keys = [self._rank_key(request) for request in ranked]
+        self._order = [request.request_id for request in ranked]
+        self._recompute_from(0)
+
+    # -- reporting -------------------------------------------------------
+    def allocation(self, request_id: str, rank: Optional[int] = None) -> Dict:
+        request = self._requests.get(request_id)
+        if request is None:
+            raise AllocationError(f"Request {request_id} is not queued")
+        granted = self._allocations.get(request_id, {})
+        total = sum(granted.values())
+        requested = to_units(request.amount)
+        return {
+            'request_id': request_id,
+            'requested': request.amount,
+            'allocated': from_units(total),
+            'by_facility': {facility: from_units(units) for facility, units in granted.items()},
+            'status': 'FULL' if total >= requested else 'PARTIAL' if total else 'UNALLOCATED',
+            'rank': rank if rank is not None else self._order.index(request_id) + 1
+        }
+
+    def allocations(self) -> List[Dict]:
+        return [self.allocation(request_id, rank) for rank, request_id in enumerate(self._order, 1)]
+
+    def utilization(self) -> Dict[str, Dict]:
+        remaining = dict(zip(self._pools, self._remaining[-1]))
+        usage = {}
+        for pool in self._pools:
+            limit = self._limits[pool]
+            used = limit - remaining[pool]
+            usage[pool] = {
+                'capacity': from_units(limit),
+                'allocated': from_units(used),
+                'available': from_units(remaining[pool]),
+                'utilization': round(used / limit, 4) if limit else 0.0
+            }
+        return usage
+
+    def summary(self) -> Dict:
+        allocations = self.allocations()
+        expected_yield = sum(
+            (entry['allocated'] * self._requests[entry['request_id']].rate for entry in allocations), Decimal('0')
+        )
+        return {
+            'objective': self.objective,
+            'requests': len(allocations),
+            'fully_allocated': sum(1 for entry in allocations if entry['status'] == 'FULL'),
+            'partially_allocated': sum(1 for entry in allocations if entry['status'] == 'PARTIAL'),
+            'unallocated': sum(1 for entry in allocations if entry['status'] == 'UNALLOCATED'),
+            'total_allocated': sum((entry['allocated'] for entry in allocations), Decimal('0')),
+            'expected_annual_yield': expected_yield,
+            'utilization': self.utilization()
+        }
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+FX RATE SERVICE - Versioned exchange-rate snapshots for issuance and redemption
+Immutable snapshots are published atomically; conversions never re-parse or lock
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+# USD value of one unit of each supported currency (stand-in reference rates)
+DEFAULT_USD_RATES = {
+    'USD': Decimal('1.00'),
+    'EUR': Decimal('1.08'),
+    'GBP': Decimal('1.25'),
+    'CAD': Decimal('0.74'),
+    'AUD': Decimal('0.66'),
+    'JPY': Decimal('0.0067')
+}
+
+DEFAULT_HISTORY_SIZE = 1000
+
+# Ledger state key prefix under which every published snapshot is kept
+SNAPSHOT_STATE_PREFIX = 'fx_snapshot:'
+
+
+class FXRateError(Exception):
+    """Raised when no usable rate snapshot is available"""
+
+
+@dataclass(frozen=True)
+class RateSnapshot:
+    """One immutable set of USD rates; amounts are converted as amount * usd_rates[currency]"""
+    snapshot_id: str
+    usd_rates: Mapping[str, Decimal]
+    as_of: datetime
+    source: str
+    loaded_at: float
+
+    def to_usd(self, amount: Decimal, currency: str) -> Decimal:
+        return amount * self.usd_rates[currency]
+
+    def from_usd(self, usd_amount: Decimal, currency: str) -> Decimal:
+        return usd_amount / self.usd_rates[currency]
+
+    def to_record(self) -> Dict:
+        return {
+            'snapshot_id': self.snapshot_id,
+            'usd_rates': dict(self.usd_rates),
+            'as_of': self.as_of.isoformat(),
+            'source': self.source,
+            'loaded_at': self.loaded_at
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict) -> 'RateSnapshot':
+        return cls(
+            snapshot_id=record['snapshot_id'],
+            usd_rates={currency: Decimal(str(rate)) for currency, rate in record['usd_rates'].items()},
+            as_of=datetime.fromisoformat(record['as_of']),
+            source=record['source'],
+            loaded_at=record['loaded_at']
+        )
+
+
+def make_snapshot(usd_rates: Dict[str, object], as_of: Optional[datetime] = None, source: str = 'manual') -> RateSnapshot:
+    """Build a snapshot with a content-derived ID, parsing every rate exactly once"""
+    parsed = {currency: Decimal(str(rate)) for currency, rate in usd_rates.items()}
+    if any(rate <= 0 for rate in parsed.values()):
+        raise FXRateError("FX rates must be positive")
+    as_of = as_of or datetime.now(timezone.utc)
+    fingerprint = hashlib.sha256(json.dumps(
+        {'as_of': as_of.isoformat(), 'source': source, 'rates': {k: str(v) for k, v in sorted(parsed.items())}},
+        sort_keys=True
+    ).encode()).hexdigest()[:12].upper()
+    return RateSnapshot(
+        snapshot_id=f"FX-{as_of.strftime('%Y%m%dT%H%M%S')}-{fingerprint}",
+        usd_rates=parsed,
+        as_of=as_of,
+        source=source,
+        loaded_at=time.time()
+    )
+
+
+class FXRateService:
+    """Single source of FX rates for the escrow and USDT engines
+
+    Readers take ``current()`` (one attribute read plus a staleness check)
+    and convert against that snapshot. Publishing a new snapshot swaps the
+    reference under a lock; earlier snapshots remain addressable by ID so
+    issuances and redemptions can always be re-priced for audit. The last
+    ``history_size`` are cached in memory; with a store, every snapshot is
+    also written to ledger state on publish and ``get`` falls back to it,
+    so IDs resolve across restarts and beyond the cache.
+    """
+
+    def __init__(self,
+                 initial: Optional[RateSnapshot] = None,
+                 max_age_seconds: Optional[float] = None,
+                 provider: Optional[Callable[[], Dict]] = None,
+                 history_size: int = DEFAULT_HISTORY_SIZE,
+                 store=None):
+        self.max_age_seconds = max_age_seconds
+        self.provider = provider
+        self.history_size = history_size
+        self.store = store
+        self._lock = threading.Lock()
+        self._history: "OrderedDict[str, RateSnapshot]" = OrderedDict()
+        self._current: Optional[RateSnapshot] = None
+        if initial is not None:
+            self.publish(initial)
+
+    @classmethod
+    def with_default_rates(cls, store=None) -> 'FXRateService':
+        return cls(initial=make_snapshot(DEFAULT_USD_RATES, source='static-reference'), store=store)
+
+    @classmethod
+    def from_feed_file(cls, path: str, max_age_seconds: Optional[float] = 3600) -> 'FXRateService':
+        service = cls(max_age_seconds=max_age_seconds)
+        service.load_feed_file(path)
+        return service
+
+    def attach_store(self, store) -> None:
+        """Persist snapshots to ``store`` from now on, including those already cached"""
+        self.store = store
+        for snapshot in list(self._history.values()):
+            self._persist(snapshot)
+
+    def _persist(self, snapshot: RateSnapshot) -> None:
+        if self.store is not None:
+            self.store.put_state(f"{SNAPSHOT_STATE_PREFIX}{snapshot.snapshot_id}", snapshot.to_record())
+
+    def _cache(self, snapshot: RateSnapshot) -> None:
+        self._history[snapshot.snapshot_id] = snapshot
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+
+    def publish(self, snapshot: RateSnapshot) -> RateSnapshot:
+        # Stored before it becomes current, so no transaction can reference an unrecorded ID
+        self._persist(snapshot)
+        with self._lock:
+            self._cache(snapshot)
+            self._current = snapshot
+        return snapshot
+
+    def load_feed_file(self, path: str) -> RateSnapshot:
+        """Publish rates from a JSON feed: {"as_of": iso, "source": str, "rates": {ccy: usd_rate}}"""
+        with open(path, encoding='utf-8') as f:
+            feed = json.load(f)
+        as_of = datetime.fromisoformat(feed['as_of']) if feed.get('as_of') else None
+        return self.publish(make_snapshot(feed['rates'], as_of, feed.get('source', path)))
+
+    def refresh(self) -> RateSnapshot:
+        """Pull a fresh snapshot from the configured provider"""
+        if self.provider is None:
+            raise FXRateError("No FX rate provider configured")
+        feed = self.provider()
+        as_of = datetime.fromisoformat(feed['as_of']) if feed.get('as_of') else None
+        return self.publish(make_snapshot(feed['rates'], as_of, feed.get('source', 'provider')))
+
+    def latest(self) -> RateSnapshot:
+        """Most recently published snapshot, without the staleness check"""
+        snapshot = self._current
+        if snapshot is None:
+            raise FXRateError("No FX rate snapshot loaded")
+        return snapshot
+
+    def is_stale(self, snapshot: RateSnapshot) -> bool:
+        """True once the rates themselves (``as_of``, not load time) are older than ``max_age_seconds``"""
+        # A naive as_of is local time, like the datetime.now() stamps used elsewhere
+        return self.max_age_seconds is not None and time.time() - snapshot.as_of.timestamp() > self.max_age_seconds
+
+    def current(self) -> RateSnapshot:
+        """Snapshot to price a transaction with; refreshes or raises once it is stale"""
+        snapshot = self.latest()
+        if self.is_stale(snapshot):
+            if self.provider is None:
+                raise FXRateError(f"FX rate snapshot {snapshot.snapshot_id} is stale")
+            snapshot = self.refresh()
+            if self.is_stale(snapshot):
+                raise FXRateError(f"FX rate provider returned stale snapshot {snapshot.snapshot_id} "
+                                  f"(as of {snapshot.as_of.isoformat()})")
+        return snapshot
+
+    def get(self, snapshot_id: str) -> Optional[RateSnapshot]:
+        snapshot = self._history.get(snapshot_id)
+        if snapshot is not None or self.store is None:
+            return snapshot
+        record = self.store.get_state(f"{SNAPSHOT_STATE_PREFIX}{snapshot_id}")
+        if record is None:
+            return None
+        snapshot = RateSnapshot.from_record(record)
+        with self._lock:
+            self._cache(snapshot)
+        return snapshot
+
+    def to_usd(self, amount: Decimal, currency: str) -> Tuple[Decimal, str]:
+        snapshot = self.current()
+        return snapshot.to_usd(amount, currency), snapshot.snapshot_id
+
+    def from_usd(self, usd_amount: Decimal, currency: str) -> Tuple[Decimal, str]:
+        snapshot = self.current()
+        return snapshot.from_usd(usd_amount, currency), snapshot.snapshot_id
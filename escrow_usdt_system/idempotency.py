@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+IDEMPOTENCY - Exactly-once execution for confirmation, issuance and redemption
+A retried request with the same key returns the original response without re-running it
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Tuple
+
+from escrow_usdt_system.escrow_ledger import encode_record
+
+# How long a completed response is replayed for, in seconds
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+# How long an IN_PROGRESS claim blocks other callers before it is presumed abandoned
+DEFAULT_LEASE_SECONDS = 300
+
+
+def request_fingerprint(operation: str, params: Dict) -> str:
+    """SHA-256 of the operation and its parameters, to detect a key reused for a different request"""
+    return hashlib.sha256(encode_record({'operation': operation, 'params': params}).encode()).hexdigest()
+
+
+class IdempotencyGuard:
+    """Runs an operation at most once per (operation, key) within the TTL
+
+    Keys are claimed in the ledger before the operation starts, so the guard
+    also holds across processes sharing a SQLite ledger. Within a process,
+    concurrent retries of an in-flight key wait for the first call's result.
+    Only successful responses are stored; failures release the key so the
+    caller can retry.
+    """
+
+    def __init__(self,
+                 store,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._clock = clock
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.stats = {'executed': 0, 'replayed': 0, 'conflicts': 0}
+
+    def _replay(self, response: Dict) -> Dict:
+        self.stats['replayed'] += 1
+        return {**response, 'idempotent_replay': True}
+
+    def _conflict(self, key: str) -> Dict:
+        self.stats['conflicts'] += 1
+        return {
+            'success': False,
+            'error': 'IDEMPOTENCY_KEY_REUSED',
+            'details': f'Idempotency key {key} was already used for a different request'
+        }
+
+    async def run(self,
+                  operation: str,
+                  key: str,
+                  fingerprint: str,
+                  execute: Callable[[], Awaitable[Dict]],
+                  success_key: str = 'success') -> Dict:
+        scoped_key = f"{operation}:{key}"
+
+        in_flight = self._in_flight.get(scoped_key)
+        if in_flight is not None:
+            if in_flight[0] != fingerprint:
+                return self._conflict(key)
+            result = await asyncio.shield(in_flight[1])
+            return self._replay(result) if result.get(success_key) else result
+
+        now = self._clock()
+        existing = self.store.claim_idempotency_key(scoped_key, fingerprint, now + self.lease_seconds, now)
+        if existing is not None:
+            if existing['request_hash'] != fingerprint:
+                return self._conflict(key)
+            if existing['status'] == 'COMPLETED':
+                return self._replay(existing['response'])
+            return {
+                'success': False,
+                'error': 'REQUEST_IN_PROGRESS',
+                'details': f'A request with idempotency key {key} is still being processed; retry shortly'
+            }
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[scoped_key] = (fingerprint, future)
+        try:
+            result = await execute()
+        except BaseException as e:
+            self.store.release_idempotency_key(scoped_key)
+            future.set_result({'success': False, 'error': 'REQUEST_FAILED', 'details': str(e)})
+            raise
+        finally:
+            del self._in_flight[scoped_key]
+
+        self.stats['executed'] += 1
+        if result.get(success_key):
+            self.store.complete_idempotency_key(scoped_key, result, self._clock() + self.ttl_seconds)
+        else:
+            self.store.release_idempotency_key(scoped_key)
+        future.set_result(result)
+        return result
+
+    def purge_expired(self) -> int:
+        return self.store.purge_idempotency_keys(self._clock())
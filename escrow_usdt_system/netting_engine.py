@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+NETTING ENGINE - Nets USDT mints against burns per client over a settlement window
+Only the net position per client and token is settled on-ledger; every original
+request keeps an audit link to the settlement that carried it
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+SETTLEMENT_STATE_PREFIX = 'netting_settlement:'
+REQUEST_STATE_PREFIX = 'netting_request:'
+# Single-blob pending map written by earlier versions; migrated to per-request rows on restore
+LEGACY_PENDING_STATE_KEY = 'netting_pending'
+
+ZERO = Decimal('0')
+
+
+class NettingEngine:
+    """Collects pending mints and burns and settles net positions per window
+
+    ``mint(client_id, amount, settlement_id)`` and
+    ``burn(client_id, amount, settlement_id)`` perform the on-ledger
+    operation and return a dict with at least ``transaction_hash``. When a
+    client's mints and burns cancel out exactly, no on-ledger operation is
+    made at all. ``on_settled(settlement)`` is called after each settlement
+    so callers can back-fill their own records.
+
+    Windows are settled by ``run`` (or a periodic ``settle_if_due``). With a
+    store, each queued request is also kept as its own ledger row until its
+    settlement is recorded, and ``restore_pending`` re-queues them after a
+    restart. Call it once at startup, before other writers are live.
+    """
+
+    def __init__(self,
+                 mint: Callable[[str, Decimal, str], Awaitable[Dict]],
+                 burn: Callable[[str, Decimal, str], Awaitable[Dict]],
+                 store=None,
+                 settlement_window_seconds: float = 300.0,
+                 on_settled: Optional[Callable[[Dict], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.mint = mint
+        self.burn = burn
+        self.store = store
+        self.settlement_window_seconds = settlement_window_seconds
+        self.on_settled = on_settled
+        self._clock = clock
+        # (client_id, token) -> list of pending requests
+        self._pending: Dict[Tuple[str, str], List[Dict]] = {}
+        self._window_id: Optional[str] = None
+        self._opened_at = 0.0
+        self._settle_lock = asyncio.Lock()
+        self.stats = {'requests': 0, 'settlements': 0, 'onledger_operations': 0, 'operations_saved': 0}
+
+    @property
+    def pending_count(self) -> int:
+        return sum(len(requests) for requests in self._pending.values())
+
+    def _submit(self, direction: str, request_id: str, client_id: str, amount: Decimal, token: str) -> Dict:
+        if self._window_id is None:
+            self._window_id = f"NETWIN_{uuid.uuid4().hex[:12].upper()}"
+            self._opened_at = self._clock()
+
+        request = {
+            'request_id': request_id,
+            'direction': direction,
+            'amount': amount,
+            'submitted_at': datetime.now().isoformat()
+        }
+        self._pending.setdefault((client_id, token), []).append(request)
+        if self.store is not None:
+            self.store.put_netting_request({**request, 'client_id': client_id, 'token': token})
+        self.stats['requests'] += 1
+        return {
+            'settlement_window_id': self._window_id,
+            'status': 'PENDING_SETTLEMENT',
+            'settles_by': (datetime.now() + timedelta(
+                seconds=max(self.settlement_window_seconds - (self._clock() - self._opened_at), 0)
+            )).isoformat()
+        }
+
+    def submit_mint(self, request_id: str, client_id: str, amount: Decimal, token: str = 'USDT') -> Dict:
+        """Queue a mint for the open window; returns its netting placement"""
+        return self._submit('MINT', request_id, client_id, amount, token)
+
+    def submit_burn(self, request_id: str, client_id: str, amount: Decimal, token: str = 'USDT') -> Dict:
+        """Queue a burn for the open window; returns its netting placement"""
+        return self._submit('BURN', request_id, client_id, amount, token)
+
+    def restore_pending(self) -> int:
+        """Re-queue requests a previous process accepted but never settled; returns how many
+
+        Restored requests form a window that is already due.
+        """
+        if self.store is None:
+            return 0
+        legacy = self.store.get_state(LEGACY_PENDING_STATE_KEY)
+        if legacy:
+            for request in legacy.values():
+                self.store.put_netting_request(request)
+            self.store.put_state(LEGACY_PENDING_STATE_KEY, {})
+
+        queued = list(self.store.iter_netting_requests())
+        settled = {request['request_id'] for request in queued
+                   if self.get_request_settlement(request['request_id']) is not None}
+        if settled:
+            self._forget(list(settled))
+        restored = 0
+        for request in queued:
+            if request['request_id'] in settled:
+                continue
+            if self._window_id is None:
+                self._window_id = f"NETWIN_{uuid.uuid4().hex[:12].upper()}"
+                self._opened_at = self._clock() - self.settlement_window_seconds
+            self._pending.setdefault((request['client_id'], request['token']), []).append({
+                key: request[key] for key in ('request_id', 'direction', 'amount', 'submitted_at')
+            })
+            restored += 1
+        return restored
+
+    def _forget(self, request_ids: List[str]) -> None:
+        if self.store is not None:
+            self.store.delete_netting_requests(request_ids)
+
+    async def settle_if_due(self) -> Optional[List[Dict]]:
+        if self._pending and self._clock() - self._opened_at >= self.settlement_window_seconds:
+            return await self.settle()
+        return None
+
+    async def settle(self) -> List[Dict]:
+        """Settle the open window: one on-ledger operation per non-zero net position"""
+        async with self._settle_lock:
+            if not self._pending:
+                return []
+
+            positions, window_id = self._pending, self._window_id
+            self._pending, self._window_id = {}, None
+
+            settlements = []
+            remaining = list(positions.items())
+            try:
+                while remaining:
+                    (client_id, token), requests = remaining[0]
+                    settlement = await self._settle_position(window_id, client_id, token, requests)
+                    remaining.pop(0)
+                    settlements.append(settlement)
+                    if self.on_settled is not None:
+                        self.on_settled(settlement)
+            except BaseException:
+                # Positions not yet settled go back into the open window
+                if self._window_id is None:
+                    self._window_id, self._opened_at = window_id, self._clock() - self.settlement_window_seconds
+                for key, unsettled in remaining:
+                    self._pending.setdefault(key, [])[:0] = unsettled
+                raise
+            return settlements
+
+    async def _settle_position(self, window_id: str, client_id: str, token: str, requests: List[Dict]) -> Dict:
+        gross_mint = sum((r['amount'] for r in requests if r['direction'] == 'MINT'), ZERO)
+        gross_burn = sum((r['amount'] for r in requests if r['direction'] == 'BURN'), ZERO)
+        net_amount = gross_mint - gross_burn
+        settlement_id = f"NET_{token}_{uuid.uuid4().hex[:12].upper()}"
+
+        if net_amount > 0:
+            direction, operation = 'MINT', await self.mint(client_id, net_amount, settlement_id)
+        elif net_amount < 0:
+            direction, operation = 'BURN', await self.burn(client_id, -net_amount, settlement_id)
+        else:
+            direction, operation = 'NONE', {}
+
+        operations = 0 if direction == 'NONE' else 1
+        self.stats['settlements'] += 1
+        self.stats['onledger_operations'] += operations
+        self.stats['operations_saved'] += len(requests) - operations
+
+        settlement = {
+            'settlement_id': settlement_id,
+            'settlement_window_id': window_id,
+            'client_id': client_id,
+            'token': token,
+            'gross_mint': gross_mint,
+            'gross_burn': gross_burn,
+            'net_amount': abs(net_amount),
+            'net_direction': direction,
+            'transaction_hash': operation.get('transaction_hash'),
+            'request_count': len(requests),
+            'requests': requests,
+            'settled_at': datetime.now().isoformat()
+        }
+
+        if self.store is not None:
+            self.store.put_state(f"{SETTLEMENT_STATE_PREFIX}{settlement_id}", settlement)
+            for request in requests:
+                self.store.put_state(f"{REQUEST_STATE_PREFIX}{request['request_id']}", {
+                    'request_id': request['request_id'],
+                    'direction': request['direction'],
+                    'amount': request['amount'],
+                    'settlement_id': settlement_id,
+                    'net_direction': direction,
+                    'transaction_hash': settlement['transaction_hash']
+                })
+            self._forget([request['request_id'] for request in requests])
+        return settlement
+
+    def get_settlement(self, settlement_id: str) -> Optional[Dict]:
+        return self.store.get_state(f"{SETTLEMENT_STATE_PREFIX}{settlement_id}") if self.store is not None else None
+
+    def get_request_settlement(self, request_id: str) -> Optional[Dict]:
+        """Audit lookup: which settlement carried an original mint/burn request"""
+        return self.store.get_state(f"{REQUEST_STATE_PREFIX}{request_id}") if self.store is not None else None
+
+    async def run(self, interval: float = 1.0) -> None:
+        """Background loop that settles each window once it elapses"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.settle_if_due()
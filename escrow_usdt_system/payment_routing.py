@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+PAYMENT ROUTING - Cheapest / fastest cross-border routes over bank partners and USDT rails
+Currencies are nodes; SWIFT wires between bank partners and USDT issuance/redemption are
+edges weighted by fees, FX spread and settlement time. Routes are cached per
+(source, target, amount band, objective) and only affected routes are dropped on a change
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import heapq
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
+
+USDT_NODE = 'USDT'
+
+OBJECTIVES = ('cheapest', 'fastest')
+
+# Settlement hours per bank processing time in currency_config
+PROCESSING_HOURS = {'Same Day': 6, 'T+1': 24, 'T+2': 48}
+
+# Defaults for correspondent wires and fiat <-> USDT conversion
+DEFAULT_WIRE_FEE = Decimal('25')
+DEFAULT_WIRE_SPREAD = Decimal('0.0050')
+DEFAULT_WIRE_HOURS = 48
+DEFAULT_CONVERSION_SPREAD = Decimal('0.0010')
+
+# USD amount bands; routes are shared within a band because fixed fees matter less as amounts grow
+AMOUNT_BANDS = (Decimal('10000'), Decimal('100000'), Decimal('1000000'), Decimal('10000000'))
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+class RoutingError(Exception):
+    """Raised when no route exists or a currency is unknown"""
+
+
+@dataclass(frozen=True)
+class RouteEdge:
+    """One hop: a wire between bank partners or a fiat <-> USDT conversion"""
+    edge_id: str
+    source: str
+    target: str
+    channel: str
+    partner: str
+    fee_rate: Decimal
+    fixed_fee: Decimal
+    fee_currency: str
+    fx_spread: Decimal
+    hours: Decimal
+
+    def cost_usd(self, amount_usd: Decimal, usd_rates: Dict[str, Decimal]) -> Decimal:
+        fixed = self.fixed_fee * usd_rates[self.fee_currency] if self.fixed_fee else Decimal('0')
+        return amount_usd * (self.fee_rate + self.fx_spread) + fixed
+
+
+def amount_band(amount_usd: Decimal) -> int:
+    for band, upper in enumerate(AMOUNT_BANDS):
+        if amount_usd < upper:
+            return band
+    return len(AMOUNT_BANDS)
+
+
+def band_reference_amount(band: int) -> Decimal:
+    """Amount a band's route is chosen at: the geometric middle of the band"""
+    upper = AMOUNT_BANDS[band] if band < len(AMOUNT_BANDS) else AMOUNT_BANDS[-1] * 10
+    lower = AMOUNT_BANDS[band - 1] if band else upper / 10
+    return (lower * upper).sqrt()
+
+
+class PaymentRouter:
+    """Shortest-path routing with a per-band route cache and targeted invalidation
+
+    A cached route keeps the shortest-path tree and distance map from its
+    source. When an edge changes, a route is dropped only if the edge is in
+    its tree, or if the edge's new weight would shorten the distance to its
+    far end (``dist[u] + w'(u, v) < dist[v]``). Any cheaper route would have
+    to pass such an edge, and the kept distances stay exact, so every other
+    cached route is still optimal.
+    """
+
+    def __init__(self, fx_rates, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.fx_rates = fx_rates
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        self._edges: Dict[str, RouteEdge] = {}
+        self._adjacency: Dict[str, List[str]] = {}
+        self._cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        # edge_id -> cache keys whose shortest-path tree contains that edge
+        self._routes_by_edge: Dict[str, Set[tuple]] = {}
+        self._usd_rates: Dict[str, Decimal] = {}
+        self._fx_snapshot_id: Optional[str] = None
+        self.stats = {'hits': 0, 'misses': 0, 'invalidated': 0}
+
+    @classmethod
+    def from_escrow_system(cls, escrow_system, wire_fee: Decimal = DEFAULT_WIRE_FEE,
+                           wire_spread: Decimal = DEFAULT_WIRE_SPREAD,
+                           conversion_spread: Decimal = DEFAULT_CONVERSION_SPREAD) -> 'PaymentRouter':
+        """Graph from ``currency_config`` bank partners and ``usdt_config`` fees"""
+        router = cls(escrow_system.fx_rates)
+        usdt_config = escrow_system.usdt_config
+        currencies = escrow_system.currency_config
+        for currency, info in currencies.items():
+            hours = Decimal(PROCESSING_HOURS.get(info['processing_time'], DEFAULT_WIRE_HOURS))
+            spread = conversion_spread if currency != 'USD' else Decimal('0')
+            router.add_edge(RouteEdge(
+                f"ISSUE:{currency}", currency, USDT_NODE, 'USDT_ISSUANCE', info['bank_partner'],
+                usdt_config['issuance_fee'], Decimal('0'), currency, spread, hours
+            ))
+            router.add_edge(RouteEdge(
+                f"REDEEM:{currency}", USDT_NODE, currency, 'USDT_REDEMPTION', info['bank_partner'],
+                usdt_config['redemption_fee'], Decimal('0'), currency, spread, hours
+            ))
+            for target, target_info in currencies.items():
+                if target == currency:
+                    continue
+                router.add_edge(RouteEdge(
+                    f"WIRE:{currency}:{target}", currency, target, 'SWIFT_WIRE',
+                    f"{info['bank_partner']} -> {target_info['bank_partner']}",
+                    Decimal('0'), wire_fee, currency, wire_spread, Decimal(DEFAULT_WIRE_HOURS)
+                ))
+        return router
+
+    # -- graph maintenance -----------------------------------------------
+    def add_edge(self, edge: RouteEdge) -> None:
+        with self._lock:
+            previous = self._edges.get(edge.edge_id)
+            self._edges[edge.edge_id] = edge
+            if previous is None:
+                self._adjacency.setdefault(edge.source, []).append(edge.edge_id)
+                self._adjacency.setdefault(edge.target, [])
+            self._invalidate_for(edge)
+
+    def update_edge(self, edge_id: str, **changes) -> RouteEdge:
+        """Change an edge's fees, spread or hours, dropping only routes it can affect"""
+        with self._lock:
+            if edge_id not in self._edges:
+                raise RoutingError(f"Unknown route edge {edge_id}")
+            edge = replace(self._edges[edge_id], **changes)
+            self._edges[edge_id] = edge
+            self._invalidate_for(edge)
+            return edge
+
+    def set_conversion_spread(self, currency: str, spread: Decimal) -> None:
+        """New FX spread on both fiat <-> USDT conversions of a currency"""
+        for edge_id in (f"ISSUE:{currency}", f"REDEEM:{currency}"):
+            if edge_id in self._edges:
+                self.update_edge(edge_id, fx_spread=spread)
+
+    def refresh_rates(self, snapshot=None) -> List[str]:
+        """Adopt a new FX snapshot; only routes touching currencies whose rate moved are re-checked"""
+        snapshot = snapshot or self.fx_rates.latest()
+        with self._lock:
+            if snapshot.snapshot_id == self._fx_snapshot_id:
+                return []
+            changed = [currency for currency, rate in snapshot.usd_rates.items()
+                       if self._usd_rates.get(currency) != rate]
+            self._usd_rates = dict(snapshot.usd_rates)
+            self._fx_snapshot_id = snapshot.snapshot_id
+            # Proportional costs are in USD already; only fixed fees move with a rate
+            changed_set = set(changed)
+            for edge in self._edges.values():
+                if edge.fixed_fee and edge.fee_currency in changed_set:
+                    self._invalidate_for(edge)
+            return changed
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return
+        for edge_id in entry['tree_edge_ids']:
+            keys = self._routes_by_edge.get(edge_id)
+            if keys is not None:
+                keys.discard(key)
+
+    def _invalidate_for(self, edge: RouteEdge) -> None:
+        affected = set(self._routes_by_edge.get(edge.edge_id, ()))
+        if self._usd_rates:
+            for key, entry in self._cache.items():
+                if key in affected:
+                    continue
+                distances = entry['distances']
+                if edge.source not in distances:
+                    continue
+                candidate = self._add(distances[edge.source], self._weight(edge, entry['amount_usd'], key[3]))
+                if edge.target not in distances or candidate < distances[edge.target]:
+                    affected.add(key)
+        for key in affected:
+            self._drop(key)
+        self.stats['invalidated'] += len(affected)
+
+    # -- search ----------------------------------------------------------
+    def _usd_rate(self, currency: str) -> Decimal:
+        return Decimal('1') if currency == USDT_NODE else self._usd_rates[currency]
+
+    def _weight(self, edge: RouteEdge, amount_usd: Decimal, objective: str) -> Tuple[Decimal, Decimal]:
+        cost = edge.cost_usd(amount_usd, self._usd_rates)
+        return (cost, edge.hours) if objective == 'cheapest' else (edge.hours, cost)
+
+    @staticmethod
+    def _add(left: Tuple[Decimal, Decimal], right: Tuple[Decimal, Decimal]) -> Tuple[Decimal, Decimal]:
+        return (left[0] + right[0], left[1] + right[1])
+
+    def _shortest_paths(self, source: str, amount_usd: Decimal, objective: str) -> Tuple[Dict, Dict]:
+        """Dijkstra over lexicographic (primary, secondary) weights; returns distances and parent edges"""
+        zero = (Decimal('0'), Decimal('0'))
+        distances = {source: zero}
+        parents: Dict[str, str] = {}
+        heap = [(zero, source)]
+        visited = set()
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if node in visited:
+                continue
+            visited.add(node)
+            for edge_id in self._adjacency.get(node, ()):
+                edge = self._edges[edge_id]
+                candidate = self._add(distance, self._weight(edge, amount_usd, objective))
+                if edge.target not in distances or candidate < distances[edge.target]:
+                    distances[edge.target] = candidate
+                    parents[edge.target] = edge_id
+                    heapq.heappush(heap, (candidate, edge.target))
+        return distances, parents
+
+    def route(self, source: str, target: str, amount: Decimal, objective: str = 'cheapest') -> Dict:
+        """Best route for ``amount`` of ``source`` currency, priced for that exact amount"""
+        if objective not in OBJECTIVES:
+            raise RoutingError(f"Unknown objective {objective!r}; expected one of {OBJECTIVES}")
+        with self._lock:
+            self.refresh_rates()
+            for currency in (source, target):
+                if currency not in self._adjacency:
+                    raise RoutingError(f"Unsupported currency {currency}")
+            amount = Decimal(str(amount))
+            amount_usd = amount * self._usd_rate(source)
+            key = (source, target, amount_band(amount_usd), objective)
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.stats['hits'] += 1
+            else:
+                self.stats['misses'] += 1
+                entry = self._compute(key)
+            return self._price(entry['edge_ids'], source, target, amount, amount_usd, objective, key[2])
+
+    def _compute(self, key: tuple) -> Dict:
+        source, target, band, objective = key
+        reference_usd = band_reference_amount(band)
+        distances, parents = self._shortest_paths(source, reference_usd, objective)
+        if target not in distances:
+            raise RoutingError(f"No route from {source} to {target}")
+        edge_ids = []
+        node = target
+        while node != source:
+            edge_id = parents[node]
+            edge_ids.append(edge_id)
+            node = self._edges[edge_id].source
+        edge_ids.reverse()
+        entry = {
+            'edge_ids': edge_ids,
+            'tree_edge_ids': tuple(parents.values()),
+            'distances': distances,
+            'amount_usd': reference_usd
+        }
+        self._cache[key] = entry
+        for edge_id in entry['tree_edge_ids']:
+            self._routes_by_edge.setdefault(edge_id, set()).add(key)
+        while len(self._cache) > self.cache_size:
+            self._drop(next(iter(self._cache)))
+        return entry
+
+    def _price(self, edge_ids: List[str], source: str, target: str, amount: Decimal,
+               amount_usd: Decimal, objective: str, band: int) -> Dict:
+        hops = []
+        total_cost = Decimal('0')
+        total_hours = Decimal('0')
+        for edge_id in edge_ids:
+            edge = self._edges[edge_id]
+            cost = edge.cost_usd(amount_usd, self._usd_rates)
+            total_cost += cost
+            total_hours += edge.hours
+            hops.append({
+                'from': edge.source,
+                'to': edge.target,
+                'channel': edge.channel,
+                'partner': edge.partner,
+                'cost_usd': cost.quantize(Decimal('0.01')),
+                'settlement_hours': edge.hours
+            })
+        delivered_usd = amount_usd - total_cost
+        target_rate = self._usd_rate(target)
+        return {
+            'source': source,
+            'target': target,
+            'objective': objective,
+            'amount': amount,
+            'amount_band': band,
+            'hops': hops,
+            'total_cost_usd': total_cost.quantize(Decimal('0.01')),
+            'cost_bps': (total_cost / amount_usd * 10000).quantize(Decimal('0.1')) if amount_usd else Decimal('0'),
+            'settlement_hours': total_hours,
+            'estimated_amount': (delivered_usd / target_rate).quantize(Decimal('0.01')),
+            'fx_snapshot_id': self._fx_snapshot_id
+        }
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+PIPELINE BENCHMARK - End-to-end throughput and latency for EscrowUSDTCore
+Drives deposit -> confirm -> issue -> attest -> redeem over a synthetic client
+population and writes machine-readable JSON for comparing versions
+Author: OPTKAS1 Enhanced Infrastructure Team
+
+Usage:
+    python escrow_usdt_system/pipeline_benchmark.py --deposits 5000 --output bench.json
+    python escrow_usdt_system/pipeline_benchmark.py --compare bench_before.json --output bench_after.json
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from escrow_usdt_system.batch_pipeline import DEFAULT_CONCURRENCY, latency_summary, run_bounded
+from escrow_usdt_system.escrow_ledger import create_ledger
+from escrow_usdt_system.structured_logging import configure_escrow_logging, flush_escrow_logging
+
+RESULT_FORMAT_VERSION = 2
+
+DEFAULT_CURRENCY_MIX = 'USD=60,EUR=25,GBP=15'
+
+# Stages compared by --compare (wrapped internal stages included)
+STAGES = ('deposit', 'confirm', 'issue', 'attest', 'redeem', 'attestation_seal')
+
+ENTITY_TYPES = ('LLC', 'CORPORATION', 'PARTNERSHIP', 'INDIVIDUAL')
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'USD=60,EUR=25' -> normalized weights"""
+    weights = {}
+    for part in spec.split(','):
+        currency, weight = part.split('=')
+        weights[currency.strip().upper()] = float(weight)
+    total = sum(weights.values())
+    return {currency: weight / total for currency, weight in weights.items()}
+
+
+def synthetic_clients(count: int, rng: random.Random) -> List[Dict]:
+    """Client profiles that pass KYC scoring, with distinct names and IDs"""
+    clients = []
+    for index in range(count):
+        clients.append({
+            'client_id': f"BENCH{index:07d}",
+            'client_info': {
+                'full_name': f"Benchmark Client {index:07d} Holdings",
+                'email': f"treasury{index}@bench-client.example",
+                'phone': f"+1-555-{rng.randint(1000000, 9999999)}",
+                'address': f"{rng.randint(1, 9999)} Commerce Street, Suite {index % 500}, New York NY",
+                'entity_type': rng.choice(ENTITY_TYPES),
+                'tax_id': f"XX-{index:07d}",
+                'country': 'United States'
+            }
+        })
+    return clients
+
+
+def deposit_requests(count: int, clients: List[Dict], mix: Dict[str, float],
+                     min_amount: float, max_amount: float, rng: random.Random):
+    """Deposits with log-uniform amounts, streamed rather than materialized"""
+    currencies, weights = list(mix), list(mix.values())
+    low, high = min_amount, max_amount
+    for _ in range(count):
+        client = rng.choice(clients)
+        amount = Decimal(str(round(low * (high / low) ** rng.random(), 2)))
+        yield {
+            'amount': amount,
+            'currency': rng.choices(currencies, weights)[0],
+            'client_id': client['client_id'],
+            'client_info': client['client_info']
+        }
+
+
+def _instrument(core, attribute: str, samples: List[float]) -> None:
+    """Wrap an async engine method so each call's latency is recorded"""
+    original = getattr(core, attribute)
+
+    @functools.wraps(original)
+    async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await original(*args, **kwargs)
+        finally:
+            samples.append((time.perf_counter() - started) * 1000)
+
+    setattr(core, attribute, timed)
+
+
+def _instrument_sync(target, attribute: str, samples: List[float]) -> None:
+    original = getattr(target, attribute)
+
+    @functools.wraps(original)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            samples.append((time.perf_counter() - started) * 1000)
+
+    setattr(target, attribute, timed)
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _stage_report(stats: Dict) -> Dict:
+    return {
+        'count': stats['total'],
+        'succeeded': stats['succeeded'],
+        'failed': stats['failed'],
+        'elapsed_seconds': stats['elapsed_seconds'],
+        'throughput_per_second': stats['throughput_per_second'],
+        'latency': stats['latency']
+    }
+
+
+def _errors(results: List[Dict]) -> Dict[str, int]:
+    errors: Dict[str, int] = {}
+    for entry in results:
+        if not entry['result'].get('success'):
+            error = entry['result'].get('error', 'UNKNOWN')
+            errors[error] = errors.get(error, 0) + 1
+    return errors
+
+
+async def run_benchmark(deposits: int = 2000,
+                        clients: int = 500,
+                        currency_mix: str = DEFAULT_CURRENCY_MIX,
+                        redeem_ratio: float = 0.3,
+                        min_amount: float = 1000.0,
+                        max_amount: float = 250000.0,
+                        concurrency: int = DEFAULT_CONCURRENCY,
+                        backend: str = 'memory',
+                        trace_allocations: bool = False,
+                        seed: int = 7) -> Dict:
+    """Run one benchmark pass and return the result document"""
+    # Imported here so the logging handler configured below is the one the engine reuses
+    from escrow_usdt_system.escrow_usdt_core import EscrowUSDTCore
+
+    rng = random.Random(seed)
+    workdir = tempfile.mkdtemp(prefix='escrow_bench_')
+    configure_escrow_logging(path=os.path.join(workdir, 'escrow_usdt_bench.log'))
+
+    ledger = create_ledger(backend, os.path.join(workdir, 'bench_ledger.db'))
+    core = EscrowUSDTCore(ledger=ledger)
+    # Synthetic populations are not meant to trip per-client limits
+    core.velocity_limits.daily_limit = core.velocity_limits.monthly_limit = Decimal('1e15')
+
+    samples: Dict[str, List[float]] = {'issue': [], 'attest': [], 'attestation_seal': []}
+    _instrument(core, '_issue_usdt_tokens', samples['issue'])
+    _instrument(core, '_create_attestation_record', samples['attest'])
+    _instrument_sync(core.attestation_batcher, 'seal', samples['attestation_seal'])
+
+    population = synthetic_clients(clients, rng)
+    mix = parse_mix(currency_mix)
+
+    if trace_allocations:
+        tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    started = time.perf_counter()
+
+    deposit_results, deposit_stats = await run_bounded(
+        deposit_requests(deposits, population, mix, min_amount, max_amount, rng),
+        lambda request: core.initiate_fiat_deposit(**request),
+        concurrency
+    )
+    transaction_ids = [entry['result']['transaction_id'] for entry in deposit_results if entry['result'].get('success')]
+
+    confirm_results, confirm_stats = await run_bounded(
+        transaction_ids, core.confirm_deposit_and_issue_usdt, concurrency
+    )
+    core.attestation_batcher.seal()
+
+    redemptions = []
+    for entry in confirm_results:
+        result = entry['result']
+        if result.get('success') and rng.random() < redeem_ratio:
+            issued = Decimal(result['usdt_issued'].split()[0])
+            account = core.ledger.get_escrow_account(result['transaction_id'])
+            redemptions.append({
+                'usdt_amount': (issued * Decimal(str(rng.uniform(0.1, 0.9)))).quantize(Decimal('0.01')),
+                'target_currency': rng.choices(list(mix), list(mix.values()))[0],
+                'client_id': account['client_id'],
+                'withdrawal_details': {'method': 'wire', 'account_number': 'BENCH'}
+            })
+
+    redeem_results, redeem_stats = await run_bounded(
+        redemptions, lambda request: core.redeem_usdt_to_fiat(**request), concurrency
+    )
+
+    elapsed = time.perf_counter() - started
+    transactions = deposit_stats['total'] + confirm_stats['total'] + redeem_stats['total']
+    # CPython exposes no count of allocation events, only live blocks/bytes, so these
+    # are net figures: what each transaction leaves allocated once the run ends
+    memory = {
+        'peak_rss_bytes': _peak_rss_bytes(),
+        'net_retained_blocks_per_transaction': round(
+            (sys.getallocatedblocks() - blocks_before) / max(transactions, 1), 2
+        )
+    }
+    if trace_allocations:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory.update({
+            'traced_peak_bytes': peak,
+            'net_retained_bytes_per_transaction': round(current / max(transactions, 1), 1)
+        })
+
+    stages = {
+        'deposit': _stage_report(deposit_stats),
+        'confirm': _stage_report(confirm_stats),
+        'redeem': _stage_report(redeem_stats)
+    }
+    for stage, stage_samples in samples.items():
+        stages[stage] = {'count': len(stage_samples), 'latency': latency_summary(stage_samples)}
+
+    status = core.get_system_status()
+    ledger.close()
+    flush_escrow_logging()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'benchmark': 'escrow_usdt_pipeline',
+        'format_version': RESULT_FORMAT_VERSION,
+        'engine_version': core.version,
+        'git_commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'config': {
+            'deposits': deposits,
+            'clients': clients,
+            'currency_mix': mix,
+            'redeem_ratio': redeem_ratio,
+            'amount_range': [min_amount, max_amount],
+            'concurrency': concurrency,
+            'backend': backend,
+            'trace_allocations': trace_allocations,
+            'seed': seed
+        },
+        'summary': {
+            'transactions': transactions,
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_per_second': round(transactions / elapsed, 2) if elapsed > 0 else 0.0,
+            'usdt_issued': str(status['total_usdt_issued']),
+            'usdt_burned': str(status['total_usdt_burned'])
+        },
+        'stages': stages,
+        'errors': {
+            'deposit': _errors(deposit_results),
+            'confirm': _errors(confirm_results),
+            'redeem': _errors(redeem_results)
+        },
+        'memory': memory
+    }
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> Dict:
+    """Per-stage p95 and throughput deltas; a regression is a change worse than ``threshold``"""
+    comparison = {'threshold': threshold, 'stages': {}, 'regressions': []}
+    # Latencies are only comparable between runs of the same workload
+    comparison['config_mismatch'] = sorted(
+        key for key in set(baseline['config']) | set(current['config'])
+        if baseline['config'].get(key) != current['config'].get(key)
+    )
+    for stage in STAGES:
+        before, after = baseline['stages'].get(stage), current['stages'].get(stage)
+        if not before or not after:
+            continue
+        p95_before, p95_after = before['latency']['p95_ms'], after['latency']['p95_ms']
+        entry = {
+            'p95_ms': [p95_before, p95_after],
+            'p95_change': round((p95_after - p95_before) / p95_before, 4) if p95_before else None
+        }
+        if entry['p95_change'] is not None and entry['p95_change'] > threshold:
+            comparison['regressions'].append(f"{stage}.p95_ms")
+        if 'throughput_per_second' in before and before['throughput_per_second']:
+            tput_before, tput_after = before['throughput_per_second'], after['throughput_per_second']
+            entry['throughput_per_second'] = [tput_before, tput_after]
+            entry['throughput_change'] = round((tput_after - tput_before) / tput_before, 4)
+            if entry['throughput_change'] < -threshold:
+                comparison['regressions'].append(f"{stage}.throughput_per_second")
+        comparison['stages'][stage] = entry
+    return comparison
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Escrow/USDT pipeline benchmark')
+    parser.add_argument('--deposits', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--currency-mix', default=DEFAULT_CURRENCY_MIX)
+    parser.add_argument('--redeem-ratio', type=float, default=0.3)
+    parser.add_argument('--min-amount', type=float, default=1000.0)
+    parser.add_argument('--max-amount', type=float, default=250000.0)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='also trace retained/peak bytes with tracemalloc (slower; latencies not comparable)')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write the JSON result here (default: stdout)')
+    parser.add_argument('--compare', help='baseline JSON result to compare against')
+    parser.add_argument('--regression-threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_benchmark(
+        deposits=args.deposits,
+        clients=args.clients,
+        currency_mix=args.currency_mix,
+        redeem_ratio=args.redeem_ratio,
+        min_amount=args.min_amount,
+        max_amount=args.max_amount,
+        concurrency=args.concurrency,
+        backend=args.backend,
+        trace_allocations=args.trace_allocations,
+        seed=args.seed
+    ))
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            result['comparison'] = compare_results(json.load(f), result, args.regression_threshold)
+        exit_code = 1 if result['comparison']['regressions'] else 0
+
+    payload = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
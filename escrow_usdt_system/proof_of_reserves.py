@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+PROOF OF RESERVES - Continuous reserve vs. liability accounting for USDT supply
+Reserves and liabilities are updated on every mint and burn; signed snapshots publish
+a Merkle sum tree of client liabilities so each client can verify their own inclusion
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import time
+import uuid
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+except ImportError:
+    Ed25519PrivateKey = None
+
+STATE_KEY = 'proof_of_reserves'
+SNAPSHOT_STATE_PREFIX = 'reserve_snapshot:'
+LATEST_SNAPSHOT_KEY = 'reserve_snapshot:latest'
+# Private per-snapshot tree inputs (nonce and client leaves), for proofs after a restart
+TREE_STATE_PREFIX = 'reserve_tree:'
+
+# Environment variable holding the HMAC key used when no signer is configured
+SIGNING_KEY_ENV = 'OPTKAS1_POR_SIGNING_KEY'
+
+DEFAULT_SNAPSHOT_INTERVAL = 3600.0
+DEFAULT_TREE_HISTORY = 24
+
+# Liabilities are committed in the tree as integer micro-units of the token
+LIABILITY_DECIMALS = 6
+LIABILITY_SCALE = Decimal(10) ** LIABILITY_DECIMALS
+
+ZERO = Decimal('0')
+
+
+class LiabilityError(ValueError):
+    """Raised when a burn would take a client's USDT liability below zero"""
+
+
+def to_micro_units(amount: Decimal) -> int:
+    return int((amount * LIABILITY_SCALE).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def _canonical(payload: Dict) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode()
+
+
+# ============================================================================
+# Signers
+# ============================================================================
+
+class HMACSigner:
+    """HMAC-SHA256 signatures; verifiable by holders of the shared key (e.g. the auditor)"""
+
+    algorithm = 'HMAC-SHA256'
+
+    def __init__(self, key: bytes, key_id: Optional[str] = None):
+        self._key = key
+        self.key_id = key_id or hashlib.sha256(key).hexdigest()[:16]
+
+    @classmethod
+    def from_environment(cls) -> Tuple['HMACSigner', bool]:
+        """Signer keyed from SIGNING_KEY_ENV; returns (signer, ephemeral)"""
+        key = os.environ.get(SIGNING_KEY_ENV)
+        if key:
+            return cls(key.encode()), False
+        return cls(secrets.token_bytes(32)), True
+
+    def sign(self, message: bytes) -> str:
+        return hmac.new(self._key, message, hashlib.sha256).hexdigest()
+
+    def verify(self, message: bytes, signature: str) -> bool:
+        return hmac.compare_digest(self.sign(message), signature)
+
+
+class Ed25519Signer:
+    """Ed25519 signatures anyone can verify with the published public key (needs ``cryptography``)"""
+
+    algorithm = 'Ed25519'
+
+    def __init__(self, private_key=None, public_key_hex: Optional[str] = None):
+        if Ed25519PrivateKey is None:
+            raise RuntimeError("Ed25519 signing requires the cryptography package (pip install cryptography)")
+        self._private_key = private_key
+        if private_key is not None:
+            public_key = private_key.public_key()
+        else:
+            public_key = Ed25519PublicKey.from_public_bytes(bytes.fromhex(public_key_hex))
+        self._public_key = public_key
+        self.public_key_hex = public_key.public_bytes(Encoding.Raw, PublicFormat.Raw).hex()
+        self.key_id = self.public_key_hex[:16]
+
+    @classmethod
+    def generate(cls) -> 'Ed25519Signer':
+        if Ed25519PrivateKey is None:
+            raise RuntimeError("Ed25519 signing requires the cryptography package (pip install cryptography)")
+        return cls(Ed25519PrivateKey.generate())
+
+    def sign(self, message: bytes) -> str:
+        return self._private_key.sign(message).hex()
+
+    def verify(self, message: bytes, signature: str) -> bool:
+        try:
+            self._public_key.verify(bytes.fromhex(signature), message)
+            return True
+        except InvalidSignature:
+            return False
+
+
+# ============================================================================
+# Merkle sum tree
+# ============================================================================
+
+def client_leaf(client_id: str, liability_units: int, nonce: str) -> Tuple[bytes, int]:
+    """Leaf committing to one client's liability; the nonce keeps client IDs out of the published tree"""
+    if liability_units < 0:
+        raise LiabilityError(f"Negative liability for client leaf: {liability_units}")
+    commitment = hashlib.sha256(f"{nonce}:{client_id}".encode()).digest()
+    return hashlib.sha256(b'\x00' + commitment + liability_units.to_bytes(16, 'big')).digest(), liability_units
+
+
+def _sum_node(left: Tuple[bytes, int], right: Tuple[bytes, int]) -> Tuple[bytes, int]:
+    total = left[1] + right[1]
+    return hashlib.sha256(
+        b'\x01' + left[0] + left[1].to_bytes(16, 'big') + right[0] + right[1].to_bytes(16, 'big')
+    ).digest(), total
+
+
+def build_sum_tree(leaves: List[Tuple[bytes, int]]) -> List[List[Tuple[bytes, int]]]:
+    """All levels of a Merkle sum tree, leaves first; an unpaired node is carried up"""
+    levels = [leaves or [(hashlib.sha256(b'\x00').digest(), 0)]]
+    while len(levels[-1]) > 1:
+        current = levels[-1]
+        parent = [_sum_node(current[i], current[i + 1]) for i in range(0, len(current) - 1, 2)]
+        if len(current) % 2:
+            parent.append(current[-1])
+        levels.append(parent)
+    return levels
+
+
+def sum_tree_proof(levels: List[List[Tuple[bytes, int]]], leaf_index: int) -> List[Dict]:
+    proof = []
+    index = leaf_index
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({
+                'position': 'left' if sibling < index else 'right',
+                'hash': level[sibling][0].hex(),
+                'sum': level[sibling][1]
+            })
+        index //= 2
+    return proof
+
+
+def verify_liability_inclusion(client_id: str, proof: Dict, root: Optional[Dict] = None) -> Dict:
+    """Client-side check that a liability was included in a published snapshot
+
+    ``proof`` is what ``inclusion_proof`` returns; ``root`` should be the
+    ``liability_root`` of the signed snapshot the client fetched. Every
+    sibling sum must be non-negative, so no branch can hide a negative
+    balance that would shrink the total.
+    """
+    node = client_leaf(client_id, proof['liability_units'], proof['nonce'])
+    non_negative = proof['liability_units'] >= 0
+    for step in proof['path']:
+        sibling = (bytes.fromhex(step['hash']), step['sum'])
+        non_negative = non_negative and step['sum'] >= 0
+        node = _sum_node(sibling, node) if step['position'] == 'left' else _sum_node(node, sibling)
+    root = root or proof['liability_root']
+    checks = {
+        'root_hash_matches': node[0].hex() == root['hash'],
+        'root_sum_matches': node[1] == root['sum'],
+        'sums_non_negative': non_negative
+    }
+    return {'valid': all(checks.values()), 'checks': checks}
+
+
+# ============================================================================
+# Reserve tracker
+# ============================================================================
+
+class ProofOfReserves:
+    """Per-currency reserves and per-client USDT liabilities, kept current per mint/burn
+
+    ``record_mint`` adds the fiat that backs a mint to the reserve of its
+    currency; ``record_burn`` removes the fiat paid out, and refuses to burn
+    more than the client's outstanding liability. Both are O(1).
+    ``run`` takes a snapshot every ``snapshot_interval`` seconds on a fixed
+    schedule: it values reserves at the current FX rates, builds the client
+    liability tree, signs the summary and stores it. State is checkpointed
+    with each snapshot and the transaction log after the checkpoint is
+    replayed on startup. Each snapshot's nonce and leaves are stored
+    privately too, so inclusion proofs for published snapshots survive a
+    restart; the most recent ``tree_history`` trees are kept in memory.
+    """
+
+    def __init__(self,
+                 store,
+                 fx_rates,
+                 signer=None,
+                 snapshot_interval: float = DEFAULT_SNAPSHOT_INTERVAL,
+                 tree_history: int = DEFAULT_TREE_HISTORY,
+                 token: str = 'USDT',
+                 clock: Callable[[], float] = time.monotonic):
+        self.store = store
+        self.fx_rates = fx_rates
+        self.ephemeral_key = False
+        if signer is None:
+            signer, self.ephemeral_key = HMACSigner.from_environment()
+        self.signer = signer
+        self.snapshot_interval = snapshot_interval
+        self.tree_history = tree_history
+        self.token = token
+        self._clock = clock
+        self.reserves: Dict[str, Decimal] = {}
+        self.liabilities: Dict[str, Decimal] = {}
+        self.client_liabilities: Dict[str, Decimal] = {}
+        # Logged redemptions that exceeded the client's liability, skipped on replay
+        self.rejected_burns: List[str] = []
+        self._last_sequence = 0
+        self._last_snapshot_at = clock()
+        # snapshot_id -> (nonce, client_ids in leaf order, tree levels), most recent last
+        self._trees: Dict[str, Tuple[str, List[str], List]] = {}
+        self._restore()
+
+    # -- incremental updates ---------------------------------------------
+    def record_mint(self, client_id: str, token_amount: Decimal, fiat_currency: str, fiat_amount: Decimal,
+                    token: Optional[str] = None) -> None:
+        token = token or self.token
+        self.reserves[fiat_currency] = self.reserves.get(fiat_currency, ZERO) + fiat_amount
+        self.liabilities[token] = self.liabilities.get(token, ZERO) + token_amount
+        self.client_liabilities[client_id] = self.client_liabilities.get(client_id, ZERO) + token_amount
+
+    def client_liability(self, client_id: str) -> Decimal:
+        """USDT outstanding for a client: minted less burned"""
+        return self.client_liabilities.get(client_id, ZERO)
+
+    def record_burn(self, client_id: str, token_amount: Decimal, fiat_currency: str, fiat_amount: Decimal,
+                    token: Optional[str] = None) -> None:
+        remaining = self.client_liability(client_id) - token_amount
+        if remaining < 0:
+            raise LiabilityError(
+                f"Burn of {token_amount} exceeds {client_id}'s outstanding liability "
+                f"{self.client_liability(client_id)}"
+            )
+        token = token or self.token
+        self.reserves[fiat_currency] = self.reserves.get(fiat_currency, ZERO) - fiat_amount
+        self.liabilities[token] = self.liabilities.get(token, ZERO) - token_amount
+        if remaining:
+            self.client_liabilities[client_id] = remaining
+        else:
+            self.client_liabilities.pop(client_id, None)
+
+    def apply_transaction(self, entry: Dict) -> None:
+        """Apply one transaction-log entry (every entry advances the replay position)"""
+        self._last_sequence += 1
+        entry_type = entry.get('type')
+        if entry_type == 'USDT_ISSUED':
+            fiat_currency, fiat_amount = entry.get('fiat_currency'), entry.get('fiat_amount')
+            if fiat_currency is None:
+                # Entries written before reserve tracking: take the backing from the escrow account
+                account = self.store.get_escrow_account(entry['transaction_id']) or {}
+                fiat_currency, fiat_amount = account.get('currency', 'USD'), account.get('amount', ZERO)
+            self.record_mint(entry['client_id'], entry['amount'], fiat_currency, fiat_amount, entry.get('currency'))
+        elif entry_type == 'USDT_REDEEMED':
+            try:
+                self.record_burn(entry['client_id'], entry['amount'], entry['fiat_currency'],
+                                 entry['fiat_amount'], entry.get('currency'))
+            except LiabilityError:
+                self.rejected_burns.append(entry['transaction_id'])
+
+    # -- persistence -----------------------------------------------------
+    def _restore(self) -> None:
+        state = self.store.get_state(STATE_KEY)
+        if state is not None:
+            self.reserves = state['reserves']
+            self.liabilities = state['liabilities']
+            self.client_liabilities = state['client_liabilities']
+            self.rejected_burns = state.get('rejected_burns', [])
+            self._last_sequence = state['last_sequence']
+        for _, entry in self.store.iter_transactions(after_sequence=self._last_sequence):
+            self.apply_transaction(entry)
+
+    def _checkpoint(self) -> None:
+        self.store.put_state(STATE_KEY, {
+            'reserves': self.reserves,
+            'liabilities': self.liabilities,
+            'client_liabilities': self.client_liabilities,
+            'rejected_burns': self.rejected_burns,
+            'last_sequence': self._last_sequence
+        })
+
+    # -- snapshots -------------------------------------------------------
+    def status(self) -> Dict:
+        """Current reserve vs. liability position at the latest FX rates (no tree, not signed)"""
+        fx_snapshot = self.fx_rates.latest()
+        reserves = {
+            currency: {'amount': amount, 'usd_value': fx_snapshot.to_usd(amount, currency)}
+            for currency, amount in sorted(self.reserves.items())
+        }
+        total_reserves = sum((entry['usd_value'] for entry in reserves.values()), ZERO)
+        total_liabilities = sum(self.liabilities.values(), ZERO)
+        return {
+            'reserves': reserves,
+            'total_reserves_usd': total_reserves,
+            'liabilities': dict(self.liabilities),
+            'total_liabilities': total_liabilities,
+            'coverage_ratio': (total_reserves / total_liabilities).quantize(Decimal('0.000001'))
+                              if total_liabilities else None,
+            'fully_reserved': total_reserves >= total_liabilities,
+            'fx_snapshot_id': fx_snapshot.snapshot_id,
+            'client_count': len(self.client_liabilities),
+            'rejected_burns': len(self.rejected_burns)
+        }
+
+    def take_snapshot(self) -> Dict:
+        """Build the liability tree, sign the reserve summary and store it"""
+        snapshot_id = f"POR_{datetime.now().strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8].upper()}"
+        nonce = secrets.token_hex(16)
+        client_ids = sorted(client_id for client_id, amount in self.client_liabilities.items() if amount > 0)
+        levels = build_sum_tree([
+            client_leaf(client_id, to_micro_units(self.client_liabilities[client_id]), nonce)
+            for client_id in client_ids
+        ])
+        root_hash, root_sum = levels[-1][0]
+
+        snapshot = {
+            'snapshot_id': snapshot_id,
+            'as_of': datetime.now().isoformat(),
+            'last_sequence': self._last_sequence,
+            **self.status(),
+            'liability_root': {'hash': root_hash.hex(), 'sum': root_sum, 'decimals': LIABILITY_DECIMALS},
+            'leaf_count': len(client_ids)
+        }
+        snapshot['signature'] = {
+            'algorithm': self.signer.algorithm,
+            'key_id': self.signer.key_id,
+            'value': self.signer.sign(_canonical(snapshot))
+        }
+
+        self._retain_tree(snapshot_id, (nonce, client_ids, levels))
+        self.store.put_state(f"{TREE_STATE_PREFIX}{snapshot_id}", {
+            'nonce': nonce,
+            'leaves': [[client_id, leaf_sum] for client_id, (_, leaf_sum) in zip(client_ids, levels[0])]
+        })
+        self.store.put_state(f"{SNAPSHOT_STATE_PREFIX}{snapshot_id}", snapshot)
+        self.store.put_state(LATEST_SNAPSHOT_KEY, snapshot)
+        self._checkpoint()
+        self._last_snapshot_at = self._clock()
+        return snapshot
+
+    def snapshot_if_due(self) -> Optional[Dict]:
+        """Take the scheduled snapshot if its time has come; the schedule does not drift"""
+        scheduled = self._last_snapshot_at
+        elapsed = self._clock() - scheduled
+        if elapsed < self.snapshot_interval:
+            return None
+        snapshot = self.take_snapshot()
+        # Stay on the fixed grid (skipping slots missed while busy) rather than restarting it at now
+        self._last_snapshot_at = scheduled + (elapsed // self.snapshot_interval) * self.snapshot_interval
+        return snapshot
+
+    async def run(self, interval: float = 1.0) -> None:
+        """Background loop that takes each snapshot when it falls due (checked at least every ``interval``)"""
+        while True:
+            due_in = self._last_snapshot_at + self.snapshot_interval - self._clock()
+            await asyncio.sleep(min(interval, max(due_in, 0)))
+            self.snapshot_if_due()
+
+    def _retain_tree(self, snapshot_id: str, tree: Tuple[str, List[str], List]) -> None:
+        self._trees.pop(snapshot_id, None)
+        self._trees[snapshot_id] = tree
+        while len(self._trees) > self.tree_history:
+            del self._trees[next(iter(self._trees))]
+
+    def _tree(self, snapshot_id: Optional[str]) -> Optional[Tuple[str, str, List[str], List]]:
+        """(snapshot_id, nonce, client_ids, levels), rebuilt from stored leaves if not in memory"""
+        if snapshot_id is None:
+            if self._trees:
+                snapshot_id = next(reversed(self._trees))
+            else:
+                latest = self.latest_snapshot()
+                if latest is None:
+                    return None
+                snapshot_id = latest['snapshot_id']
+        tree = self._trees.get(snapshot_id)
+        if tree is None:
+            stored = self.store.get_state(f"{TREE_STATE_PREFIX}{snapshot_id}")
+            if stored is None:
+                return None
+            client_ids = [client_id for client_id, _ in stored['leaves']]
+            levels = build_sum_tree([client_leaf(client_id, units, stored['nonce'])
+                                     for client_id, units in stored['leaves']])
+            tree = (stored['nonce'], client_ids, levels)
+            self._retain_tree(snapshot_id, tree)
+        return (snapshot_id,) + tree
+
+    def latest_snapshot(self) -> Optional[Dict]:
+        return self.store.get_state(LATEST_SNAPSHOT_KEY)
+
+    def get_snapshot(self, snapshot_id: str) -> Optional[Dict]:
+        return self.store.get_state(f"{SNAPSHOT_STATE_PREFIX}{snapshot_id}")
+
+    def verify_snapshot(self, snapshot: Dict) -> bool:
+        signature = snapshot.get('signature') or {}
+        unsigned = {key: value for key, value in snapshot.items() if key != 'signature'}
+        return (signature.get('key_id') == self.signer.key_id
+                and self.signer.verify(_canonical(unsigned), signature.get('value', '')))
+
+    def inclusion_proof(self, client_id: str, snapshot_id: Optional[str] = None) -> Optional[Dict]:
+        """Proof that a client's liability is a leaf of a snapshot's tree (the latest by default)"""
+        tree = self._tree(snapshot_id)
+        if tree is None:
+            return None
+        snapshot_id, nonce, client_ids, levels = tree
+        # client_ids is sorted, so the leaf index is a binary search away
+        low, high = 0, len(client_ids)
+        while low < high:
+            middle = (low + high) // 2
+            if client_ids[middle] < client_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(client_ids) or client_ids[low] != client_id:
+            return None
+        return {
+            'snapshot_id': snapshot_id,
+            'client_id': client_id,
+            'nonce': nonce,
+            'liability_units': levels[0][low][1],
+            'liability': Decimal(levels[0][low][1]) / LIABILITY_SCALE,
+            'leaf_index': low,
+            'path': sum_tree_proof(levels, low),
+            'liability_root': {'hash': levels[-1][0][0].hex(), 'sum': levels[-1][0][1]}
+        }
+
+    def export_liability_tree(self, path: str, snapshot_id: Optional[str] = None) -> Dict:
+        """Write a snapshot's leaves (hash, sum) for publication; no client IDs are included"""
+        tree = self._tree(snapshot_id)
+        if tree is None:
+            raise KeyError(f"No liability tree for snapshot {snapshot_id or '(latest)'}")
+        snapshot_id, _, _, levels = tree
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'snapshot_id': snapshot_id,
+                'liability_root': {'hash': levels[-1][0][0].hex(), 'sum': levels[-1][0][1]},
+                'decimals': LIABILITY_DECIMALS,
+                'leaves': [[leaf_hash.hex(), leaf_sum] for leaf_hash, leaf_sum in levels[0]]
+            }, f, separators=(',', ':'))
+        return {'snapshot_id': snapshot_id, 'path': path, 'leaf_count': len(levels[0])}
+
+
+if __name__ == "__main__":
+    # Client-side verification: proof_of_reserves.py <proof.json> [snapshot.json]
+    if len(sys.argv) < 2:
+        print("Usage: proof_of_reserves.py <proof.json> [snapshot.json]")
+        sys.exit(2)
+    with open(sys.argv[1]) as f:
+        inclusion = json.load(f)
+    published_root = None
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as f:
+            published_root = json.load(f)['liability_root']
+    result = verify_liability_inclusion(inclusion['client_id'], inclusion, published_root)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['valid'] else 1)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+PROPOSAL EXPORT - Render credit proposals to JSON / Markdown files as they are produced
+Each proposal is written once and discarded; an index.jsonl line records its files,
+so memory stays flat however many clients are in the batch
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set
+
+FORMATS = ('json', 'markdown')
+FILE_EXTENSIONS = {'json': '.json', 'markdown': '.md'}
+INDEX_FILE = 'index.jsonl'
+
+# Sections identical for every proposal in a batch; rendered to Markdown once
+STATIC_SECTIONS = ('cross_border_capabilities', 'next_steps')
+
+
+class ProposalExportError(Exception):
+    """Raised for unknown formats or an unusable output directory"""
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def proposal_file_stem(client_id: str) -> str:
+    """Filesystem-safe name for a client's proposal files; a hash suffix keeps rewritten IDs distinct"""
+    client_id = str(client_id)
+    stem = re.sub(r'[^A-Za-z0-9_-]', '_', client_id)
+    if stem != client_id or not stem:
+        stem = f"{stem}-{hashlib.sha256(client_id.encode()).hexdigest()[:8]}"
+    return stem
+
+
+def _title(key: str) -> str:
+    return key.replace('_', ' ').strip().title()
+
+
+def _markdown_block(value, indent: str = '') -> List[str]:
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            if isinstance(item, (dict, list)):
+                lines.append(f"{indent}- **{_title(key)}:**")
+                lines.extend(_markdown_block(item, indent + '  '))
+            else:
+                lines.append(f"{indent}- **{_title(key)}:** {item}")
+        return lines
+    if isinstance(value, list):
+        lines = []
+        for item in value:
+            if isinstance(item, (dict, list)):
+                lines.extend(_markdown_block(item, indent))
+            else:
+                lines.append(f"{indent}- {item}")
+        return lines
+    return [f"{indent}{value}"]
+
+
+def _markdown_section(key: str, value) -> str:
+    body = _markdown_block(value) if value is not None else ['_Not available_']
+    return '\n'.join([f"## {_title(key)}", '', *body, ''])
+
+
+def render_markdown(proposal: Dict, static_cache: Optional[Dict[str, str]] = None) -> str:
+    """Markdown rendering of a credit proposal
+
+    ``static_cache`` maps a section name in ``STATIC_SECTIONS`` to its
+    rendered text; sections found there are reused and missing ones are
+    rendered and added, so a batch renders them only once.
+    """
+    parts = [
+        f"# Credit Proposal - {proposal['client_id']}",
+        '',
+        f"- **Proposal Date:** {proposal['proposal_date']}",
+        f"- **Requested Amount:** {proposal['requested_amount']}",
+        f"- **Business Purpose:** {proposal['business_purpose']}",
+        f"- **Total Enhanced Capacity:** {proposal['total_enhanced_capacity']}",
+        '',
+        f"> {proposal['recommendation']}",
+        ''
+    ]
+    skip = {'client_id', 'proposal_date', 'requested_amount', 'business_purpose',
+            'total_enhanced_capacity', 'recommendation'}
+    for key, value in proposal.items():
+        if key in skip:
+            continue
+        if static_cache is not None and key in STATIC_SECTIONS:
+            if key not in static_cache:
+                static_cache[key] = _markdown_section(key, value)
+            parts.append(static_cache[key])
+        else:
+            parts.append(_markdown_section(key, value))
+    return '\n'.join(parts)
+
+
+class ProposalWriter:
+    """Writes each proposal to its own files and appends one line to index.jsonl
+
+    Files are written to ``.part`` and renamed, so a crash never leaves a
+    truncated proposal behind. ``write`` is safe to call from worker threads;
+    each file stem is claimed once per writer, so a repeated client_id is
+    rejected instead of overwriting (or racing on) the earlier proposal.
+    """
+
+    def __init__(self, directory: str, formats: Iterable[str] = FORMATS):
+        self.formats = tuple(formats)
+        unknown = set(self.formats) - set(FORMATS)
+        if unknown or not self.formats:
+            raise ProposalExportError(f"Unknown proposal formats: {sorted(unknown)}; expected {FORMATS}")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._static_markdown: Dict[str, str] = {}
+        self._claimed_stems: Set[str] = set()
+
+    def _write_file(self, path: str, text: str) -> None:
+        with open(path + '.part', 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(path + '.part', path)
+
+    def _append_index(self, entry: Dict) -> None:
+        line = json.dumps(entry, default=_json_value, separators=(',', ':'))
+        with self._lock:
+            self._index.write(line + '\n')
+            self._index.flush()
+
+    def _claim_stem(self, client_id: str) -> str:
+        stem = proposal_file_stem(client_id)
+        with self._lock:
+            if stem in self._claimed_stems:
+                raise ProposalExportError(f"Duplicate proposal for client {client_id!r} in this batch")
+            self._claimed_stems.add(stem)
+        return os.path.join(self.directory, stem)
+
+    def write(self, proposal: Dict) -> Dict[str, str]:
+        stem = self._claim_stem(proposal['client_id'])
+        files = {}
+        for fmt in self.formats:
+            path = stem + FILE_EXTENSIONS[fmt]
+            if fmt == 'json':
+                text = json.dumps(proposal, default=_json_value, indent=2)
+            else:
+                text = render_markdown(proposal, self._static_markdown)
+            self._write_file(path, text)
+            files[fmt] = path
+        self._append_index({
+            'client_id': proposal['client_id'],
+            'status': 'WRITTEN',
+            'requested_amount': proposal['requested_amount'],
+            'files': files
+        })
+        return files
+
+    def record_failure(self, client_id: Optional[str], error: str) -> None:
+        self._append_index({'client_id': client_id, 'status': 'FAILED', 'error': error})
+
+    def close(self) -> None:
+        with self._lock:
+            self._index.close()
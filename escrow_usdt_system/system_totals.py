@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+SYSTEM TOTALS - Running aggregates for escrow and USDT supply
+Maintained incrementally by the write paths so status reads are O(1); changes are
+flushed to the ledger as deltas so several processes can share one set of totals
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+from decimal import Decimal
+from typing import Dict, Optional
+
+STATE_KEY = 'system_totals'
+
+ZERO = Decimal('0')
+
+# Statuses of escrow accounts that never held (or no longer hold) client funds
+UNFUNDED_STATUSES = frozenset({'CANCELLED', 'EXPIRED', 'RELEASED'})
+
+
+class SystemTotals:
+    """Exact Decimal running totals: escrow by status/currency, USDT issued/burned, counts
+
+    A tracking instance (the one the write paths update) also accumulates
+    every change in ``unflushed``; ``flush`` adds those deltas to the stored
+    totals inside one ledger write transaction and reloads the result, so
+    concurrent writers never overwrite each other's counts.
+    """
+
+    def __init__(self, track_changes: bool = False):
+        # escrow_amounts[status][currency] -> native-currency amount
+        self.escrow_amounts: Dict[str, Dict[str, Decimal]] = {}
+        self.escrow_counts: Dict[str, int] = {}
+        self.usdt_issued = ZERO
+        self.usdt_burned = ZERO
+        self.issuance_count = 0
+        self.redemption_count = 0
+        self.transaction_count = 0
+        self.unflushed: Optional['SystemTotals'] = SystemTotals() if track_changes else None
+
+    # -- write-path hooks ------------------------------------------------
+    def _add_escrow(self, status: str, currency: str, amount: Decimal, count: int) -> None:
+        by_currency = self.escrow_amounts.setdefault(status, {})
+        by_currency[currency] = by_currency.get(currency, ZERO) + amount
+        self.escrow_counts[status] = self.escrow_counts.get(status, 0) + count
+
+    def record_escrow_created(self, status: str, currency: str, amount: Decimal) -> None:
+        self._add_escrow(status, currency, amount, 1)
+        if self.unflushed is not None:
+            self.unflushed.record_escrow_created(status, currency, amount)
+
+    def record_status_change(self, currency: str, amount: Decimal, old_status: str, new_status: str) -> None:
+        if old_status == new_status:
+            return
+        self._add_escrow(old_status, currency, -amount, -1)
+        self._add_escrow(new_status, currency, amount, 1)
+        if self.unflushed is not None:
+            self.unflushed.record_status_change(currency, amount, old_status, new_status)
+
+    def record_issued(self, usdt_amount: Decimal) -> None:
+        self.usdt_issued += usdt_amount
+        self.issuance_count += 1
+        if self.unflushed is not None:
+            self.unflushed.record_issued(usdt_amount)
+
+    def record_burned(self, usdt_amount: Decimal) -> None:
+        self.usdt_burned += usdt_amount
+        self.redemption_count += 1
+        if self.unflushed is not None:
+            self.unflushed.record_burned(usdt_amount)
+
+    def record_transaction(self) -> None:
+        self.transaction_count += 1
+        if self.unflushed is not None:
+            self.unflushed.record_transaction()
+
+    def merge(self, delta: 'SystemTotals') -> 'SystemTotals':
+        """Add another instance's totals (typically an unflushed delta) to this one"""
+        for status, by_currency in delta.escrow_amounts.items():
+            for currency, amount in by_currency.items():
+                self._add_escrow(status, currency, amount, 0)
+        for status, count in delta.escrow_counts.items():
+            self.escrow_counts[status] = self.escrow_counts.get(status, 0) + count
+        self.usdt_issued += delta.usdt_issued
+        self.usdt_burned += delta.usdt_burned
+        self.issuance_count += delta.issuance_count
+        self.redemption_count += delta.redemption_count
+        self.transaction_count += delta.transaction_count
+        return self
+
+    # -- reads -----------------------------------------------------------
+    @property
+    def escrow_account_count(self) -> int:
+        return sum(self.escrow_counts.values())
+
+    @property
+    def usdt_outstanding(self) -> Decimal:
+        return self.usdt_issued - self.usdt_burned
+
+    def escrow_by_currency(self) -> Dict[str, Decimal]:
+        """Funds held per currency; cancelled, expired and released accounts are excluded"""
+        totals: Dict[str, Decimal] = {}
+        for status, by_currency in self.escrow_amounts.items():
+            if status in UNFUNDED_STATUSES:
+                continue
+            for currency, amount in by_currency.items():
+                totals[currency] = totals.get(currency, ZERO) + amount
+        return totals
+
+    def escrow_value_usd(self, usd_rates: Dict[str, Decimal]) -> Decimal:
+        """Escrow value in USD, converting each currency total at the given rates"""
+        return sum(
+            (amount * usd_rates[currency] for currency, amount in self.escrow_by_currency().items()),
+            ZERO
+        )
+
+    # -- persistence -----------------------------------------------------
+    def to_record(self) -> Dict:
+        return {
+            'escrow_amounts': self.escrow_amounts,
+            'escrow_counts': self.escrow_counts,
+            'usdt_issued': self.usdt_issued,
+            'usdt_burned': self.usdt_burned,
+            'issuance_count': self.issuance_count,
+            'redemption_count': self.redemption_count,
+            'transaction_count': self.transaction_count
+        }
+
+    def _load_record(self, record: Dict) -> None:
+        self.escrow_amounts = record['escrow_amounts']
+        self.escrow_counts = record['escrow_counts']
+        self.usdt_issued = record['usdt_issued']
+        self.usdt_burned = record['usdt_burned']
+        self.issuance_count = record['issuance_count']
+        self.redemption_count = record['redemption_count']
+        self.transaction_count = record['transaction_count']
+
+    @classmethod
+    def from_record(cls, record: Dict, track_changes: bool = False) -> 'SystemTotals':
+        totals = cls(track_changes)
+        totals._load_record(record)
+        return totals
+
+    def flush(self, ledger) -> None:
+        """Apply unflushed deltas to the stored totals atomically, then adopt the stored view"""
+        delta, self.unflushed = self.unflushed, SystemTotals()
+
+        def apply(current: Optional[Dict]) -> Dict:
+            stored = SystemTotals.from_record(current) if current is not None else SystemTotals()
+            return stored.merge(delta).to_record()
+
+        self._load_record(ledger.update_state(STATE_KEY, apply))
+
+    def refresh(self, ledger) -> None:
+        """Adopt totals written by other processes, keeping this one's unflushed changes"""
+        record = ledger.get_state(STATE_KEY)
+        if record is not None:
+            self._load_record(SystemTotals.from_record(record).merge(self.unflushed or SystemTotals()).to_record())
+
+    @classmethod
+    def rebuild_from_ledger(cls, ledger, page_size: int = 1000) -> 'SystemTotals':
+        """Recompute every total with one full pass over the ledger (recovery only)"""
+        totals = cls()
+        after = None
+        while True:
+            page = ledger.find_escrow_accounts(after=after, limit=page_size)
+            for account in page:
+                totals.record_escrow_created(account['status'], account['currency'], account['amount'])
+            if len(page) < page_size:
+                break
+            after = (page[-1]['created_date'], page[-1]['transaction_id'])
+
+        for _, entry in ledger.iter_transactions():
+            totals.record_transaction()
+            if entry.get('type') == 'USDT_ISSUED':
+                totals.record_issued(entry['amount'])
+            elif entry.get('type') == 'USDT_REDEEMED':
+                totals.record_burned(entry['amount'])
+        return totals
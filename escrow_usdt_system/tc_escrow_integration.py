@@ -10,18 +10,37 @@ import asyncio
 import json
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Union
 import sys
 import os
 
 # Import existing TC infrastructure
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from escrow_usdt_system.escrow_usdt_core import EscrowUSDTCore
+from escrow_usdt_system.batch_pipeline import DEFAULT_CONCURRENCY, run_bounded
+from escrow_usdt_system.proposal_export import FORMATS as PROPOSAL_FORMATS, ProposalExportError, ProposalWriter
+from escrow_usdt_system.credit_batch import CreditBatchResult, assess_credit_batch
+from escrow_usdt_system.payment_routing import PaymentRouter, RoutingError
+from escrow_usdt_system.facility_allocator import FACILITIES, AllocationError, CreditRequest, FacilityAllocator
+
+# Recommendation text, filled in per proposal
+RECOMMENDATION_TRADITIONAL = (
+    "RECOMMENDED: Traditional TC credit facility provides full capacity for {purpose}. "
+    "Consider USDT option for enhanced liquidity and global capabilities."
+)
+RECOMMENDATION_ENHANCED = (
+    "RECOMMENDED: Enhanced capacity with fiat backing recommended. "
+    "Provides {purpose} funding plus USDT liquidity for global operations."
+)
+RECOMMENDATION_PARTIAL = (
+    "PARTIAL CAPACITY: Available capacity of ${capacity:,} covers significant portion of request. "
+    "Consider phased approach or additional collateral."
+)
 
 class EnhancedTCWithEscrowUSDT:
     """TC Infrastructure enhanced with fiat escrow and USDT capabilities"""
     
-    def __init__(self):
+    def __init__(self, allocation_objective: str = 'priority'):
         self.system_name = "Enhanced TC Infrastructure with Escrow & USDT"
         self.version = "v2.0 + Escrow"
         
@@ -33,6 +52,9 @@ class EnhancedTCWithEscrowUSDT:
         # Enhanced escrow and USDT system
         self.escrow_system = EscrowUSDTCore()
         
+        # Fee / spread / settlement-time graph over bank partners and USDT rails
+        self.payment_router = PaymentRouter.from_escrow_system(self.escrow_system)
+        
         # Enhanced capacity with fiat backing
         self.max_fiat_escrow_capacity = Decimal('500000000')  # $500M equivalent
         self.enhanced_ltv_with_fiat = Decimal('0.95')  # 95% LTV with fiat backing
@@ -71,6 +93,14 @@ class EnhancedTCWithEscrowUSDT:
             }
         }
         
+        # Shared limits across the credit and liquidity facilities, so competing
+        # requests cannot be promised the same capacity twice
+        self.facility_allocator = FacilityAllocator.from_opportunities(
+            self.business_opportunities,
+            fiat_pool=self.max_fiat_escrow_capacity,
+            objective=allocation_objective
+        )
+        
     async def enhanced_credit_assessment(self, 
                                        credit_request: Dict,
                                        include_fiat_backing: bool = True) -> Dict:
@@ -124,6 +154,65 @@ class EnhancedTCWithEscrowUSDT:
             ]
         }
     
+    def batch_credit_assessment(self,
+                                requests: Union[Mapping[str, Sequence], Iterable[Dict]],
+                                include_fiat_backing: bool = True) -> CreditBatchResult:
+        """Assess many credit requests at once, returning columnar results
+        
+        ``requests`` is either a mapping of columns (``amount``,
+        ``collateral_value``, optional per-row ``include_fiat_backing``) or an
+        iterable of request dicts with the same keys. Capacity, fiat top-up and
+        approval status match ``enhanced_credit_assessment`` row for row.
+        """
+        
+        return assess_credit_batch(
+            requests,
+            credit_capacity=self.tc_credit_capacity,
+            traditional_ltv=self.business_opportunities['traditional_credit']['ltv'],
+            max_fiat_capacity=self.max_fiat_escrow_capacity,
+            include_fiat_backing=include_fiat_backing
+        )
+    
+    def queue_credit_request(self, credit_request: Dict) -> Dict:
+        """Queue a request against the shared facility capacity and return its allocation
+        
+        Accepts ``request_id``, ``amount`` and optionally ``collateral_value``,
+        ``fiat_deposit``, ``priority``, ``rate`` and ``facilities``. Allocations
+        of lower-ranked requests may shrink as higher-ranked ones arrive; see
+        ``get_facility_allocations``.
+        """
+        
+        try:
+            allocation = self.facility_allocator.add(CreditRequest(
+                request_id=credit_request['request_id'],
+                amount=Decimal(str(credit_request['amount'])),
+                collateral_value=Decimal(str(credit_request.get('collateral_value', 0))),
+                fiat_deposit=Decimal(str(credit_request.get('fiat_deposit', 0))),
+                priority=credit_request.get('priority', 0),
+                rate=Decimal(str(credit_request.get('rate', '0.085'))),
+                facilities=tuple(credit_request.get('facilities', FACILITIES))
+            ))
+        except AllocationError as e:
+            return {'success': False, 'error': 'ALLOCATION_REJECTED', 'details': str(e)}
+        return {'success': True, **allocation}
+    
+    def withdraw_credit_request(self, request_id: str) -> Dict:
+        """Withdraw a queued request; its capacity is re-offered to lower-ranked requests"""
+        
+        try:
+            released = self.facility_allocator.withdraw(request_id)
+        except AllocationError as e:
+            return {'success': False, 'error': 'REQUEST_NOT_QUEUED', 'details': str(e)}
+        return {'success': True, 'released': released, 'reallocated': self.facility_allocator.last_recomputed}
+    
+    def get_facility_allocations(self) -> Dict:
+        """Current allocation of every queued request plus per-facility utilization"""
+        
+        return {
+            'allocations': self.facility_allocator.allocations(),
+            'summary': self.facility_allocator.summary()
+        }
+    
     async def usdt_liquidity_facility(self, liquidity_request: Dict) -> Dict:
         """USDT-based instant liquidity facility"""
         
@@ -167,18 +256,42 @@ class EnhancedTCWithEscrowUSDT:
         }
     
     async def cross_border_business_solution(self, business_request: Dict) -> Dict:
-        """Cross-border business solution with multi-currency support"""
+        """Cross-border business solution routed over bank partners and USDT rails
+        
+        ``optimize`` selects the cheapest (fees + FX spread) or fastest
+        (settlement hours) route; the quote is priced for the exact amount.
+        """
         
         source_currency = business_request['source_currency']
         target_currency = business_request.get('target_currency', 'USDT')
         amount = Decimal(str(business_request['amount']))
         business_purpose = business_request.get('purpose', 'Business Operations')
         
-        # Calculate multi-currency capacity
+        optimize = business_request.get('optimize', 'cheapest')
+        
         source_currency_info = self.escrow_system.currency_config.get(source_currency, {})
-        target_currency_info = self.escrow_system.currency_config.get(target_currency, {})
         
         if source_currency_info:
+            try:
+                route = self.payment_router.route(source_currency, target_currency, amount, optimize)
+            except RoutingError as e:
+                return {
+                    'error': 'NO_ROUTE',
+                    'details': str(e),
+                    'supported_currencies': list(self.escrow_system.currency_config.keys())
+                }
+            
+            # Same-currency requests route with no hops: a direct quote, nothing to convert
+            channels = [hop['channel'] for hop in route['hops']]
+            via_usdt = 'USDT_ISSUANCE' in channels
+            settles_on_ledger = bool(channels) and channels[-1] == 'USDT_ISSUANCE'
+            if not channels:
+                method = 'NO_CONVERSION'
+            elif via_usdt:
+                method = 'FIAT_TO_USDT_TO_TARGET'
+            else:
+                method = 'DIRECT_BANK_WIRE'
+            
             conversion_solution = {
                 'source': {
                     'currency': source_currency,
@@ -187,20 +300,20 @@ class EnhancedTCWithEscrowUSDT:
                     'processing_time': source_currency_info.get('processing_time')
                 },
                 'conversion': {
-                    'method': 'FIAT_TO_USDT_TO_TARGET',
-                    'intermediate_token': 'USDT',
-                    'benefits': [
-                        'Eliminate foreign exchange risk',
-                        'Instant global settlement',
-                        'Transparent exchange rates',
-                        'Professional custody'
-                    ]
+                    'method': method,
+                    'intermediate_token': 'USDT' if via_usdt else None,
+                    'optimized_for': optimize,
+                    'route': route['hops'],
+                    'total_cost_usd': route['total_cost_usd'],
+                    'cost_bps': route['cost_bps'],
+                    'fx_snapshot_id': route['fx_snapshot_id']
                 },
                 'target': {
                     'currency': target_currency,
-                    'estimated_amount': amount,  # Simplified for demo
-                    'delivery_method': 'USDT_TRANSFER' if target_currency == 'USDT' else 'BANK_WIRE',
-                    'settlement_time': 'Instant' if target_currency == 'USDT' else '1-2 business days'
+                    'estimated_amount': route['estimated_amount'],
+                    'delivery_method': 'USDT_TRANSFER' if settles_on_ledger else 'BANK_WIRE',
+                    'settlement_time': f"{route['settlement_hours']} hours",
+                    'settlement_hours': route['settlement_hours']
                 },
                 'business_features': {
                     'purpose': business_purpose,
@@ -280,6 +393,36 @@ class EnhancedTCWithEscrowUSDT:
                                               client_request: Dict) -> Dict:
         """Generate comprehensive credit proposal with all options"""
         
+        return await self._build_credit_proposal(client_request, self._proposal_static_sections())
+    
+    def _proposal_static_sections(self) -> Dict:
+        """Proposal sections that do not depend on the client request"""
+        
+        return {
+            'cross_border_capabilities': {
+                'available_currencies': list(self.escrow_system.currency_config.keys()),
+                'settlement_options': ['Wire Transfer', 'USDT Transfer', 'Multi-currency'],
+                'global_reach': 'Tier 1 banking partners worldwide',
+                'compliance': 'Full AML/KYC and regulatory adherence'
+            },
+            'usdt_use_cases': [
+                'Business payments and operations',
+                'Cross-border transactions',
+                'Trading and investment',
+                'Yield generation opportunities'
+            ],
+            'next_steps': [
+                'Review and approve traditional TC credit capacity',
+                'Consider fiat escrow for enhanced capacity if needed',
+                'Choose settlement currency (USD, USDT, multi-currency)',
+                'Complete compliance documentation',
+                'Execute credit facility and begin operations'
+            ]
+        }
+    
+    async def _build_credit_proposal(self, client_request: Dict, static: Dict) -> Dict:
+        """Assemble one proposal; ``static`` sections are shared, not copied"""
+        
         client_id = client_request['client_id']
         requested_amount = Decimal(str(client_request['amount']))
         collateral_value = Decimal(str(client_request.get('collateral_value', requested_amount)))
@@ -299,22 +442,9 @@ class EnhancedTCWithEscrowUSDT:
                 'fiat_deposit': f"${requested_amount:,}",
                 'usdt_issued': f"{requested_amount:,} USDT",
                 'liquidity_timing': 'Instant upon deposit confirmation',
-                'use_cases': [
-                    'Business payments and operations',
-                    'Cross-border transactions',
-                    'Trading and investment',
-                    'Yield generation opportunities'
-                ]
+                'use_cases': static['usdt_use_cases']
             }
         
-        # Cross-border capabilities
-        cross_border = {
-            'available_currencies': list(self.escrow_system.currency_config.keys()),
-            'settlement_options': ['Wire Transfer', 'USDT Transfer', 'Multi-currency'],
-            'global_reach': 'Tier 1 banking partners worldwide',
-            'compliance': 'Full AML/KYC and regulatory adherence'
-        }
-        
         return {
             'client_id': client_id,
             'proposal_date': datetime.now().isoformat(),
@@ -333,7 +463,7 @@ class EnhancedTCWithEscrowUSDT:
             
             'usdt_liquidity_option': usdt_option,
             
-            'cross_border_capabilities': cross_border,
+            'cross_border_capabilities': static['cross_border_capabilities'],
             
             'total_enhanced_capacity': f"${credit_assessment['enhanced_capacity_with_fiat']:,}",
             
@@ -343,13 +473,51 @@ class EnhancedTCWithEscrowUSDT:
                 business_purpose
             ),
             
-            'next_steps': [
-                'Review and approve traditional TC credit capacity',
-                'Consider fiat escrow for enhanced capacity if needed',
-                'Choose settlement currency (USD, USDT, multi-currency)',
-                'Complete compliance documentation',
-                'Execute credit facility and begin operations'
-            ]
+            'next_steps': static['next_steps']
+        }
+    
+    async def generate_proposals_bulk(self,
+                                      client_requests: Iterable[Dict],
+                                      output_dir: str,
+                                      formats: Sequence[str] = PROPOSAL_FORMATS,
+                                      concurrency: int = DEFAULT_CONCURRENCY) -> Dict:
+        """Generate proposals for many clients, streaming each one to disk
+        
+        ``client_requests`` may be a generator; it is consumed lazily with at
+        most ``concurrency`` proposals in flight. Every proposal is rendered
+        once to ``<client_id>.json`` / ``<client_id>.md`` and then dropped, and
+        ``index.jsonl`` records one line per client (including failures; a
+        repeated client_id is recorded as FAILED). Static sections are built once per batch and shared.
+        """
+        
+        try:
+            writer = ProposalWriter(output_dir, formats)
+        except (ProposalExportError, OSError) as e:
+            return {'success': False, 'error': 'PROPOSAL_EXPORT_FAILED', 'details': str(e)}
+        static = self._proposal_static_sections()
+        
+        async def produce(client_request: Dict) -> Dict:
+            try:
+                proposal = await self._build_credit_proposal(client_request, static)
+                await asyncio.to_thread(writer.write, proposal)
+            except Exception as e:
+                await asyncio.to_thread(writer.record_failure, client_request.get('client_id'), str(e))
+                return {'success': False}
+            return {'success': True}
+        
+        try:
+            _, stats = await run_bounded(client_requests, produce, concurrency, keep_results=False)
+        finally:
+            writer.close()
+        
+        return {
+            'success': stats['failed'] == 0,
+            'output_dir': output_dir,
+            'index': writer.index_path,
+            'formats': list(writer.formats),
+            'proposals_written': stats['succeeded'],
+            'failed': stats['failed'],
+            'stats': stats
         }
     
     def _generate_recommendation(self, 
@@ -360,11 +528,11 @@ class EnhancedTCWithEscrowUSDT:
         
         if requested_amount <= available_capacity:
             if requested_amount <= self.tc_credit_capacity:
-                return f"RECOMMENDED: Traditional TC credit facility provides full capacity for {business_purpose}. Consider USDT option for enhanced liquidity and global capabilities."
+                return RECOMMENDATION_TRADITIONAL.format(purpose=business_purpose)
             else:
-                return f"RECOMMENDED: Enhanced capacity with fiat backing recommended. Provides {business_purpose} funding plus USDT liquidity for global operations."
+                return RECOMMENDATION_ENHANCED.format(purpose=business_purpose)
         else:
-            return f"PARTIAL CAPACITY: Available capacity of ${available_capacity:,} covers significant portion of request. Consider phased approach or additional collateral."
+            return RECOMMENDATION_PARTIAL.format(capacity=available_capacity)
     
     def get_system_overview(self) -> Dict:
         """Get comprehensive overview of enhanced system"""
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+VELOCITY LIMITS - Rolling daily/monthly transaction limits per client
+Bucketed ring buffers give O(1) checks without rescanning the transaction log
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import threading
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+
+class RollingWindow:
+    """Sliding-window sum over a fixed number of time buckets
+
+    The window spans ``bucket_count * bucket_seconds``. Expired buckets are
+    zeroed lazily as time advances, so add/total are O(1) amortized.
+    """
+
+    __slots__ = ('bucket_seconds', 'bucket_count', '_amounts', '_epochs', '_total', '_last_epoch')
+
+    def __init__(self, bucket_seconds: int, bucket_count: int):
+        self.bucket_seconds = bucket_seconds
+        self.bucket_count = bucket_count
+        self._amounts: List[Decimal] = [Decimal('0')] * bucket_count
+        self._epochs: List[int] = [-1] * bucket_count
+        self._total = Decimal('0')
+        self._last_epoch = -1
+
+    def _epoch(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def _expire(self, current_epoch: int) -> None:
+        if current_epoch == self._last_epoch:
+            return
+        self._last_epoch = current_epoch
+        oldest_live = current_epoch - self.bucket_count + 1
+        for slot in range(self.bucket_count):
+            if self._epochs[slot] != -1 and self._epochs[slot] < oldest_live:
+                self._total -= self._amounts[slot]
+                self._amounts[slot] = Decimal('0')
+                self._epochs[slot] = -1
+
+    def total(self, now: float) -> Decimal:
+        self._expire(self._epoch(now))
+        return self._total
+
+    def add(self, amount: Decimal, now: float) -> int:
+        """Add amount to the current bucket and return that bucket's epoch"""
+        epoch = self._epoch(now)
+        self._expire(epoch)
+        slot = epoch % self.bucket_count
+        if self._epochs[slot] != epoch:
+            self._amounts[slot] = Decimal('0')
+            self._epochs[slot] = epoch
+        self._amounts[slot] += amount
+        self._total += amount
+        return epoch
+
+    def remove(self, amount: Decimal, epoch: int) -> None:
+        """Undo an earlier add, if its bucket is still inside the window"""
+        slot = epoch % self.bucket_count
+        if self._epochs[slot] == epoch:
+            self._amounts[slot] -= amount
+            self._total -= amount
+
+
+class VelocityLimiter:
+    """Per-client rolling transaction limits with atomic check-and-reserve
+
+    ``reserve`` checks both windows and records the amount under one lock,
+    so concurrent deposits for the same client cannot jointly exceed a
+    limit. Reservations are released if the transaction later fails.
+    """
+
+    DAY_SECONDS = 86400
+
+    def __init__(self,
+                 daily_limit: Decimal,
+                 monthly_limit: Decimal,
+                 suspicious_threshold: Optional[Decimal] = None,
+                 clock: Callable[[], float] = time.time):
+        self.daily_limit = Decimal(str(daily_limit))
+        self.monthly_limit = Decimal(str(monthly_limit))
+        self.suspicious_threshold = (
+            Decimal(str(suspicious_threshold)) if suspicious_threshold is not None else None
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Dict[str, RollingWindow]] = {}
+
+    def _client_windows(self, client_id: str) -> Dict[str, RollingWindow]:
+        windows = self._windows.get(client_id)
+        if windows is None:
+            windows = {
+                # 24 hourly buckets and 30 daily buckets
+                'daily': RollingWindow(3600, 24),
+                'monthly': RollingWindow(self.DAY_SECONDS, 30)
+            }
+            self._windows[client_id] = windows
+        return windows
+
+    def usage(self, client_id: str) -> Dict:
+        now = self._clock()
+        with self._lock:
+            windows = self._client_windows(client_id)
+            daily, monthly = windows['daily'].total(now), windows['monthly'].total(now)
+        return {
+            'daily_used': daily,
+            'daily_remaining': max(self.daily_limit - daily, Decimal('0')),
+            'monthly_used': monthly,
+            'monthly_remaining': max(self.monthly_limit - monthly, Decimal('0'))
+        }
+
+    def reserve(self, client_id: str, usd_amount: Decimal) -> Dict:
+        """Check limits and, if allowed, record the amount against the client"""
+        now = self._clock()
+        with self._lock:
+            windows = self._client_windows(client_id)
+            daily_total = windows['daily'].total(now)
+            monthly_total = windows['monthly'].total(now)
+
+            if daily_total + usd_amount > self.daily_limit:
+                return {
+                    'allowed': False,
+                    'error': 'DAILY_LIMIT_EXCEEDED',
+                    'details': f'Daily limit ${self.daily_limit:,} would be exceeded '
+                               f'(used ${daily_total:,}, requested ${usd_amount:,})'
+                }
+            if monthly_total + usd_amount > self.monthly_limit:
+                return {
+                    'allowed': False,
+                    'error': 'MONTHLY_LIMIT_EXCEEDED',
+                    'details': f'Monthly limit ${self.monthly_limit:,} would be exceeded '
+                               f'(used ${monthly_total:,}, requested ${usd_amount:,})'
+                }
+
+            reservation = {
+                'client_id': client_id,
+                'amount': usd_amount,
+                'daily_epoch': windows['daily'].add(usd_amount, now),
+                'monthly_epoch': windows['monthly'].add(usd_amount, now)
+            }
+
+        suspicious = (
+            self.suspicious_threshold is not None and
+            (usd_amount >= self.suspicious_threshold or
+             daily_total + usd_amount >= self.suspicious_threshold)
+        )
+        return {'allowed': True, 'reservation': reservation, 'suspicious_activity': suspicious}
+
+    def record(self, client_id: str, usd_amount: Decimal, at: float) -> None:
+        """Record a historical transaction (used to warm the windows on startup)
+
+        Calls must be made in ascending time order and before live traffic.
+        """
+        with self._lock:
+            windows = self._client_windows(client_id)
+            windows['daily'].add(usd_amount, at)
+            windows['monthly'].add(usd_amount, at)
+
+    def release(self, reservation: Dict) -> None:
+        """Return a reservation's amount to the client's windows"""
+        with self._lock:
+            windows = self._windows.get(reservation['client_id'])
+            if windows is None:
+                return
+            windows['daily'].remove(reservation['amount'], reservation['daily_epoch'])
+            windows['monthly'].remove(reservation['amount'], reservation['monthly_epoch'])
+
+    def reservation_at(self, client_id: str, usd_amount: Decimal, at: float) -> Dict:
+        """The reservation ``record(client_id, usd_amount, at)`` made, for releasing it later"""
+        with self._lock:
+            windows = self._client_windows(client_id)
+            return {
+                'client_id': client_id,
+                'amount': usd_amount,
+                'daily_epoch': windows['daily']._epoch(at),
+                'monthly_epoch': windows['monthly']._epoch(at)
+            }
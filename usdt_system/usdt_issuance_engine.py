@@ -4,16 +4,27 @@
 from decimal import Decimal
 import uuid
 from datetime import datetime
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from escrow_usdt_system.fx_rates import FXRateService
 
 class USDTIssuanceEngine:
-    def __init__(self):
+    def __init__(self, fx_rates=None, proof_of_reserves=None):
+        # Shared FX service so issuance uses the same rate snapshots as escrow
+        self.fx_rates = fx_rates if fx_rates is not None else FXRateService.with_default_rates()
+        # Optional ProofOfReserves tracker; mints are recorded against the per-currency reserve
+        self.proof_of_reserves = proof_of_reserves
         self.backing_ratio = Decimal('1.00')  # 1:1 backing
         self.total_issued = Decimal('0')
         self.total_backing = Decimal('0')
         
-    def issue_usdt(self, fiat_amount, currency, escrow_confirmation):
+    def issue_usdt(self, fiat_amount, currency, escrow_confirmation, client_id=None):
         # Convert to USD equivalent
-        usd_equivalent = self.convert_to_usd(fiat_amount, currency)
+        fx_snapshot = self.fx_rates.current()
+        fiat_amount = Decimal(str(fiat_amount))
+        usd_equivalent = fx_snapshot.to_usd(fiat_amount, currency)
         
         # Issue USDT tokens 1:1 with USD
         usdt_amount = usd_equivalent * self.backing_ratio
@@ -24,6 +35,7 @@ class USDTIssuanceEngine:
             'usdt_amount': usdt_amount,
             'fiat_backing': f"{fiat_amount} {currency}",
             'usd_equivalent': usd_equivalent,
+            'fx_snapshot_id': fx_snapshot.snapshot_id,
             'timestamp': datetime.now().isoformat(),
             'backing_confirmation': escrow_confirmation,
             'redemption_available': True
@@ -31,15 +43,29 @@ class USDTIssuanceEngine:
         
         self.total_issued += usdt_amount
         self.total_backing += usd_equivalent
+        if self.proof_of_reserves is not None:
+            self.proof_of_reserves.record_mint(
+                client_id or issuance['transaction_id'], usdt_amount, currency, fiat_amount
+            )
         
         return issuance
         
     def convert_to_usd(self, amount, currency):
-        # Simplified exchange rates for demo
-        rates = {'USD': 1.00, 'EUR': 1.08, 'GBP': 1.25}
-        return Decimal(str(amount)) * Decimal(str(rates.get(currency, 1.00)))
+        usd_equivalent, _ = self.fx_rates.to_usd(Decimal(str(amount)), currency)
+        return usd_equivalent
         
     def get_backing_status(self):
+        if self.proof_of_reserves is not None:
+            # Reserves revalued per currency at current rates, not the USD booked at mint time
+            status = self.proof_of_reserves.status()
+            return {
+                'total_usdt_issued': status['total_liabilities'],
+                'total_fiat_backing': status['total_reserves_usd'],
+                'backing_ratio': status['coverage_ratio'] or 0,
+                'fully_backed': status['fully_reserved'],
+                'reserves_by_currency': status['reserves'],
+                'fx_snapshot_id': status['fx_snapshot_id']
+            }
         return {
             'total_usdt_issued': self.total_issued,
             'total_fiat_backing': self.total_backing,
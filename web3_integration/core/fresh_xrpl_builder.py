@@ -13,6 +13,7 @@ from datetime import datetime, UTC
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 import os
+import sys
 
 # Mock XRPL integration for development
 try:
@@ -27,6 +28,10 @@ except ImportError:
     print("📋 Using mock implementation for development.")
     XRPL_AVAILABLE = False
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from web3_integration.core.xrpl_client import XRPLClient, get_shared_client, live_ledger_enabled, network_endpoints
+from web3_integration.core.xrpl_trustline_fetcher import TrustlineFetcher
+
 @dataclass
 class StablecoinIssuer:
     name: str
@@ -60,18 +65,16 @@ class FreshXRPLSystem:
     Uses only legitimate stablecoin issuers via trustlines
     """
     
-    def __init__(self, network: str = "mainnet"):
+    def __init__(self, network: str = "mainnet", xrpl_client: Optional[XRPLClient] = None):
         self.network = network
         self.starting_xrp = 138
         self.used_xrp = 0
         
-        # Network configuration
-        if network == "mainnet":
-            self.client_url = "https://s1.ripple.com:51234/"
-            self.websocket_url = "wss://s1.ripple.com/"
-        else:
-            self.client_url = "https://s.altnet.rippletest.net:51234/"
-            self.websocket_url = "wss://s.altnet.rippletest.net:51233"
+        # Network configuration (shared with the other bridges via the pooled client)
+        websocket_urls, self.client_url = network_endpoints(network)
+        self.websocket_url = websocket_urls[0]
+        self._xrpl_client = xrpl_client
+        self.live_ledger = live_ledger_enabled(xrpl_client, XRPL_AVAILABLE)
         
         # Initialize legitimate stablecoin issuers
         self.verified_issuers = self._initialize_issuers()
@@ -246,6 +249,34 @@ class FreshXRPLSystem:
         
         return trustline_cost
     
+    @property
+    def xrpl_client(self) -> XRPLClient:
+        """Injected client, or the shared pooled client for this network"""
+        return self._xrpl_client or get_shared_client(self.network)
+    
+    async def refresh_trustline_balances(self) -> Dict:
+        """Read every wallet's trustlines from the ledger concurrently and update balances"""
+        if not self.live_ledger:
+            return {'status': 'MOCK', 'wallets_checked': 0}
+        
+        wallets = [wallet for wallet in self.wallets.values() if wallet.status != 'MOCK_GENERATED']
+        table = await TrustlineFetcher(self.xrpl_client).fetch(wallet.address for wallet in wallets)
+        lines = {(row.wallet, row.currency, row.issuer): row for row in table.rows}
+        
+        for trustline in self.trustlines:
+            if trustline.wallet.address in table.errors or trustline.wallet.address in table.unfunded:
+                continue
+            row = lines.get((trustline.wallet.address, trustline.issuer.currency, trustline.issuer.issuer_address))
+            trustline.established = row is not None
+            trustline.balance = float(row.balance) if row else 0.0
+        
+        return {
+            'status': 'REFRESHED' if not table.errors else 'PARTIAL',
+            'wallets_checked': len(wallets),
+            'unfunded_wallets': table.unfunded,
+            'errors': table.errors
+        }
+    
     def generate_partner_agreement_update(self) -> Dict:
         """Generate updated partner agreement with fresh XRPL details"""
         
@@ -11,6 +11,7 @@ from datetime import datetime, UTC
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 import os
+import sys
 
 # Mock XRPL integration for development
 try:
@@ -25,6 +26,9 @@ except ImportError:
     print("📋 Using mock implementation for development.")
     XRPL_AVAILABLE = False
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from web3_integration.core.xrpl_client import XRPLClient, currency_code, get_shared_client, live_ledger_enabled
+
 @dataclass
 class DebtComponent:
     category: str
@@ -170,8 +174,11 @@ class FreshIOUDebtSettler:
     Creates clean partnership state for enhanced TC operations
     """
     
-    def __init__(self, fresh_wallets: Dict):
+    def __init__(self, fresh_wallets: Dict, network: str = "mainnet", xrpl_client: Optional[XRPLClient] = None):
         self.fresh_wallets = fresh_wallets
+        self.network = network
+        self._xrpl_client = xrpl_client
+        self.live_ledger = live_ledger_enabled(xrpl_client, XRPL_AVAILABLE)
         self.settlement_timestamp = datetime.now(UTC).isoformat()
         self.settlement_id = f"UNYKORN_DEBT_SETTLEMENT_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}"
         
@@ -250,6 +257,39 @@ class FreshIOUDebtSettler:
         self.issuance_confirmations.append(iou_issuance)
         return iou_issuance
     
+    @property
+    def xrpl_client(self) -> XRPLClient:
+        """Injected client, or the shared pooled client for this network"""
+        return self._xrpl_client or get_shared_client(self.network)
+    
+    async def confirm_iou_on_ledger(self, iou_issuance: IOUIssuance) -> Dict:
+        """Check the recipient's trustline to the issuer holds the issued IOU amount"""
+        if not self.live_ledger:
+            return {'status': 'MOCK_CONFIRMED', 'txn_hash': iou_issuance.txn_hash}
+        
+        currency = currency_code(iou_issuance.token_symbol)
+        try:
+            line, ledger_index = await self.xrpl_client.find_trustline(
+                iou_issuance.recipient_address, currency, iou_issuance.issuer_address
+            )
+        except Exception as e:
+            return {'status': 'ERROR', 'error': str(e), 'recipient': iou_issuance.recipient_address}
+        
+        if line is None:
+            return {'status': 'TRUSTLINE_NOT_FOUND', 'currency': currency, 'ledger_index': ledger_index}
+        
+        balance = float(line.get('balance', 0))
+        confirmed = balance >= iou_issuance.amount
+        if confirmed:
+            iou_issuance.status = "LEDGER_CONFIRMED"
+        return {
+            'status': 'CONFIRMED' if confirmed else 'BALANCE_MISMATCH',
+            'currency': currency,
+            'ledger_balance': balance,
+            'expected_amount': iou_issuance.amount,
+            'ledger_index': ledger_index
+        }
+    
     def execute_complete_debt_settlement(self) -> Dict:
         """Execute complete debt settlement workflow"""
         
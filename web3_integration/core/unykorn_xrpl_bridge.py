@@ -11,6 +11,8 @@ from datetime import datetime
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 import uuid
+import os
+import sys
 
 try:
     import xrpl
@@ -22,6 +24,13 @@ except ImportError:
     print("📋 For now, using mock implementation.")
     xrpl = None
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from web3_integration.core.xrpl_client import (
+    XRPLClient, close_shared_clients, currency_code, get_shared_client, live_ledger_enabled, network_endpoints
+)
+from web3_integration.core.xrpl_balance_cache import LedgerBalanceCache
+from web3_integration.core.xrpl_trustline_fetcher import WALLET_MANIFEST_PATH, TrustlineFetcher, TrustlineTable
+
 @dataclass
 class PortfolioAsset:
     name: str
@@ -47,11 +56,15 @@ class UnyKornXRPLBridge:
     Focuses on verification, settlement, and POF generation
     """
     
-    def __init__(self, network: str = "mainnet"):
+    def __init__(self, network: str = "mainnet", xrpl_client: Optional[XRPLClient] = None):
         self.network = network
-        self.client_url = "https://s1.ripple.com:51234/" if network == "mainnet" else "https://s.altnet.rippletest.net:51234/"
-        self.websocket_url = "wss://s1.ripple.com/" if network == "mainnet" else "wss://s.altnet.rippletest.net:51233"
-        
+        websocket_urls, self.client_url = network_endpoints(network)
+        self.websocket_url = websocket_urls[0]
+
+        # Ledger queries go through the process-wide pooled client unless one is injected
+        self._xrpl_client = xrpl_client
+        self.live_ledger = live_ledger_enabled(xrpl_client, xrpl is not None)
+
         # Known OPTKAS1 addresses
         self.optkas1_usdt_wallet = "rpP12ND2K7ZRzXZBEUnQM2i18tMGytXnW1"
         self.attestation_wallet = "rEYYpZJ7KNqj5dqHExM9VCQWNG6j7j1GLV"
@@ -63,6 +76,9 @@ class UnyKornXRPLBridge:
         # XRP balance tracking
         self.xrp_balance = 138  # Starting balance
         
+        # Subscription-driven balances (see start_balance_tracking)
+        self.balance_cache: Optional[LedgerBalanceCache] = None
+        
     def _initialize_portfolio(self) -> List[PortfolioAsset]:
         """Initialize known portfolio assets"""
         return [
@@ -89,9 +105,36 @@ class UnyKornXRPLBridge:
             )
         ]
     
+    @property
+    def xrpl_client(self) -> XRPLClient:
+        """Injected client, or the shared pooled client for this network"""
+        return self._xrpl_client or get_shared_client(self.network)
+
+    async def start_balance_tracking(self, extra_wallets: List[str] = ()) -> LedgerBalanceCache:
+        """Subscribe to the OPTKAS1 wallets (plus e.g. treasury wallets) and keep balances cached"""
+        if self.balance_cache is None:
+            wallets = [self.optkas1_usdt_wallet, self.attestation_wallet, *extra_wallets]
+            self.balance_cache = LedgerBalanceCache(self.xrpl_client, wallets)
+        await self.balance_cache.start()
+        return self.balance_cache
+    
     async def verify_xrpl_assets(self) -> Dict:
         """Verify XRPL USDT holdings in real-time"""
-        if not xrpl:
+        if self.balance_cache is not None and self.balance_cache.synced.is_set():
+            line = self.balance_cache.trustline(self.optkas1_usdt_wallet, currency_code("USDT"), self.usdt_issuer)
+            return {
+                "status": "VERIFIED",
+                "wallet": self.optkas1_usdt_wallet,
+                "balance": float(line["balance"]) if line else 0,
+                "currency": "USDT",
+                "issuer": self.usdt_issuer,
+                "verification_timestamp": datetime.now().isoformat(),
+                "verification_url": f"https://livenet.xrpl.org/accounts/{self.optkas1_usdt_wallet}",
+                "ledger_index": line["ledger_index"] if line else self.balance_cache.validated_ledger_index,
+                "source": "ledger_subscription"
+            }
+        
+        if not self.live_ledger:
             # Mock response for testing
             return {
                 "status": "MOCK_VERIFIED",
@@ -104,20 +147,11 @@ class UnyKornXRPLBridge:
             }
         
         try:
-            client = JsonRpcClient(self.client_url)
-            
-            # Get account lines (trust lines) to check USDT balance
-            account_lines = client.request({
-                "command": "account_lines",
-                "account": self.optkas1_usdt_wallet,
-                "ledger_index": "validated"
-            })
-            
-            usdt_balance = 0
-            for line in account_lines.result.get("lines", []):
-                if line.get("currency") == "USDT" and line.get("account") == self.usdt_issuer:
-                    usdt_balance = float(line.get("balance", 0))
-                    break
+            # Trust line to the USDT issuer carries the balance (paged until found)
+            line, ledger_index = await self.xrpl_client.find_trustline(
+                self.optkas1_usdt_wallet, currency_code("USDT"), self.usdt_issuer
+            )
+            usdt_balance = float(line.get("balance", 0)) if line else 0
             
             return {
                 "status": "VERIFIED",
@@ -127,7 +161,7 @@ class UnyKornXRPLBridge:
                 "issuer": self.usdt_issuer,
                 "verification_timestamp": datetime.now().isoformat(),
                 "verification_url": f"https://livenet.xrpl.org/accounts/{self.optkas1_usdt_wallet}",
-                "ledger_index": account_lines.result.get("ledger_index")
+                "ledger_index": ledger_index
             }
             
         except Exception as e:
@@ -137,6 +171,10 @@ class UnyKornXRPLBridge:
                 "wallet": self.optkas1_usdt_wallet
             }
     
+    async def fetch_manifest_trustlines(self, manifest_path: str = WALLET_MANIFEST_PATH) -> TrustlineTable:
+        """All trustlines of every XRPL wallet in the execution wallet manifest, fetched concurrently"""
+        return await TrustlineFetcher(self.xrpl_client).fetch_manifest(manifest_path)
+    
     async def generate_institutional_pof(self, lender_id: str, requested_facility: float) -> InstitutionalPOF:
         """Generate institutional-grade Proof of Funds document"""
         
@@ -383,6 +421,8 @@ async def demo_institutional_deployment():
     print(f"📊 Services Status:")
     for service, status in final_status['services'].items():
         print(f"   {service}: {status}")
+    
+    await close_shared_clients()
 
 if __name__ == "__main__":
     print("🌟 UNYKORN-TC XRPL Funding Bridge")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+XRPL BALANCE CACHE
+In-memory XRP balances and trustlines for tracked wallets, kept current from account and
+ledger subscription streams instead of polling; every read reports the validated ledger it reflects
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import asyncio
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from web3_integration.core.xrpl_client import XRPLClient, XRPLRequestError, currency_name
+
+
+class BalanceCacheError(Exception):
+    """Raised when reading a wallet the cache does not track, or before the first sync"""
+
+
+class _WalletState:
+    __slots__ = ('xrp_drops', 'xrp_ledger', 'lines', 'exists')
+
+    def __init__(self):
+        self.xrp_drops: Optional[int] = None
+        self.xrp_ledger = 0
+        # (readable currency, issuer) -> (line dict in account_lines shape, ledger index it reflects);
+        # a deleted line is kept as a (None, ledger index) tombstone so older data cannot revive it
+        self.lines: Dict[Tuple[str, str], Tuple[Optional[Dict], int]] = {}
+        self.exists = True
+
+
+def _line_from_ripple_state(wallet: str, fields: Dict) -> Optional[Tuple[Tuple[str, str], Dict]]:
+    """RippleState fields seen from ``wallet``: positive balance means the low side holds the IOU"""
+    low, high = fields.get('LowLimit', {}), fields.get('HighLimit', {})
+    balance = fields.get('Balance', {})
+    currency = balance.get('currency') or low.get('currency')
+    if low.get('issuer') == wallet:
+        own, peer, value = low, high, balance.get('value', '0')
+    elif high.get('issuer') == wallet:
+        own, peer = high, low
+        value = balance.get('value', '0')
+        value = value[1:] if value.startswith('-') else ('-' + value if value not in ('0', '') else value)
+    else:
+        return None
+    return (currency_name(currency), peer['issuer']), {
+        'account': peer['issuer'],
+        'currency': currency,
+        'balance': value,
+        'limit': own.get('value', '0'),
+        'limit_peer': peer.get('value', '0')
+    }
+
+
+class LedgerBalanceCache:
+    """Subscription-driven balance/trustline cache
+
+    ``start`` subscribes to the wallets' account streams and the ledger
+    stream, then loads every wallet from the validated ledger
+    (``account_info`` plus all ``account_lines`` pages). After that,
+    validated transactions update the cache from their AffectedNodes final
+    fields. Each entry remembers the ledger it came from and is only
+    overwritten by data from the same or a later ledger, so a resync racing
+    the stream cannot roll an entry back. Deleted lines stay as tombstones
+    for the same reason and read as absent. When the subscription socket is
+    replaced, the client re-subscribes and the cache resyncs.
+    """
+
+    def __init__(self, client: XRPLClient, wallets: Iterable[str]):
+        self.client = client
+        self.wallets = list(dict.fromkeys(wallets))
+        self._state: Dict[str, _WalletState] = {wallet: _WalletState() for wallet in self.wallets}
+        self.validated_ledger_index = 0
+        self.synced = asyncio.Event()
+        self.stats = {'transactions_applied': 0, 'resyncs': 0}
+        self._started = False
+
+    async def start(self) -> 'LedgerBalanceCache':
+        if not self._started:
+            self._started = True
+            self.client.add_stream_handler(self._on_stream)
+            self.client.add_reconnect_handler(self.resync)
+            result = await self.client.subscribe(accounts=self.wallets, streams=['ledger'])
+            self.validated_ledger_index = max(self.validated_ledger_index, result.get('ledger_index', 0))
+            await self.resync()
+        return self
+
+    # -- loading ---------------------------------------------------------
+    async def _load_wallet(self, wallet: str) -> None:
+        state = self._state[wallet]
+        try:
+            info = await self.client.account_info(wallet)
+        except XRPLRequestError as e:
+            if e.error != 'actNotFound':
+                raise
+            state.exists = False
+            return
+        ledger_index = info.get('ledger_index', 0)
+        if ledger_index >= state.xrp_ledger:
+            state.exists = True
+            state.xrp_drops = int(info['account_data']['Balance'])
+            state.xrp_ledger = ledger_index
+
+        seen = set()
+        marker = None
+        while True:
+            page = await self.client.account_lines(wallet, marker=marker)
+            page_ledger = page.get('ledger_index', ledger_index)
+            for line in page.get('lines', []):
+                key = (currency_name(line.get('currency', '')), line.get('account'))
+                seen.add(key)
+                if page_ledger >= state.lines.get(key, (None, 0))[1]:
+                    state.lines[key] = (dict(line), page_ledger)
+            marker = page.get('marker')
+            if marker is None:
+                break
+        # Lines deleted while disconnected
+        for key, (line, line_ledger) in list(state.lines.items()):
+            if line is not None and key not in seen and line_ledger <= page_ledger:
+                state.lines[key] = (None, page_ledger)
+        self.validated_ledger_index = max(self.validated_ledger_index, page_ledger)
+
+    async def resync(self) -> None:
+        """Reload every tracked wallet from the validated ledger, concurrently"""
+        await asyncio.gather(*(self._load_wallet(wallet) for wallet in self.wallets))
+        self.stats['resyncs'] += 1
+        self.synced.set()
+
+    # -- stream ----------------------------------------------------------
+    def _on_stream(self, message: Dict) -> None:
+        kind = message.get('type')
+        if kind == 'ledgerClosed':
+            self.validated_ledger_index = max(self.validated_ledger_index, message.get('ledger_index', 0))
+        elif kind == 'transaction' and message.get('validated'):
+            self.apply_transaction(message)
+
+    def apply_transaction(self, message: Dict) -> None:
+        """Apply a validated transaction's final AccountRoot / RippleState fields to tracked wallets"""
+        ledger_index = message.get('ledger_index', 0)
+        for affected in message.get('meta', {}).get('AffectedNodes', []):
+            kind, node = next(iter(affected.items()))
+            fields = node.get('FinalFields') or node.get('NewFields') or {}
+            entry_type = node.get('LedgerEntryType')
+            if entry_type == 'AccountRoot':
+                state = self._state.get(fields.get('Account'))
+                if state is not None and ledger_index >= state.xrp_ledger:
+                    state.exists = kind != 'DeletedNode'
+                    state.xrp_drops = int(fields['Balance']) if state.exists and 'Balance' in fields else None
+                    state.xrp_ledger = ledger_index
+            elif entry_type == 'RippleState':
+                for wallet in (fields.get('LowLimit', {}).get('issuer'), fields.get('HighLimit', {}).get('issuer')):
+                    state = self._state.get(wallet)
+                    if state is None:
+                        continue
+                    parsed = _line_from_ripple_state(wallet, fields)
+                    if parsed is None:
+                        continue
+                    key, line = parsed
+                    if ledger_index < state.lines.get(key, (None, 0))[1]:
+                        continue
+                    state.lines[key] = (None if kind == 'DeletedNode' else line, ledger_index)
+        self.validated_ledger_index = max(self.validated_ledger_index, ledger_index)
+        self.stats['transactions_applied'] += 1
+
+    # -- reads -----------------------------------------------------------
+    def _wallet(self, wallet: str) -> _WalletState:
+        state = self._state.get(wallet)
+        if state is None:
+            raise BalanceCacheError(f"Wallet {wallet} is not tracked")
+        if not self.synced.is_set():
+            raise BalanceCacheError("Balance cache has not completed its first sync")
+        return state
+
+    def trustline(self, wallet: str, currency: str, issuer: str) -> Optional[Dict]:
+        """Cached trustline (account_lines shape) plus ``ledger_index``, or None if the wallet has none
+
+        ``currency`` may be the symbol (``USDT``) or its 40-hex ledger code.
+        """
+        line, ledger_index = self._wallet(wallet).lines.get((currency_name(currency), issuer), (None, 0))
+        if line is None:
+            return None
+        return {**line, 'ledger_index': ledger_index}
+
+    def balances(self, wallet: str) -> Dict:
+        state = self._wallet(wallet)
+        return {
+            'wallet': wallet,
+            'exists': state.exists,
+            'xrp_drops': state.xrp_drops,
+            'trustlines': [{**line, 'ledger_index': ledger_index}
+                           for line, ledger_index in state.lines.values() if line is not None],
+            'validated_ledger_index': self.validated_ledger_index
+        }
+
+    def snapshot(self) -> List[Dict]:
+        return [self.balances(wallet) for wallet in self.wallets]
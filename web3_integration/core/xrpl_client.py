@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+SHARED XRPL CLIENT
+One async, connection-pooled XRPL client for every bridge in the process
+Requests are pipelined over persistent websockets (many in flight per socket, matched by id),
+each call has its own timeout, and dropped sockets are replaced on the next request
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import os
+import secrets
+import ssl
+import struct
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+# Public endpoints per network; OPTKAS1_XRPL_URL (comma-separated ws/wss URLs) overrides them,
+# e.g. to point every bridge at a local stand-in rippled
+NETWORKS = {
+    'mainnet': {
+        'websocket': ('wss://s1.ripple.com/', 'wss://xrplcluster.com/'),
+        'json_rpc': 'https://s1.ripple.com:51234/'
+    },
+    'testnet': {
+        'websocket': ('wss://s.altnet.rippletest.net:51233',),
+        'json_rpc': 'https://s.altnet.rippletest.net:51234/'
+    }
+}
+URL_OVERRIDE_ENV = 'OPTKAS1_XRPL_URL'
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_REQUEST_TIMEOUT = 10.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 30.0
+
+_WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+class XRPLClientError(Exception):
+    """Base class for shared XRPL client failures"""
+
+
+class XRPLConnectionError(XRPLClientError):
+    """The websocket could not be opened or was closed with requests in flight"""
+
+
+class XRPLTimeoutError(XRPLClientError):
+    """No response arrived within the per-call timeout"""
+
+
+class XRPLRequestError(XRPLClientError):
+    """rippled answered with an error (e.g. actNotFound)"""
+
+    def __init__(self, error: str, response: Dict):
+        super().__init__(response.get('error_message') or error)
+        self.error = error
+        self.response = response
+
+
+def network_endpoints(network: str) -> Tuple[Tuple[str, ...], str]:
+    """(websocket URLs, JSON-RPC URL) for a network, honouring the URL override"""
+    config = NETWORKS.get(network, NETWORKS['testnet'])
+    override = os.environ.get(URL_OVERRIDE_ENV)
+    websocket_urls = tuple(url.strip() for url in override.split(',') if url.strip()) if override else None
+    return websocket_urls or config['websocket'], config['json_rpc']
+
+
+def live_ledger_enabled(client: Optional['XRPLClient'], sdk_available: bool) -> bool:
+    """Bridges query a ledger when a client is injected, xrpl-py is installed or the URL override is set;
+    otherwise they keep their mock responses for offline development"""
+    return client is not None or sdk_available or bool(os.environ.get(URL_OVERRIDE_ENV))
+
+
+def currency_code(symbol: str) -> str:
+    """XRPL currency code: ISO-style 3-character codes as-is, longer symbols as 40-hex"""
+    if len(symbol) == 3 and symbol != 'XRP':
+        return symbol
+    return symbol.encode('ascii').hex().upper().ljust(40, '0')[:40]
+
+
+def currency_name(code: str) -> str:
+    """Readable currency: 40-hex codes decoded when they hold printable ASCII, others unchanged"""
+    if len(code) != 40:
+        return code
+    try:
+        text = bytes.fromhex(code).rstrip(b'\x00').decode('ascii')
+    except (ValueError, UnicodeDecodeError):
+        return code
+    return text if text.isprintable() and text else code
+
+
+# ============================================================================
+# RFC 6455 framing (shared with the stand-in rippled)
+# ============================================================================
+
+def _mask(payload: bytes, key: bytes) -> bytes:
+    if not payload:
+        return payload
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(len(payload), 'big')
+
+
+def encode_frame(opcode: int, payload: bytes, masked: bool) -> bytes:
+    """One final frame; clients must mask, servers must not"""
+    length = len(payload)
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if masked else 0
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack('!H', length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack('!Q', length)
+    if masked:
+        key = secrets.token_bytes(4)
+        return header + key + _mask(payload, key)
+    return header + payload
+
+
+async def read_message(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                       masked_replies: bool) -> Tuple[int, bytes]:
+    """Next complete data or close message; pings are answered and fragments reassembled"""
+    fragments: List[bytes] = []
+    message_opcode = None
+    while True:
+        first, second = await reader.readexactly(2)
+        fin, opcode = first & 0x80, first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', await reader.readexactly(8))[0]
+        if length > MAX_MESSAGE_BYTES:
+            raise XRPLConnectionError(f"Websocket frame of {length} bytes exceeds limit")
+        key = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if key is not None:
+            payload = _mask(payload, key)
+
+        if opcode == OP_PING:
+            writer.write(encode_frame(OP_PONG, payload, masked_replies))
+            continue
+        if opcode == OP_PONG:
+            continue
+        if opcode == OP_CLOSE:
+            return OP_CLOSE, payload
+        if opcode != OP_CONTINUATION:
+            message_opcode = opcode
+        fragments.append(payload)
+        if fin:
+            return message_opcode, b''.join(fragments)
+
+
+def websocket_accept(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+
+
+# ============================================================================
+# Connection and pool
+# ============================================================================
+
+class _Connection:
+    """One persistent websocket; any number of requests share it, matched by id"""
+
+    def __init__(self, url: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 on_stream: Optional[Callable[[Dict], None]] = None,
+                 on_close: Optional[Callable[['_Connection'], None]] = None):
+        self.url = url
+        self._reader = reader
+        self._writer = writer
+        self._on_stream = on_stream
+        self._on_close = on_close
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.closed = False
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    @classmethod
+    async def open(cls, url: str, timeout: float, on_stream=None, on_close=None) -> '_Connection':
+        parts = urlsplit(url)
+        secure = parts.scheme == 'wss'
+        host = parts.hostname
+        port = parts.port or (443 if secure else 80)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, ssl=ssl.create_default_context() if secure else None,
+                                        server_hostname=host if secure else None),
+                timeout
+            )
+            key = base64.b64encode(secrets.token_bytes(16)).decode()
+            writer.write((
+                f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\n"
+                f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            ).encode())
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            raise XRPLConnectionError(f"Cannot connect to {url}: {e or type(e).__name__}") from e
+        lines = head.decode('latin-1').split('\r\n')
+        headers = {name.strip().lower(): value.strip()
+                   for name, _, value in (line.partition(':') for line in lines[1:] if line)}
+        if ' 101 ' not in lines[0] + ' ' or headers.get('sec-websocket-accept') != websocket_accept(key):
+            writer.close()
+            raise XRPLConnectionError(f"Websocket handshake with {url} failed: {lines[0]}")
+        return cls(url, reader, writer, on_stream, on_close)
+
+    async def _read_loop(self) -> None:
+        error: Exception = XRPLConnectionError(f"Connection to {self.url} closed")
+        try:
+            while True:
+                opcode, payload = await read_message(self._reader, self._writer, masked_replies=True)
+                if opcode == OP_CLOSE:
+                    break
+                message = json.loads(payload)
+                future = self.pending.pop(message.get('id'), None) if 'id' in message else None
+                if future is not None:
+                    if not future.done():
+                        future.set_result(message)
+                elif self._on_stream is not None:
+                    self._on_stream(message)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            error = XRPLConnectionError(f"Connection to {self.url} lost: {e or type(e).__name__}")
+        except XRPLConnectionError as e:
+            error = e
+        finally:
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending.clear()
+            self._writer.close()
+            if self._on_close is not None:
+                self._on_close(self)
+
+    async def send(self, request_id: int, payload: Dict) -> asyncio.Future:
+        if self.closed:
+            raise XRPLConnectionError(f"Connection to {self.url} is closed")
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self._writer.write(encode_frame(OP_TEXT, json.dumps({**payload, 'id': request_id}).encode(), masked=True))
+        await self._writer.drain()
+        return future
+
+    def abandon(self, request_id: int) -> None:
+        self.pending.pop(request_id, None)
+
+    async def close(self) -> None:
+        if not self.closed:
+            try:
+                self._writer.write(encode_frame(OP_CLOSE, struct.pack('!H', 1000), masked=True))
+            except (ConnectionError, OSError):
+                pass
+            self._writer.close()
+        self._reader_task.cancel()
+        try:
+            await self._reader_task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+class XRPLClient:
+    """Pooled, pipelined async XRPL websocket client
+
+    Up to ``pool_size`` sockets are opened lazily; each request goes to the
+    socket with the fewest requests in flight, and a new socket is only
+    opened when all existing ones are busy. URLs are tried in order, so a
+    second URL acts as failover. Read-only requests that fail because a
+    socket dropped are retried once on a fresh socket.
+
+    Subscriptions all live on one socket. If it drops, they are re-sent on a
+    replacement (retrying with backoff) and the reconnect handlers run, so
+    subscribers can resync anything they missed.
+    """
+
+    def __init__(self,
+                 urls: Sequence[str],
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 reconnect_delay: float = DEFAULT_RECONNECT_DELAY,
+                 max_reconnect_delay: float = MAX_RECONNECT_DELAY):
+        if not urls:
+            raise ValueError("At least one XRPL websocket URL is required")
+        self.urls = tuple(urls)
+        self.pool_size = max(1, pool_size)
+        self.request_timeout = request_timeout
+        self.connect_timeout = connect_timeout
+        self._connections: List[_Connection] = []
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._ids = itertools.count(1)
+        self._url_cursor = 0
+        self._stream_handlers: List[Callable[[Dict], None]] = []
+        self._reconnect_handlers: List[Callable[[], object]] = []
+        self._subscriptions: List[Dict] = []
+        self._stream_connection: Optional[_Connection] = None
+        self._restore_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.stats = {'requests': 0, 'connections_opened': 0, 'timeouts': 0, 'retries': 0,
+                      'stream_restores': 0}
+
+    # -- stream / reconnect hooks (used by subscriptions) -----------------
+    def add_stream_handler(self, handler: Callable[[Dict], None]) -> None:
+        """Called with every message that is not a response (ledgerClosed, transaction, ...)"""
+        self._stream_handlers.append(handler)
+
+    def add_reconnect_handler(self, handler: Callable[[], object]) -> None:
+        """Called (and awaited if it returns an awaitable) once lost subscriptions are restored"""
+        self._reconnect_handlers.append(handler)
+
+    def _dispatch_stream(self, message: Dict) -> None:
+        for handler in self._stream_handlers:
+            handler(message)
+
+    # -- pool ------------------------------------------------------------
+    async def _open(self) -> _Connection:
+        errors = []
+        for attempt in range(len(self.urls)):
+            url = self.urls[(self._url_cursor + attempt) % len(self.urls)]
+            try:
+                connection = await _Connection.open(url, self.connect_timeout, self._dispatch_stream,
+                                                    self._connection_closed)
+            except XRPLConnectionError as e:
+                errors.append(str(e))
+                continue
+            self._url_cursor = (self._url_cursor + attempt) % len(self.urls)
+            self.stats['connections_opened'] += 1
+            return connection
+        raise XRPLConnectionError('; '.join(errors))
+
+    def _pick(self) -> Optional[_Connection]:
+        """Least-loaded live socket, or None when another socket should be opened"""
+        live = self._connections = [connection for connection in self._connections if not connection.closed]
+        idle = next((connection for connection in live if not connection.pending), None)
+        if idle is not None or len(live) >= self.pool_size:
+            return idle or min(live, key=lambda connection: len(connection.pending))
+        return None
+
+    async def _acquire(self) -> _Connection:
+        connection = self._pick()
+        if connection is not None:
+            return connection
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            connection = self._pick()
+            if connection is not None:
+                return connection
+            connection = await self._open()
+            self._connections.append(connection)
+        return connection
+
+    @property
+    def connected(self) -> bool:
+        return any(not connection.closed for connection in self._connections)
+
+    # -- requests --------------------------------------------------------
+    async def request(self, command, timeout: Optional[float] = None, **params) -> Dict:
+        """Send one command and return its ``result``; raises XRPLRequestError on an error response"""
+        payload = dict(command) if isinstance(command, dict) else {'command': command, **params}
+        return (await self._exchange(payload, timeout))[1]
+
+    async def _exchange(self, payload: Dict, timeout: Optional[float],
+                        pinned: Optional[_Connection] = None) -> Tuple[_Connection, Dict]:
+        timeout = self.request_timeout if timeout is None else timeout
+        self.stats['requests'] += 1
+        for attempt in range(2):
+            connection = pinned if pinned is not None and not pinned.closed else await self._acquire()
+            request_id = next(self._ids)
+            try:
+                future = await connection.send(request_id, payload)
+                response = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                connection.abandon(request_id)
+                self.stats['timeouts'] += 1
+                raise XRPLTimeoutError(f"{payload.get('command')} timed out after {timeout}s on {connection.url}")
+            except (XRPLConnectionError, ConnectionError, OSError) as e:
+                connection.abandon(request_id)
+                if attempt or payload.get('command') in ('submit', 'submit_multisigned'):
+                    raise e if isinstance(e, XRPLConnectionError) else XRPLConnectionError(str(e)) from e
+                self.stats['retries'] += 1
+                continue
+            if response.get('status') == 'error' or 'error' in response.get('result', {}):
+                result = response.get('result', {})
+                raise XRPLRequestError(response.get('error') or result.get('error', 'unknown'), {**result, **response})
+            return connection, response.get('result', {})
+        raise XRPLConnectionError("unreachable")
+
+    # -- subscriptions ---------------------------------------------------
+    async def subscribe(self, **params) -> Dict:
+        """``subscribe`` (accounts=[...], streams=[...]); remembered and restored after reconnects"""
+        payload = {'command': 'subscribe', **params}
+        self._stream_connection, result = await self._exchange(payload, None, self._stream_connection)
+        self._subscriptions.append(payload)
+        return result
+
+    def _connection_closed(self, connection: _Connection) -> None:
+        if connection is self._stream_connection and not self._closing:
+            self._stream_connection = None
+            if self._subscriptions and (self._restore_task is None or self._restore_task.done()):
+                self._restore_task = asyncio.get_running_loop().create_task(self._restore_streams())
+
+    async def _restore_streams(self) -> None:
+        delay = self.reconnect_delay
+        while not self._closing:
+            try:
+                connection = None
+                for payload in self._subscriptions:
+                    connection, _ = await self._exchange(payload, None, connection)
+                self._stream_connection = connection
+                break
+            except XRPLClientError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+        if self._closing:
+            return
+        self.stats['stream_restores'] += 1
+        for handler in self._reconnect_handlers:
+            outcome = handler()
+            if asyncio.iscoroutine(outcome):
+                await outcome
+
+    async def server_info(self) -> Dict:
+        return await self.request('server_info')
+
+    async def account_info(self, account: str, ledger_index: str = 'validated') -> Dict:
+        return await self.request('account_info', account=account, ledger_index=ledger_index)
+
+    async def account_lines(self, account: str, ledger_index: str = 'validated', peer: Optional[str] = None,
+                            limit: Optional[int] = None, marker=None) -> Dict:
+        params = {'account': account, 'ledger_index': ledger_index}
+        if peer is not None:
+            params['peer'] = peer
+        if limit is not None:
+            params['limit'] = limit
+        if marker is not None:
+            params['marker'] = marker
+        return await self.request('account_lines', **params)
+
+    async def find_trustline(self, account: str, currency: str, issuer: str) -> Tuple[Optional[Dict], Optional[int]]:
+        """(line, ledger_index) for ``account``'s trustline to ``issuer`` in ``currency``; line is None if absent"""
+        marker, ledger_index = None, None
+        while True:
+            result = await self.account_lines(account, peer=issuer, marker=marker)
+            ledger_index = result.get('ledger_index', ledger_index)
+            for line in result.get('lines', []):
+                if line.get('currency') == currency and line.get('account') == issuer:
+                    return line, ledger_index
+            marker = result.get('marker')
+            if marker is None:
+                return None, ledger_index
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._restore_task is not None:
+            self._restore_task.cancel()
+        connections, self._connections = self._connections, []
+        await asyncio.gather(*(connection.close() for connection in connections), return_exceptions=True)
+
+    async def __aenter__(self) -> 'XRPLClient':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+# ============================================================================
+# Process-wide shared clients
+# ============================================================================
+
+# (websocket URLs, event loop) -> client; sockets belong to the loop that opened them
+_shared_clients: Dict[Tuple[Tuple[str, ...], asyncio.AbstractEventLoop], XRPLClient] = {}
+
+
+def get_shared_client(network: str = 'mainnet', urls: Optional[Sequence[str]] = None, **options) -> XRPLClient:
+    """The shared client for a network in the running event loop, created on first use"""
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _shared_clients if key[1].is_closed()]:
+        del _shared_clients[key]
+    urls = tuple(urls) if urls else network_endpoints(network)[0]
+    key = (urls, loop)
+    client = _shared_clients.get(key)
+    if client is None:
+        client = _shared_clients[key] = XRPLClient(urls, **options)
+    return client
+
+
+async def close_shared_clients() -> None:
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _shared_clients if key[1] is loop]:
+        await _shared_clients.pop(key).close()
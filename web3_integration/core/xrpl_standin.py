@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+STAND-IN RIPPLED
+Local websocket server speaking the rippled JSON API subset the bridges use
+(server_info, account_info, account_lines with markers, account/ledger subscriptions),
+for tests and offline demos
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import asyncio
+import json
+from typing import Dict, List, Optional
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from web3_integration.core.xrpl_client import (
+    OP_CLOSE, OP_TEXT, currency_code, encode_frame, read_message, websocket_accept
+)
+
+DEFAULT_PAGE_SIZE = 200
+
+
+def _ledger_currency(currency: str) -> str:
+    """Currency as rippled reports it: symbols longer than 3 characters become 40-hex"""
+    return currency if len(currency) == 40 else currency_code(currency)
+
+
+class StandInRippled:
+    """In-process rippled stand-in
+
+    ``accounts`` maps an address to ``{'Balance': drops, 'lines': [...]}``
+    where each line uses rippled's ``account_lines`` shape (account,
+    currency, balance, limit, ...); symbols such as ``USDT`` are served as
+    40-hex codes, as rippled does. ``latency`` delays every response, and
+    requests are answered concurrently, so out-of-order replies exercise
+    client-side pipelining. ``set_xrp_balance`` / ``set_line_balance`` apply a
+    change, close a ledger and publish the transaction (with rippled-style
+    AffectedNodes metadata) to subscribed sockets.
+
+        async with StandInRippled(accounts) as node:
+            client = XRPLClient([node.url])
+    """
+
+    def __init__(self,
+                 accounts: Optional[Dict[str, Dict]] = None,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 latency: float = 0.0,
+                 page_size: int = DEFAULT_PAGE_SIZE):
+        self.accounts = accounts or {}
+        for account in self.accounts.values():
+            for line in account.get('lines', []):
+                line['currency'] = _ledger_currency(line['currency'])
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.page_size = page_size
+        self.ledger_index = 1
+        self.stats = {'connections': 0, 'requests': 0, 'max_in_flight': 0}
+        self._in_flight = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: List[asyncio.StreamWriter] = []
+        # writer -> (subscribed accounts, subscribed streams)
+        self._subscribers: Dict[asyncio.StreamWriter, tuple] = {}
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/"
+
+    async def start(self) -> 'StandInRippled':
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        self.drop_connections()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> 'StandInRippled':
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def drop_connections(self) -> None:
+        """Abruptly close every client socket (simulates a node restart)"""
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+        self._subscribers.clear()
+
+    # -- protocol --------------------------------------------------------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        headers = {name.strip().lower(): value.strip()
+                   for name, _, value in (line.partition(':') for line in head.decode('latin-1').split('\r\n')[1:])
+                   if name}
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(headers.get('sec-websocket-key', ''))}\r\n\r\n"
+        ).encode())
+        self.stats['connections'] += 1
+        self._writers.append(writer)
+        tasks = set()
+        try:
+            while True:
+                opcode, payload = await read_message(reader, writer, masked_replies=False)
+                if opcode == OP_CLOSE:
+                    writer.write(encode_frame(OP_CLOSE, payload, masked=False))
+                    break
+                task = asyncio.ensure_future(self._respond(writer, json.loads(payload)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            if writer in self._writers:
+                self._writers.remove(writer)
+            self._subscribers.pop(writer, None)
+            writer.close()
+
+    def _send(self, writer: asyncio.StreamWriter, message: Dict) -> None:
+        if not writer.is_closing():
+            writer.write(encode_frame(OP_TEXT, json.dumps(message).encode(), masked=False))
+
+    async def _respond(self, writer: asyncio.StreamWriter, request: Dict) -> None:
+        self.stats['requests'] += 1
+        self._in_flight += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self._in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            handler = getattr(self, f"_cmd_{request.get('command')}", None)
+            result = handler(request, writer) if handler else {'error': 'unknownCmd', 'error_message': 'Unknown method.'}
+        finally:
+            self._in_flight -= 1
+        response = {'id': request.get('id'), 'type': 'response'}
+        if 'error' in result:
+            response.update(status='error', error=result['error'], error_message=result.get('error_message'),
+                            request=request)
+        else:
+            response.update(status='success', result=result)
+        self._send(writer, response)
+
+    # -- commands --------------------------------------------------------
+    def _cmd_ping(self, request: Dict, writer) -> Dict:
+        return {}
+
+    def _cmd_server_info(self, request: Dict, writer) -> Dict:
+        return {'info': {'build_version': 'stand-in', 'server_state': 'full',
+                         'validated_ledger': {'seq': self.ledger_index}}}
+
+    def _cmd_account_info(self, request: Dict, writer) -> Dict:
+        account = self.accounts.get(request.get('account'))
+        if account is None:
+            return {'error': 'actNotFound', 'error_message': 'Account not found.'}
+        return {'account_data': {'Account': request['account'], 'Balance': str(account.get('Balance', '0')),
+                                 'Sequence': account.get('Sequence', 1)},
+                'ledger_index': self.ledger_index, 'validated': True}
+
+    def _cmd_account_lines(self, request: Dict, writer) -> Dict:
+        account = self.accounts.get(request.get('account'))
+        if account is None:
+            return {'error': 'actNotFound', 'error_message': 'Account not found.'}
+        lines = [line for line in account.get('lines', [])
+                 if request.get('peer') in (None, line.get('account'))]
+        start = int(request.get('marker') or 0)
+        limit = min(int(request.get('limit') or self.page_size), self.page_size)
+        result = {'account': request['account'], 'lines': lines[start:start + limit],
+                  'ledger_index': self.ledger_index, 'validated': True}
+        if start + limit < len(lines):
+            result['marker'] = str(start + limit)
+        return result
+
+    def _cmd_ledger_current(self, request: Dict, writer) -> Dict:
+        return {'ledger_current_index': self.ledger_index + 1}
+
+    def _cmd_subscribe(self, request: Dict, writer) -> Dict:
+        accounts, streams = self._subscribers.setdefault(writer, (set(), set()))
+        accounts.update(request.get('accounts', []))
+        streams.update(request.get('streams', []))
+        if 'ledger' in request.get('streams', []):
+            return {'ledger_index': self.ledger_index, 'validated_ledgers': f"1-{self.ledger_index}"}
+        return {}
+
+    def _cmd_unsubscribe(self, request: Dict, writer) -> Dict:
+        accounts, streams = self._subscribers.get(writer, (set(), set()))
+        accounts.difference_update(request.get('accounts', []))
+        streams.difference_update(request.get('streams', []))
+        return {}
+
+    # -- ledger changes --------------------------------------------------
+    def _close_ledger(self, account: str, node: Dict) -> None:
+        self.ledger_index += 1
+        transaction = {
+            'type': 'transaction', 'validated': True, 'ledger_index': self.ledger_index,
+            'engine_result': 'tesSUCCESS',
+            'transaction': {'Account': account, 'TransactionType': 'Payment',
+                            'hash': f"{self.ledger_index:064X}"},
+            'meta': {'AffectedNodes': [node], 'TransactionResult': 'tesSUCCESS'}
+        }
+        closed = {'type': 'ledgerClosed', 'ledger_index': self.ledger_index,
+                  'ledger_hash': f"{self.ledger_index:064X}", 'validated_ledgers': f"1-{self.ledger_index}"}
+        for writer, (accounts, streams) in list(self._subscribers.items()):
+            if account in accounts:
+                self._send(writer, transaction)
+            if 'ledger' in streams:
+                self._send(writer, closed)
+
+    def set_xrp_balance(self, account: str, drops: int) -> None:
+        entry = self.accounts.setdefault(account, {'lines': []})
+        created = 'Balance' not in entry
+        entry['Balance'] = str(drops)
+        fields = {'Account': account, 'Balance': str(drops), 'Sequence': entry.get('Sequence', 1)}
+        kind, body = ('CreatedNode', 'NewFields') if created else ('ModifiedNode', 'FinalFields')
+        self._close_ledger(account, {kind: {'LedgerEntryType': 'AccountRoot', body: fields}})
+
+    def set_line_balance(self, account: str, issuer: str, currency: str, balance: str,
+                         limit: str = '1000000000') -> None:
+        """Set ``account``'s trustline to ``issuer``; the account is the low side of the RippleState"""
+        currency = _ledger_currency(currency)
+        lines = self.accounts.setdefault(account, {'lines': []}).setdefault('lines', [])
+        line = next((line for line in lines if line['account'] == issuer and line['currency'] == currency), None)
+        kind, body = ('ModifiedNode', 'FinalFields') if line else ('CreatedNode', 'NewFields')
+        if line is None:
+            line = {'account': issuer, 'currency': currency}
+            lines.append(line)
+        line.update(balance=str(balance), limit=str(limit))
+        fields = {
+            'Balance': {'currency': currency, 'issuer': 'rrrrrrrrrrrrrrrrrrrrBZbvji', 'value': str(balance)},
+            'LowLimit': {'currency': currency, 'issuer': account, 'value': str(limit)},
+            'HighLimit': {'currency': currency, 'issuer': issuer, 'value': '0'}
+        }
+        self._close_ledger(account, {kind: {'LedgerEntryType': 'RippleState', body: fields}})
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+XRPL TRUSTLINE FETCHER
+Every trustline of many wallets in one call: account_lines markers are walked to the end,
+wallets are fetched concurrently under a request-rate limit, and results come back as one
+normalized (wallet, currency, issuer, balance, limit) table
+Author: OPTKAS1 Enhanced Infrastructure Team
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from web3_integration.core.xrpl_client import XRPLClient, XRPLRequestError, currency_name, network_endpoints
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+WALLET_MANIFEST_PATH = PROJECT_ROOT / "EXECUTION_v1" / "05_WALLETS" / "WALLET_MANIFEST.json"
+
+# Public rippled nodes throttle heavy clients; stay well under their limits by default
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_MAX_CONCURRENCY = 8
+# rippled's account_lines maximum page size
+PAGE_LIMIT = 400
+
+
+def load_wallet_manifest(path: Union[str, Path] = WALLET_MANIFEST_PATH) -> List[Tuple[str, str]]:
+    """(address, role) for every XRPL wallet in a WALLET_MANIFEST.json"""
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    return [(wallet['address'], wallet.get('role', ''))
+            for wallet in manifest.get('wallets', []) if wallet.get('ledger', 'xrpl') == 'xrpl']
+
+
+class RateLimiter:
+    """Token bucket: at most ``rate`` acquisitions per second, bursts up to ``burst``"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass(frozen=True)
+class TrustlineRow:
+    wallet: str
+    role: str
+    currency: str
+    issuer: str
+    balance: Decimal
+    limit: Decimal
+    currency_code: str
+    ledger_index: Optional[int]
+
+
+@dataclass
+class TrustlineTable:
+    """Fetched trustlines plus the wallets that could not be read"""
+    rows: List[TrustlineRow] = field(default_factory=list)
+    unfunded: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+    requests: int = 0
+
+    def records(self) -> List[Dict]:
+        return [{**asdict(row), 'balance': str(row.balance), 'limit': str(row.limit)} for row in self.rows]
+
+    def balance(self, wallet: str, currency: str, issuer: str) -> Decimal:
+        return sum((row.balance for row in self.rows
+                    if row.wallet == wallet and issuer == row.issuer and currency in (row.currency, row.currency_code)),
+                   Decimal('0'))
+
+    def summary(self) -> Dict:
+        totals: Dict[Tuple[str, str], Decimal] = {}
+        for row in self.rows:
+            totals[(row.currency, row.issuer)] = totals.get((row.currency, row.issuer), Decimal('0')) + row.balance
+        return {
+            'wallets_with_trustlines': len({row.wallet for row in self.rows}),
+            'trustlines': len(self.rows),
+            'unfunded_wallets': len(self.unfunded),
+            'failed_wallets': len(self.errors),
+            'requests': self.requests,
+            'totals': [{'currency': currency, 'issuer': issuer, 'balance': total}
+                       for (currency, issuer), total in sorted(totals.items())]
+        }
+
+
+class TrustlineFetcher:
+    """Concurrent, rate-limited ``account_lines`` walker
+
+    Every page request (not just every wallet) takes a rate-limiter token,
+    and at most ``max_concurrency`` wallets are in flight at once. Later
+    pages are pinned to the first page's ledger index so a marker walk sees
+    one consistent ledger. An unfunded wallet (actNotFound) is reported as
+    such rather than as an error; other failures are collected per wallet
+    and do not stop the rest of the batch.
+    """
+
+    def __init__(self,
+                 client: XRPLClient,
+                 requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 page_limit: int = PAGE_LIMIT):
+        self.client = client
+        self.limiter = RateLimiter(requests_per_second)
+        self.max_concurrency = max(1, max_concurrency)
+        self.page_limit = page_limit
+
+    async def _wallet_lines(self, wallet: str) -> Tuple[List[Dict], Optional[int], int]:
+        lines: List[Dict] = []
+        marker, ledger_index, pages = None, 'validated', 0
+        while True:
+            await self.limiter.acquire()
+            page = await self.client.account_lines(wallet, ledger_index=ledger_index,
+                                                   limit=self.page_limit, marker=marker)
+            pages += 1
+            ledger_index = page.get('ledger_index', ledger_index)
+            lines.extend(page.get('lines', []))
+            marker = page.get('marker')
+            if marker is None:
+                return lines, ledger_index if isinstance(ledger_index, int) else None, pages
+
+    async def fetch(self, wallets: Iterable[Union[str, Tuple[str, str]]]) -> TrustlineTable:
+        """Trustlines of every wallet; entries are addresses or (address, role) pairs"""
+        entries = [(wallet, '') if isinstance(wallet, str) else tuple(wallet) for wallet in wallets]
+        entries = list(dict(entries).items())
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        table = TrustlineTable()
+
+        async def fetch_one(wallet: str, role: str) -> None:
+            async with semaphore:
+                try:
+                    lines, ledger_index, pages = await self._wallet_lines(wallet)
+                except XRPLRequestError as e:
+                    table.requests += 1
+                    if e.error == 'actNotFound':
+                        table.unfunded.append(wallet)
+                    else:
+                        table.errors[wallet] = f"{e.error}: {e}"
+                    return
+                except Exception as e:
+                    table.errors[wallet] = str(e) or type(e).__name__
+                    return
+            table.requests += pages
+            for line in lines:
+                table.rows.append(TrustlineRow(
+                    wallet=wallet,
+                    role=role,
+                    currency=currency_name(line.get('currency', '')),
+                    issuer=line.get('account', ''),
+                    balance=Decimal(line.get('balance', '0')),
+                    limit=Decimal(line.get('limit', '0')),
+                    currency_code=line.get('currency', ''),
+                    ledger_index=ledger_index
+                ))
+
+        await asyncio.gather(*(fetch_one(wallet, role) for wallet, role in entries))
+        order = {wallet: index for index, (wallet, _) in enumerate(entries)}
+        table.rows.sort(key=lambda row: (order[row.wallet], row.currency, row.issuer))
+        return table
+
+    async def fetch_manifest(self, path: Union[str, Path] = WALLET_MANIFEST_PATH) -> TrustlineTable:
+        """Every XRPL wallet in WALLET_MANIFEST.json, in one call"""
+        return await self.fetch(load_wallet_manifest(path))
+
+
+async def _main(argv: Sequence[str]) -> int:
+    manifest = argv[0] if argv else WALLET_MANIFEST_PATH
+    with open(manifest, encoding='utf-8') as f:
+        network = json.load(f).get('network', 'mainnet')
+    async with XRPLClient(network_endpoints(network)[0]) as client:
+        table = await TrustlineFetcher(client).fetch_manifest(manifest)
+    print(json.dumps({'summary': table.summary(), 'trustlines': table.records(),
+                      'unfunded': table.unfunded, 'errors': table.errors}, indent=2, default=str))
+    return 1 if table.errors else 0
+
+
+if __name__ == "__main__":
+    # xrpl_trustline_fetcher.py [WALLET_MANIFEST.json]  (OPTKAS1_XRPL_URL selects the node)
+    sys.exit(asyncio.run(_main(sys.argv[1:])))